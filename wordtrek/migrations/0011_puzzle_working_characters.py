@@ -0,0 +1,18 @@
+# Generated by Django 2.2.4 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wordtrek', '0010_auto_20180525_0248'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='puzzle',
+            name='working_characters',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -129,6 +129,11 @@ class Puzzle(models.Model):
         null=True, blank=True,
         # help_text='Have all the answers for this puzzle been solved?'
     )
+    working_characters = models.CharField(
+        max_length=255,
+        # help_text='The letters left once the solved answers are removed.',
+        null=True, blank=True,
+    )
 
     class Meta:
         """
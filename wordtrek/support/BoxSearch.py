@@ -0,0 +1,1338 @@
+"""
+BoxSearch.py - Search engines that walk the box without copying maps.
+
+These engines produce the same words (in the same order) as the original
+recursive search in Box and ParallelBox, but track the cells used with a
+single integer bitmask and keep the path on a stack.  The iterative engine
+does not recurse at all, so its memory use depends only on the word length.
+
+Once letters have been removed from the box, the unused cells may have
+split into islands.  A path whose remaining cells cannot supply the
+letters still needed is abandoned as soon as that is known.
+
+A hint may reveal letters anywhere in the word ("?A??ER"), not just at the
+start.  A path is abandoned as soon as any revealed letter can no longer
+be reached in time from the end of the path.
+
+The meet in the middle engine, meant for very long words, walks the first
+half of each word forward and the second half backward from its last
+letter, and joins the halves that meet on the same middle cell.
+
+The multiple length engine walks the box once for all the open answers of
+a puzzle, reporting each word to the answer it fits.
+
+The dictionary first engine works the other way around: it takes the words
+of the right length from the lexicon and traces each one on the box.
+
+Every engine reports a word as a COMPACT_WORD - the word and one byte per
+letter for the cell used - so the list of letter locations is only built
+for the words actually shown.
+"""
+
+from collections import Counter
+from functools import lru_cache
+from hashlib import sha1
+
+from wordtrek.support.constants import ADJ_LIST, COMPACT_WORD, \
+    CELL, CELL_STATUS, CELL_POSITION, AVAILABILITY, TRIE_END, \
+    HINT_WILDCARDS, CELL_VACANT
+
+# second halves most recently indexed by this process, with the box, word
+# length, hint and lexicon version they were indexed for
+_suffix_index_cache = dict()
+
+
+def flatten_box(box: list) -> tuple:
+    """
+    Reduce a box of cells to flat lists indexed by row * side + col.
+
+    :param box: list of lists of CELL
+    :return: tuple of (list of cells, letters, bitmask of unusable cells)
+    """
+    cells = list()
+    letters = list()
+    used_mask = 0
+    for row in box:
+        for cell in row:
+            if cell.my_availability != CELL_STATUS.AVAILABLE:
+                used_mask |= 1 << len(cells)
+            cells.append(cell)
+            letters.append(cell.letter)
+    return cells, letters, used_mask
+
+
+def compact_word(word: str, letters_loc: list, side: int) -> COMPACT_WORD:
+    """
+    Pack a word found by the recursive search into a compact word.
+
+    :param word:
+    :param letters_loc: list of LETTER_LOC, one per letter
+    :param side: the size of one side of the puzzle
+    :return:
+    """
+    cells = bytes(loc.letter_loc.row * side + loc.letter_loc.col
+                  for loc in letters_loc)
+    found_word = COMPACT_WORD(found_word=word, cells=cells, side=side)
+    return found_word
+
+
+def fill_availability_box(my_pos: CELL_POSITION, side: int) -> AVAILABILITY:
+    """
+    Fill in an availability box for this position.
+
+    :param my_pos:
+    :param side:
+    :return:
+    """
+    my_adj_list = list()
+    for adjustment in ADJ_LIST:
+        neighbor_pos = (my_pos.row + adjustment[0], my_pos.col + adjustment[1])
+        if neighbor_pos[0] < 0 or neighbor_pos[0] >= side or \
+                neighbor_pos[1] < 0 or neighbor_pos[1] >= side:
+            my_adj_list.append(CELL_STATUS.EDGE)
+        else:
+            my_adj_list.append(CELL_STATUS.AVAILABLE)
+
+    # convert the list to a tuple
+    my_availability = AVAILABILITY._make(my_adj_list)
+
+    return my_availability
+
+
+def build_box(letters: str, side: int) -> list:
+    """
+    Build a box of cells from its letters, left to right, top to bottom.
+
+    A cell holding CELL_VACANT is marked as used.
+
+    :param letters: one letter per cell
+    :param side: the size of one side of the puzzle
+    :return: list of lists of CELL
+    """
+    box = list()
+    for row_pos in range(side):
+        row = list()
+        for col_pos in range(side):
+            my_pos = CELL_POSITION(row=row_pos, col=col_pos)
+            letter = letters[row_pos * side + col_pos]
+            if letter == CELL_VACANT:
+                availability = CELL_STATUS.USED
+            else:
+                availability = CELL_STATUS.AVAILABLE
+            row.append(CELL(pos=my_pos, letter=letter,
+                            my_availability=availability,
+                            neighbors=fill_availability_box(my_pos, side)))
+        box.append(row)
+    return box
+
+
+def apply_gravity(letters: str, side: int, cells: bytes) -> str:
+    """
+    Remove the letters of a word and let the letters above them fall.
+
+    This gives the same box as ParallelBox.remove_word_letters, working on
+    a string of letters instead of a box of cells.
+
+    :param letters: one letter per cell, CELL_VACANT for an empty cell
+    :param side: the size of one side of the puzzle
+    :param cells: flat index of each cell removed
+    :return: the letters left, in the same layout
+    """
+    removed = set(cells)
+    new_letters = list(letters)
+    for col in set(cell_ndx % side for cell_ndx in removed):
+        column = [letters[row * side + col] for row in range(side)
+                  if row * side + col not in removed and
+                  letters[row * side + col] != CELL_VACANT]
+        column = [CELL_VACANT] * (side - len(column)) + column
+        for row in range(side):
+            new_letters[row * side + col] = column[row]
+    return ''.join(new_letters)
+
+
+@lru_cache(maxsize=None)
+def zobrist_value(side: int, cell_ndx: int, letter: str) -> int:
+    """
+    Give a letter in a cell its own 64 bit value for hashing a box.
+
+    The value is taken from a digest rather than a random number, so the
+    hash of a box is the same in every process and after every restart.
+
+    :param side: the size of one side of the puzzle
+    :param cell_ndx: flat index of the cell
+    :param letter: letter in the cell (CELL_VACANT for an empty cell)
+    :return:
+    """
+    digest = sha1(f'{side}/{cell_ndx}/{letter}'.encode('utf-8')).digest()
+    value = int.from_bytes(digest[:8], 'big')
+    return value
+
+
+def board_hash(letters: str, side: int) -> int:
+    """
+    Hash the letters of a box, Zobrist style.
+
+    The hash is the exclusive or of the values of the letter in each cell,
+    so changing one cell changes the hash by the values of its old and new
+    letters alone.
+
+    :param letters: one letter per cell, CELL_VACANT for an empty cell
+    :param side: the size of one side of the puzzle
+    :return:
+    """
+    hash_value = 0
+    for cell_ndx, letter in enumerate(letters):
+        hash_value ^= zobrist_value(side, cell_ndx, letter)
+    return hash_value
+
+
+@lru_cache(maxsize=None)
+def neighbor_table(side: int) -> tuple:
+    """
+    Build the table of neighbors for every cell of a box of a given size.
+
+    Entry row * side + col holds a tuple of the flat indexes of the cells
+    next to that cell, in ADJ_LIST order.  The table depends only on the
+    size of the box, so it is built once per size and shared.
+
+    :param side: the size of one side of the puzzle
+    :return: tuple of tuples of neighbor indexes
+    """
+    table = list()
+    for row_pos in range(side):
+        for col_pos in range(side):
+            my_pos = CELL_POSITION(row=row_pos, col=col_pos)
+            availability = fill_availability_box(my_pos, side)
+            neighbors = list()
+            for pos, neighbor in enumerate(availability):
+                if neighbor == CELL_STATUS.AVAILABLE:
+                    rel_pos = ADJ_LIST[pos]
+                    neighbors.append((row_pos + rel_pos.row) * side +
+                                     col_pos + rel_pos.col)
+            table.append(tuple(neighbors))
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def neighbor_masks(side: int) -> tuple:
+    """
+    Build the neighbors of every cell of a box as bitmasks.
+
+    :param side: the size of one side of the puzzle
+    :return: tuple of bitmasks, one per cell
+    """
+    masks = list()
+    for neighbors in neighbor_table(side):
+        mask = 0
+        for neighbor in neighbors:
+            mask |= 1 << neighbor
+        masks.append(mask)
+    return tuple(masks)
+
+
+def count_reachable_cells(start: int, blocked: int, masks: tuple,
+                          limit: int) -> int:
+    """
+    Count the unblocked cells connected to a cell, up to a limit.
+
+    This is a flood fill over the neighbor bitmasks, one ring of cells at
+    a time.  It stops as soon as the limit is reached since the caller
+    only needs to know if there are enough cells left.
+
+    :param start: flat index of the cell to start from (not counted)
+    :param blocked: bitmask of cells that cannot be used
+    :param masks: neighbor bitmasks from neighbor_masks
+    :param limit: number of cells that is enough
+    :return: number of cells reached (no more than needed to hit the limit)
+    """
+    reached = blocked | (1 << start)
+    frontier = 1 << start
+    count = 0
+    while frontier and count < limit:
+        ring = 0
+        while frontier:
+            low_bit = frontier & -frontier
+            ring |= masks[low_bit.bit_length() - 1]
+            frontier ^= low_bit
+        ring &= ~reached
+        reached |= ring
+        count += bin(ring).count('1')
+        frontier = ring
+    return count
+
+
+def letter_map_mask(letter_map: list) -> int:
+    """
+    Convert a letter map to a bitmask of the cells that cannot be used.
+
+    :param letter_map: list of lists of CELL_STATUS
+    :return: bitmask indexed by row * side + col
+    """
+    used_mask = 0
+    ndx = 0
+    for row in letter_map:
+        for status in row:
+            if status != CELL_STATUS.AVAILABLE:
+                used_mask |= 1 << ndx
+            ndx += 1
+    return used_mask
+
+
+def hint_pattern(word_hint: str, word_length: int) -> tuple:
+    """
+    Spread a hint over the positions of a word.
+
+    A hint is read from the start of the word.  Wildcards (such as "?")
+    stand for letters not revealed, and any letters after the end of the
+    hint are not revealed either.  A hint of "SH" is the same as "SH??".
+
+    :param word_hint: the hint, e.g. "?A??ER"
+    :param word_length: number of letters in the word
+    :return: tuple with the letter at each position or None if unknown
+    """
+    hint = word_hint.upper() if word_hint else ''
+    pattern = list()
+    for ndx in range(word_length):
+        if ndx < len(hint) and hint[ndx] not in HINT_WILDCARDS:
+            pattern.append(hint[ndx])
+        else:
+            pattern.append(None)
+    return tuple(pattern)
+
+
+def matches_hint(word: str, word_hint: str) -> bool:
+    """
+    Determine if a word has every letter revealed by the hint.
+
+    :param word:
+    :param word_hint:
+    :return: true if the word fits the hint
+    """
+    pattern = hint_pattern(word_hint, len(word))
+    fits = all(letter is None or letter == word[ndx]
+               for ndx, letter in enumerate(pattern))
+    return fits
+
+
+class HintPattern:
+    """
+    The letters revealed by a hint and where in the box they can be found.
+
+    For each revealed letter, the distance from every cell to the nearest
+    usable cell holding that letter is worked out once.  A path ending on
+    a cell more steps away from a revealed letter than there are letters
+    left before that letter's position cannot fit the hint.  The revealed
+    letters are checked rarest first, since the rarest letter in the box
+    rules out the most paths.  The rarest revealed letter is the anchor a
+    search can start from instead of the first letter.
+    """
+
+    def __init__(self, *, word_hint: str, word_length: int, letters: list,
+                 used_mask: int, side: int):
+        """
+        Work out the distances to the revealed letters.
+
+        :param word_hint: the hint, e.g. "?A??ER"
+        :param word_length: number of letters in the word
+        :param letters: flat list of letters in the box
+        :param used_mask: bitmask of unusable cells
+        :param side: the size of one side of the puzzle
+        """
+        self.pattern = hint_pattern(word_hint, word_length)
+
+        # usable cells holding each revealed letter
+        cells_by_letter = dict()
+        for letter in set(self.pattern) - {None}:
+            cells_by_letter[letter] = [
+                ndx for ndx in range(side * side)
+                if letters[ndx] == letter and not used_mask & (1 << ndx)]
+
+        # distance from each cell to the nearest copy of each letter
+        unreachable = side * side
+        distances = dict()
+        for letter, letter_cells in cells_by_letter.items():
+            distance_list = list()
+            for ndx in range(side * side):
+                row_pos, col_pos = divmod(ndx, side)
+                distance_list.append(min(
+                    [max(abs(row_pos - letter_ndx // side),
+                         abs(col_pos - letter_ndx % side))
+                     for letter_ndx in letter_cells],
+                    default=unreachable))
+            distances[letter] = distance_list
+
+        # revealed positions rarest letter first (checks skip the first)
+        self.reach = [
+            (position, distances[letter])
+            for position, letter in sorted(
+                [(position, letter)
+                 for position, letter in enumerate(self.pattern)
+                 if letter is not None],
+                key=lambda entry: len(cells_by_letter[entry[1]]))]
+        self.checks = [(position, distance_list)
+                       for position, distance_list in self.reach
+                       if position > 0]
+
+        # (position, letter) of the revealed letter in the fewest cells
+        known = [(len(cells_by_letter[letter]), position, letter)
+                 for position, letter in enumerate(self.pattern)
+                 if letter is not None]
+        self.anchor = min(known)[1:] if known else None
+
+        return
+
+    def letter_at(self, position: int) -> str:
+        """
+        Return the letter revealed at a position of the word.
+
+        :param position: position in the word (counting from zero)
+        :return: the letter or None if not revealed
+        """
+        letter = self.pattern[position]
+        return letter
+
+    def can_finish(self, cell_ndx: int, position: int) -> bool:
+        """
+        Determine if a path ending here could still reach the later letters.
+
+        :param cell_ndx: flat index of the cell at the end of the path
+        :param position: position in the word of that cell's letter
+        :return: false if some revealed letter is too far away
+        """
+        for later_position, distance_list in self.checks:
+            if later_position > position and \
+                    distance_list[cell_ndx] > later_position - position:
+                return False
+        return True
+
+    def may_start(self, cell_ndx: int, letter: str) -> bool:
+        """
+        Determine if a word fitting the hint could start from this cell.
+
+        :param cell_ndx: flat index of the cell
+        :param letter: the letter in the cell
+        :return: true if the cell is worth searching from
+        """
+        first_letter = self.pattern[0] if self.pattern else None
+        if first_letter is not None and letter != first_letter:
+            return False
+        return self.can_finish(cell_ndx, 0)
+
+    def can_begin(self, cell_ndx: int, position: int) -> bool:
+        """
+        Determine if a path walked back to here could reach earlier letters.
+
+        :param cell_ndx: flat index of the cell at the front of the path
+        :param position: position in the word of that cell's letter
+        :return: false if some revealed letter is too far away
+        """
+        for earlier_position, distance_list in self.reach:
+            if earlier_position < position and \
+                    distance_list[cell_ndx] > position - earlier_position:
+                return False
+        return True
+
+
+def bitmask_word_search(*, box: list, side: int, start_cell: CELL,
+                        word_length: int, word_hint: str,
+                        word_check=None, trie: dict = None):
+    """
+    Find the words of a given length starting from one cell.
+
+    The cells used so far are bits in a single integer and the path is a
+    list that is appended to going in and popped coming out, so nothing is
+    copied as the search goes deeper.
+
+    Note: this function is a generator returning a COMPACT_WORD each time.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :param start_cell: cell holding the first letter
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param word_check: function a word must pass to be reported (optional)
+    :param trie: prefix tree of the words wanted (optional)
+    :return:
+    """
+    cells, letters, used_mask = flatten_box(box)
+    hint = HintPattern(word_hint=word_hint, word_length=word_length,
+                       letters=letters, used_mask=used_mask, side=side)
+    start = start_cell.pos.row * side + start_cell.pos.col
+    if used_mask & (1 << start) or word_length < 1:
+        return
+    if not hint.may_start(start, letters[start]):
+        return
+
+    trie_node = None
+    if trie is not None:
+        trie_node = trie.get(letters[start])
+        if trie_node is None:
+            return
+
+    neighbor_list = neighbor_table(side)
+    path = [start]
+    word_letters = [letters[start]]
+
+    # only a box with holes can strand a path (checked from two letters on)
+    masks = neighbor_masks(side) if used_mask else None
+
+    def walk(current: int, visited: int, node: dict):
+        """
+        Extend the path from the current cell, one letter at a time.
+        """
+        depth = len(path)
+        if depth == word_length:
+            if node is not None and TRIE_END not in node:
+                return
+            word = ''.join(word_letters)
+            if word_check is None or word_check(word):
+                yield COMPACT_WORD(found_word=word, cells=bytes(path),
+                                   side=side)
+            return
+
+        # give up if too few unused cells are still connected to this one
+        letters_needed = word_length - depth
+        if masks is not None and letters_needed > 1 and \
+                count_reachable_cells(current, visited, masks,
+                                      letters_needed) < letters_needed:
+            return
+
+        hint_letter = hint.letter_at(depth)
+        for next_cell in neighbor_list[current]:
+            bit = 1 << next_cell
+            if visited & bit:
+                continue
+            letter = letters[next_cell]
+            if hint_letter and letter != hint_letter:
+                continue
+            if hint.checks and not hint.can_finish(next_cell, depth):
+                continue
+            next_node = None
+            if node is not None:
+                next_node = node.get(letter)
+                if next_node is None:
+                    continue
+            path.append(next_cell)
+            word_letters.append(letter)
+            yield from walk(next_cell, visited | bit, next_node)
+            path.pop()
+            word_letters.pop()
+        return
+
+    yield from walk(start, used_mask | (1 << start), trie_node)
+    return
+
+
+def anchored_word_search(*, box: list, side: int, anchor_cell: CELL,
+                         word_length: int, word_hint: str,
+                         word_check=None, tail_trie: dict = None,
+                         reverse_trie: dict = None):
+    """
+    Find the words of a given length through one cell of the hint's anchor.
+
+    The anchor is the rarest letter revealed by the hint.  The path is
+    walked on from the anchor cell to the last letter, and each way of
+    getting there is then walked back from the anchor cell to the first
+    letter, so only paths through a copy of the rarest letter are tried.
+    Each word has the anchor cell at the anchor position, so searching
+    from every cell holding the anchor letter finds each path once.
+
+    If pruning by prefix, the walk on follows a prefix tree of the words
+    from the anchor position to the end.  Once the end is reached, the
+    letters from there back to the anchor lead down the prefix tree of the
+    words spelled backwards, which the walk back then follows.
+
+    Note: this function is a generator returning a COMPACT_WORD each time.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :param anchor_cell: cell holding the anchor letter
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param word_check: function a word must pass to be reported (optional)
+    :param tail_trie: prefix tree of the words from the anchor position on
+        (optional, given along with reverse_trie)
+    :param reverse_trie: prefix tree of the words spelled backwards
+    :return:
+    """
+    cells, letters, used_mask = flatten_box(box)
+    hint = HintPattern(word_hint=word_hint, word_length=word_length,
+                       letters=letters, used_mask=used_mask, side=side)
+    if hint.anchor is None:
+        return
+    anchor_position, anchor_letter = hint.anchor
+    anchor = anchor_cell.pos.row * side + anchor_cell.pos.col
+    if used_mask & (1 << anchor) or letters[anchor] != anchor_letter:
+        return
+    if not hint.can_begin(anchor, anchor_position) or \
+            not hint.can_finish(anchor, anchor_position):
+        return
+
+    tail_node = None
+    if tail_trie is not None:
+        tail_node = tail_trie.get(anchor_letter)
+        if tail_node is None:
+            return
+
+    neighbor_list = neighbor_table(side)
+    tail_path = [anchor]
+    head_path = list()
+
+    def walk_on(current: int, visited: int, node: dict):
+        """
+        Extend the path toward the last letter, one letter at a time.
+        """
+        depth = anchor_position + len(tail_path)
+        if depth == word_length:
+            back_node = None
+            if reverse_trie is not None:
+                back_node = reverse_trie
+                for cell_ndx in reversed(tail_path):
+                    back_node = back_node.get(letters[cell_ndx])
+                    if back_node is None:
+                        return
+            yield from walk_back(anchor, visited, back_node)
+            return
+
+        hint_letter = hint.letter_at(depth)
+        for next_cell in neighbor_list[current]:
+            bit = 1 << next_cell
+            if visited & bit:
+                continue
+            letter = letters[next_cell]
+            if hint_letter and letter != hint_letter:
+                continue
+            if hint.checks and not hint.can_finish(next_cell, depth):
+                continue
+            next_node = None
+            if node is not None:
+                next_node = node.get(letter)
+                if next_node is None:
+                    continue
+            tail_path.append(next_cell)
+            yield from walk_on(next_cell, visited | bit, next_node)
+            tail_path.pop()
+        return
+
+    def walk_back(current: int, visited: int, node: dict):
+        """
+        Extend the path toward the first letter, one letter at a time.
+        """
+        position = anchor_position - len(head_path)
+        if position == 0:
+            if node is not None and TRIE_END not in node:
+                return
+            path = head_path[::-1] + tail_path
+            word = ''.join([letters[ndx] for ndx in path])
+            if word_check is None or word_check(word):
+                yield COMPACT_WORD(found_word=word, cells=bytes(path),
+                                   side=side)
+            return
+
+        hint_letter = hint.letter_at(position - 1)
+        for next_cell in neighbor_list[current]:
+            bit = 1 << next_cell
+            if visited & bit:
+                continue
+            letter = letters[next_cell]
+            if hint_letter and letter != hint_letter:
+                continue
+            if not hint.can_begin(next_cell, position - 1):
+                continue
+            next_node = None
+            if node is not None:
+                next_node = node.get(letter)
+                if next_node is None:
+                    continue
+            head_path.append(next_cell)
+            yield from walk_back(next_cell, visited | bit, next_node)
+            head_path.pop()
+        return
+
+    yield from walk_on(anchor, used_mask | (1 << anchor), tail_node)
+    return
+
+
+def trie_completions(node: dict, length: int):
+    """
+    List the ways a prefix tree node can be completed into a whole word.
+
+    Note: this function is a generator returning a string each time.
+
+    :param node: prefix tree node for the letters so far
+    :param length: number of letters still to be added
+    :return:
+    """
+    if length == 0:
+        if TRIE_END in node:
+            yield ''
+        return
+    for letter, next_node in node.items():
+        if letter == TRIE_END:
+            continue
+        for rest in trie_completions(next_node, length - 1):
+            yield letter + rest
+    return
+
+
+def half_paths(*, start: int, letters: list, used_mask: int, side: int,
+               positions: list, pattern: tuple, trie_node: dict):
+    """
+    Walk every path spelling a prefix tree branch from a starting cell.
+
+    The path visits one cell for each position listed, in order, and each
+    cell must hold any letter the hint reveals for that position.
+
+    Note: this function is a generator returning a tuple of (list of
+    cells, bitmask of those cells, prefix tree node reached) each time.
+
+    :param start: flat index of the first cell
+    :param letters: flat list of letters in the box
+    :param used_mask: bitmask of unusable cells
+    :param side: the size of one side of the puzzle
+    :param positions: positions in the word of each cell of the path
+    :param pattern: letter revealed at each position (see hint_pattern)
+    :param trie_node: prefix tree root the letters must follow
+    :return:
+    """
+    neighbor_list = neighbor_table(side)
+    if used_mask & (1 << start):
+        return
+    first_letter = pattern[positions[0]]
+    if first_letter is not None and letters[start] != first_letter:
+        return
+    node = trie_node.get(letters[start])
+    if node is None:
+        return
+    path = [start]
+
+    def extend(current: int, visited: int, current_node: dict):
+        """
+        Add the next cell to the half path.
+        """
+        depth = len(path)
+        if depth == len(positions):
+            yield list(path), visited & ~used_mask, current_node
+            return
+        hint_letter = pattern[positions[depth]]
+        for next_cell in neighbor_list[current]:
+            bit = 1 << next_cell
+            if visited & bit:
+                continue
+            letter = letters[next_cell]
+            if hint_letter is not None and letter != hint_letter:
+                continue
+            next_node = current_node.get(letter)
+            if next_node is None:
+                continue
+            path.append(next_cell)
+            yield from extend(next_cell, visited | bit, next_node)
+            path.pop()
+        return
+
+    yield from extend(start, used_mask | (1 << start), node)
+    return
+
+
+def suffix_half_index(*, letters: list, used_mask: int, side: int,
+                      word_length: int, word_hint: str,
+                      reverse_trie: dict) -> dict:
+    """
+    Index the second halves of the words, walked back from the last letter.
+
+    The second half runs from the middle position to the end of the word.
+    Each half found is filed under its middle cell and its letters (in
+    reading order).
+
+    :param letters: flat list of letters in the box
+    :param used_mask: bitmask of unusable cells
+    :param side: the size of one side of the puzzle
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param reverse_trie: prefix tree of the words spelled backwards
+    :return: dictionary of lists of (bitmask, cells in reading order)
+    """
+    pattern = hint_pattern(word_hint, word_length)
+    middle = (word_length - 1) // 2
+    positions = list(range(word_length - 1, middle - 1, -1))
+    index = dict()
+    for start in range(side * side):
+        for path, visited, node in half_paths(
+                start=start, letters=letters, used_mask=used_mask, side=side,
+                positions=positions, pattern=pattern,
+                trie_node=reverse_trie):
+            path.reverse()
+            key = (path[0], ''.join([letters[ndx] for ndx in path]))
+            index.setdefault(key, list()).append((visited, path))
+    return index
+
+
+def get_suffix_half_index(*, letters: list, used_mask: int, side: int,
+                          word_length: int, word_hint: str,
+                          reverse_trie: dict,
+                          lexicon_version: int = None) -> dict:
+    """
+    Return the index of second halves, reusing the last one if it fits.
+
+    Every starting cell searched for the same box, length and hint needs
+    the same index, so each process builds it once.  The index is only
+    reused for the same version of the lexicon, so without a version it
+    is built every time.
+
+    :param letters: flat list of letters in the box
+    :param used_mask: bitmask of unusable cells
+    :param side: the size of one side of the puzzle
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param reverse_trie: prefix tree of the words spelled backwards
+    :param lexicon_version: version of the lexicon the tree comes from
+    :return: dictionary of lists of (bitmask, cells in reading order)
+    """
+    if lexicon_version is None:
+        suffix_index = suffix_half_index(
+            letters=letters, used_mask=used_mask, side=side,
+            word_length=word_length, word_hint=word_hint,
+            reverse_trie=reverse_trie)
+        return suffix_index
+
+    key = (tuple(letters), used_mask, side, word_length,
+           hint_pattern(word_hint, word_length), lexicon_version)
+    if key not in _suffix_index_cache:
+        _suffix_index_cache.clear()
+        _suffix_index_cache[key] = suffix_half_index(
+            letters=letters, used_mask=used_mask, side=side,
+            word_length=word_length, word_hint=word_hint,
+            reverse_trie=reverse_trie)
+    suffix_index = _suffix_index_cache[key]
+    return suffix_index
+
+
+def meet_in_middle_word_search(*, box: list, side: int, start_cell: CELL,
+                               word_length: int, word_hint: str,
+                               trie: dict, reverse_trie: dict,
+                               word_check=None, suffix_index: dict = None,
+                               lexicon_version: int = None):
+    """
+    Find the long words starting from one cell by joining two half paths.
+
+    The first half of each word is walked forward from the starting cell
+    to the middle position.  The words in the prefix tree that begin with
+    those letters name the second halves wanted, which are looked up in
+    an index of the second halves walked back from the last letter.  Two
+    halves are joined when they meet on the same middle cell and share no
+    other cell.
+
+    Note: this function is a generator returning a COMPACT_WORD each time.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :param start_cell: cell holding the first letter
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param trie: prefix tree of the words wanted
+    :param reverse_trie: prefix tree of the words wanted spelled backwards
+    :param word_check: function a word must pass to be reported (optional)
+    :param suffix_index: second halves from suffix_half_index (found with
+        get_suffix_half_index if not given)
+    :param lexicon_version: version of the lexicon the trees come from
+        (lets the second halves be reused from one start cell to the next)
+    :return:
+    """
+    cells, letters, used_mask = flatten_box(box)
+    if word_length < 2:
+        return
+    if suffix_index is None:
+        suffix_index = get_suffix_half_index(
+            letters=letters, used_mask=used_mask, side=side,
+            word_length=word_length, word_hint=word_hint,
+            reverse_trie=reverse_trie, lexicon_version=lexicon_version)
+
+    pattern = hint_pattern(word_hint, word_length)
+    middle = (word_length - 1) // 2
+    start = start_cell.pos.row * side + start_cell.pos.col
+    for path, visited, node in half_paths(
+            start=start, letters=letters, used_mask=used_mask, side=side,
+            positions=list(range(middle + 1)), pattern=pattern,
+            trie_node=trie):
+        middle_cell = path[-1]
+        middle_bit = 1 << middle_cell
+        first_half = ''.join([letters[ndx] for ndx in path])
+        for rest in trie_completions(node, word_length - middle - 1):
+            halves = suffix_index.get(
+                (middle_cell, letters[middle_cell] + rest))
+            if not halves:
+                continue
+            word = first_half + rest
+            if word_check is not None and not word_check(word):
+                continue
+            for second_visited, second_path in halves:
+                if visited & second_visited != middle_bit:
+                    continue
+                yield COMPACT_WORD(found_word=word,
+                                   cells=bytes(path + second_path[1:]),
+                                   side=side)
+    return
+
+
+def multi_length_word_search(*, box: list, side: int, start_cell: CELL,
+                             targets: list, word_check=None,
+                             tries: dict = None):
+    """
+    Find the words for several answers in one walk from one cell.
+
+    Each answer wanted (target) has its own length and hint.  A path is
+    extended as long as it could still become a word for at least one of
+    the targets, so the paths shared by several targets are walked once.
+
+    Note: this function is a generator returning a tuple of
+    (ANSWER_TARGET, COMPACT_WORD) each time.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :param start_cell: cell holding the first letter
+    :param targets: list of ANSWER_TARGET
+    :param word_check: function a word must pass to be reported (optional)
+    :param tries: prefix tree of the words wanted keyed by length (optional)
+    :return:
+    """
+    cells, letters, used_mask = flatten_box(box)
+    start = start_cell.pos.row * side + start_cell.pos.col
+    if used_mask & (1 << start):
+        return
+
+    # targets still possible for the path so far, with the prefix tree
+    # node for each (None if not pruning by prefix)
+    hints = list()
+    alive = list()
+    for ndx, target in enumerate(targets):
+        hint = HintPattern(word_hint=target.word_hint,
+                           word_length=target.word_length,
+                           letters=letters, used_mask=used_mask, side=side)
+        hints.append(hint)
+        if target.word_length < 1 or not hint.may_start(start,
+                                                        letters[start]):
+            continue
+        node = None
+        if tries and tries.get(target.word_length) is not None:
+            node = tries[target.word_length].get(letters[start])
+            if node is None:
+                continue
+        alive.append((ndx, node))
+    if not alive:
+        return
+
+    neighbor_list = neighbor_table(side)
+    masks = neighbor_masks(side) if used_mask else None
+    path = [start]
+    word_letters = [letters[start]]
+
+    def walk(current: int, visited: int, targets_alive: list):
+        """
+        Report the targets complete here and extend the path for the rest.
+        """
+        depth = len(path)
+        complete = list()
+        still_going = list()
+        for ndx, node in targets_alive:
+            if targets[ndx].word_length > depth:
+                still_going.append((ndx, node))
+            elif node is None or TRIE_END in node:
+                complete.append(ndx)
+
+        # the same word may be the answer to more than one target
+        if complete:
+            word = ''.join(word_letters)
+            if word_check is None or word_check(word):
+                found_word = COMPACT_WORD(found_word=word, cells=bytes(path),
+                                          side=side)
+                for ndx in complete:
+                    yield targets[ndx], found_word
+        if not still_going:
+            return
+
+        # give up if too few unused cells are still connected to this one
+        letters_needed = min(targets[ndx].word_length
+                             for ndx, node in still_going) - depth
+        if masks is not None and letters_needed > 1 and \
+                count_reachable_cells(current, visited, masks,
+                                      letters_needed) < letters_needed:
+            return
+
+        for next_cell in neighbor_list[current]:
+            bit = 1 << next_cell
+            if visited & bit:
+                continue
+            letter = letters[next_cell]
+            next_alive = list()
+            for ndx, node in still_going:
+                hint_letter = hints[ndx].letter_at(depth)
+                if hint_letter and letter != hint_letter:
+                    continue
+                if hints[ndx].checks and \
+                        not hints[ndx].can_finish(next_cell, depth):
+                    continue
+                next_node = None
+                if node is not None:
+                    next_node = node.get(letter)
+                    if next_node is None:
+                        continue
+                next_alive.append((ndx, next_node))
+            if not next_alive:
+                continue
+            path.append(next_cell)
+            word_letters.append(letter)
+            yield from walk(next_cell, visited | bit, next_alive)
+            path.pop()
+            word_letters.pop()
+        return
+
+    yield from walk(start, used_mask | (1 << start), alive)
+    return
+
+
+class IterativeWordSearch:
+    """
+    Find the words of a given length from one cell without recursion.
+
+    The depth first search is driven from an explicit stack allocated once
+    for the word length: the cell chosen at each depth, the next neighbor
+    to try at each depth and the prefix tree node at each depth.  Memory
+    use does not grow with the number of paths explored.
+
+    Iterating over an instance returns each COMPACT_WORD in the same order
+    as bitmask_word_search.
+    """
+
+    def __init__(self, *, box: list, side: int, start_cell: CELL,
+                 word_length: int, word_hint: str,
+                 word_check=None, trie: dict = None):
+        """
+        Prepare the stack to search from the starting cell.
+
+        :param box: list of lists of CELL
+        :param side: the size of one side of the puzzle
+        :param start_cell: cell holding the first letter
+        :param word_length: number of letters wanted
+        :param word_hint: letters the word must have (see hint_pattern)
+        :param word_check: function a word must pass to be reported
+        :param trie: prefix tree of the words wanted (optional)
+        """
+        cells, letters, used_mask = flatten_box(box)
+        self.side = side
+        self.letters = letters
+        self.neighbor_list = neighbor_table(side)
+
+        # only a box with holes can strand a path
+        self.masks = neighbor_masks(side) if used_mask else None
+        self.word_length = word_length
+        self.hint = HintPattern(word_hint=word_hint, word_length=word_length,
+                                letters=letters, used_mask=used_mask,
+                                side=side)
+        self.word_check = word_check
+        self.use_trie = trie is not None
+
+        # the stack - one entry per letter of the word
+        self.path = [0] * word_length
+        self.next_choice = [0] * word_length
+        self.nodes = [None] * word_length
+
+        # depth of the top of the stack (-1 when the search is finished)
+        self.depth = -1
+        self.visited = used_mask
+
+        # push the starting cell if it can begin a word
+        start = start_cell.pos.row * side + start_cell.pos.col
+        start_node = None
+        if self.use_trie:
+            start_node = trie.get(letters[start])
+        if word_length > 0 and not used_mask & (1 << start) and \
+                self.hint.may_start(start, letters[start]) and \
+                (not self.use_trie or start_node is not None):
+            self.path[0] = start
+            self.nodes[0] = start_node
+            self.visited |= 1 << start
+            self.depth = 0
+
+        return
+
+    def __iter__(self):
+        """
+        The search is its own iterator.
+
+        :return:
+        """
+        return self
+
+    def __next__(self) -> COMPACT_WORD:
+        """
+        Resume the search until the next word is found.
+
+        :return: the next word found
+        """
+        found_word = self.next_word()
+        if found_word is None:
+            raise StopIteration
+        return found_word
+
+    def next_word(self) -> COMPACT_WORD:
+        """
+        Resume the search until the next word is found.
+
+        :return: the next word found or None if the search is finished
+        """
+        path = self.path
+        next_choice = self.next_choice
+        nodes = self.nodes
+        letters = self.letters
+        last_depth = self.word_length - 1
+
+        while self.depth >= 0:
+            depth = self.depth
+
+            # a full path - report it and back up one letter
+            if depth == last_depth:
+                word = ''.join([letters[ndx] for ndx in path])
+                keep = not self.use_trie or TRIE_END in nodes[depth]
+                if keep and self.word_check is not None:
+                    keep = self.word_check(word)
+                self.pop()
+                if keep:
+                    return COMPACT_WORD(found_word=word, cells=bytes(path),
+                                        side=self.side)
+                continue
+
+            # on first reaching this depth, give up if too few unused cells
+            # are still connected to this one
+            letters_needed = last_depth - depth
+            if next_choice[depth] == 0 and self.masks is not None and \
+                    letters_needed > 1 and \
+                    count_reachable_cells(path[depth], self.visited,
+                                          self.masks, letters_needed) < \
+                    letters_needed:
+                self.pop()
+                continue
+
+            # otherwise try the remaining neighbors at this depth
+            neighbors = self.neighbor_list[path[depth]]
+            hint_letter = self.hint.letter_at(depth + 1)
+            hint_checks = self.hint.checks
+            choice = next_choice[depth]
+            pushed = False
+            while choice < len(neighbors):
+                next_cell = neighbors[choice]
+                choice += 1
+                if self.visited & (1 << next_cell):
+                    continue
+                letter = letters[next_cell]
+                if hint_letter and letter != hint_letter:
+                    continue
+                if hint_checks and \
+                        not self.hint.can_finish(next_cell, depth + 1):
+                    continue
+                next_node = None
+                if self.use_trie:
+                    next_node = nodes[depth].get(letter)
+                    if next_node is None:
+                        continue
+                next_choice[depth] = choice
+                self.push(next_cell, next_node)
+                pushed = True
+                break
+
+            # no neighbors left - back up one letter
+            if not pushed:
+                self.pop()
+
+        return None
+
+    def push(self, cell_ndx: int, node: dict):
+        """
+        Add a cell to the top of the stack.
+
+        :param cell_ndx: flat index of the cell
+        :param node: prefix tree node after adding the cell's letter
+        :return:
+        """
+        depth = self.depth + 1
+        self.path[depth] = cell_ndx
+        self.next_choice[depth] = 0
+        self.nodes[depth] = node
+        self.visited |= 1 << cell_ndx
+        self.depth = depth
+        return
+
+    def pop(self):
+        """
+        Remove the cell at the top of the stack.
+
+        :return:
+        """
+        self.visited &= ~(1 << self.path[self.depth])
+        self.depth -= 1
+        return
+
+
+def available_letter_counts(letters: list, used_mask: int) -> Counter:
+    """
+    Count each letter still available in the box.
+
+    :param letters: flat list of letters
+    :param used_mask: bitmask of unusable cells
+    :return: count of each letter
+    """
+    counts = Counter(letter for ndx, letter in enumerate(letters)
+                     if not used_mask & (1 << ndx))
+    return counts
+
+
+def fitting_words(words: list, letter_counts: Counter, word_hint: str):
+    """
+    Select the words that match the hint and can be spelled from the box.
+
+    A word fits if the box holds at least as many of each letter as the
+    word uses.  Whether the letters touch is not checked here.
+
+    Note: this function is a generator returning a word each time.
+
+    :param words: words of the length wanted
+    :param letter_counts: count of each letter available in the box
+    :param word_hint: letters the word must have (see hint_pattern)
+    :return:
+    """
+    for word in hint_matching_words(words, word_hint):
+        if all(letter_counts[letter] >= word.count(letter)
+               for letter in set(word)):
+            yield word
+    return
+
+
+def hint_matching_words(words: list, word_hint: str):
+    """
+    Select the words that have the letters revealed by the hint.
+
+    Note: this function is a generator returning a word each time.
+
+    :param words: words of the length wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :return:
+    """
+    # letters revealed by the hint, by position, for each word length
+    revealed_by_length = dict()
+    for word in words:
+        revealed = revealed_by_length.get(len(word))
+        if revealed is None:
+            revealed = tuple(
+                (ndx, letter) for ndx, letter in enumerate(
+                    hint_pattern(word_hint, len(word)))
+                if letter is not None)
+            revealed_by_length[len(word)] = revealed
+        if revealed and any(word[ndx] != letter for ndx, letter in revealed):
+            continue
+        yield word
+    return
+
+
+def letter_masks(letters: list, used_mask: int) -> dict:
+    """
+    Index the cells still available by letter.
+
+    :param letters: flat list of letters
+    :param used_mask: bitmask of unusable cells
+    :return: bitmask of the cells holding each letter, keyed by letter
+    """
+    masks = dict()
+    for ndx, letter in enumerate(letters):
+        if not used_mask & (1 << ndx):
+            masks[letter] = masks.get(letter, 0) | (1 << ndx)
+    return masks
+
+
+def trace_word_paths(word: str, letters: list, side: int, used_mask: int,
+                     start_cells: list = None, cells_by_letter: dict = None):
+    """
+    Find every way the word can be traced through touching cells.
+
+    The cells holding each letter of the word are looked up once as a
+    bitmask, so each step of the path needs a single test per neighbor.
+
+    Note: this function is a generator returning a list of flat cell
+    indexes each time.
+
+    :param word: the word to trace
+    :param letters: flat list of letters
+    :param side: the size of one side of the puzzle
+    :param used_mask: bitmask of unusable cells
+    :param start_cells: cells holding the first letter (found if omitted)
+    :param cells_by_letter: as built by letter_masks (built if omitted)
+    :return:
+    """
+    if not word:
+        return
+    if cells_by_letter is None:
+        cells_by_letter = letter_masks(letters, used_mask)
+
+    # cells that can hold each letter of the word in turn
+    word_masks = [cells_by_letter.get(letter, 0) for letter in word]
+    if not all(word_masks):
+        return
+    neighbor_list = neighbor_table(side)
+    if start_cells is None:
+        start_cells = list()
+        start_mask = word_masks[0]
+        while start_mask:
+            low_bit = start_mask & -start_mask
+            start_cells.append(low_bit.bit_length() - 1)
+            start_mask ^= low_bit
+    path = list()
+
+    def extend(current: int, visited: int):
+        """
+        Add the next letter of the word to the path.
+        """
+        path.append(current)
+        if len(path) == len(word):
+            yield list(path)
+        else:
+            next_mask = word_masks[len(path)] & ~visited
+            for next_cell in neighbor_list[current]:
+                if next_mask & (1 << next_cell):
+                    yield from extend(next_cell, visited | (1 << next_cell))
+        path.pop()
+        return
+
+    for start in start_cells:
+        if word_masks[0] & (1 << start):
+            yield from extend(start, used_mask | (1 << start))
+    return
+
+
+def dictionary_word_search(*, box: list, side: int, word_length: int,
+                           word_hint: str, words: list, word_check=None):
+    """
+    Find the words of a given length by tracing lexicon words on the box.
+
+    Note: this function is a generator returning a COMPACT_WORD each time.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param words: lexicon words of the length wanted
+    :param word_check: function a word must pass to be reported (optional)
+    :return:
+    """
+    cells, letters, used_mask = flatten_box(box)
+    letter_counts = available_letter_counts(letters, used_mask)
+    cells_by_letter = letter_masks(letters, used_mask)
+
+    for word in fitting_words(words, letter_counts, word_hint):
+        if len(word) != word_length:
+            continue
+        if word_check is not None and not word_check(word):
+            continue
+        for path in trace_word_paths(word, letters, side, used_mask,
+                                     cells_by_letter=cells_by_letter):
+            yield COMPACT_WORD(found_word=word, cells=bytes(path), side=side)
+    return
+
+# EOF
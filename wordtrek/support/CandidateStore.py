@@ -0,0 +1,278 @@
+"""
+CandidateStore.py - Hold the possible answers found, grouped by word.
+
+Each word is kept once, with a list of the paths through the box that
+spell it.  A path is stored as a string of bytes, one flat cell index
+(row * side + col) per letter, and is offered as a COMPACT_WORD, whose
+letter locations are only built when the answer is shown.
+"""
+
+from wordtrek.support.constants import FOUND_WORD, COMPACT_WORD, \
+    END_QUEUE_WORD
+
+
+class CandidateStoreClass:
+    """
+    Possible answers keyed by word, each with its path variants.
+
+    The words are offered in the order they were first found.  Asking for
+    the next unique word or the next variant of the same word takes one
+    step, and no path is thrown away while hunting for another.  If a
+    source of words is given (a lazy search), words are pulled from it
+    only when the words already stored have all been offered.
+    """
+
+    def __init__(self, side: int, word_source=None):
+        """
+        Prepare an empty store.
+
+        :param side: the size of one side of the puzzle
+        :param word_source: iterator of COMPACT_WORD still to be stored
+        """
+        self.side = side
+        self.word_source = word_source
+
+        # words in the order first found
+        self.words = list()
+
+        # paths for each word, each path a bytes of flat cell indexes
+        self.paths = dict()
+
+        # position in self.words of the next unique word to offer
+        self.next_word_ndx = 0
+
+        # position in self.paths of the next variant to offer, by word
+        self.next_variant_ndx = dict()
+
+        # total number of paths stored
+        self.path_count = 0
+
+        return
+
+    def __len__(self) -> int:
+        """
+        Report the number of paths stored.
+
+        :return:
+        """
+        return self.path_count
+
+    def word_count(self) -> int:
+        """
+        Report the number of different words stored.
+
+        :return:
+        """
+        return len(self.words)
+
+    def add(self, word_info: FOUND_WORD):
+        """
+        Store another path for a word.
+
+        A path already stored for the word is not stored again.
+
+        :param word_info: COMPACT_WORD (or FOUND_WORD)
+        :return:
+        """
+        word = word_info.found_word
+        if isinstance(word_info, COMPACT_WORD) and word_info.side == self.side:
+            path = word_info.cells
+        else:
+            path = bytes(loc.letter_loc.row * self.side + loc.letter_loc.col
+                         for loc in word_info.letters_loc)
+        if word not in self.paths:
+            self.words.append(word)
+            self.paths[word] = list()
+        elif path in self.paths[word]:
+            return
+        self.paths[word].append(path)
+        self.path_count += 1
+        return
+
+    def extend(self, word_infos):
+        """
+        Store every path from a list or iterator of COMPACT_WORD.
+
+        :param word_infos:
+        :return:
+        """
+        for word_info in word_infos:
+            self.add(word_info)
+        return
+
+    def snapshot(self):
+        """
+        Copy the words and paths stored, without any lazy source.
+
+        :return: a new CandidateStoreClass offering the words from the start
+        """
+        copy = CandidateStoreClass(self.side)
+        copy.words = list(self.words)
+        copy.paths = dict(
+            (word, list(paths)) for word, paths in self.paths.items())
+        copy.path_count = self.path_count
+        return copy
+
+    def discard_paths(self, changed_cells: set) -> int:
+        """
+        Drop the paths through cells whose letters have changed.
+
+        A word left with no paths is dropped too, and the words are offered
+        again from the beginning.
+
+        :param changed_cells: flat indexes of the cells changed
+        :return: number of paths dropped
+        """
+        dropped = 0
+        for word in self.words:
+            paths = [path for path in self.paths[word]
+                     if changed_cells.isdisjoint(path)]
+            dropped += len(self.paths[word]) - len(paths)
+            self.paths[word] = paths
+        self.words = [word for word in self.words if self.paths[word]]
+        self.paths = dict((word, self.paths[word]) for word in self.words)
+        self.path_count -= dropped
+        self.restart()
+        return dropped
+
+    def rank(self, score_func, path_limit: int) -> int:
+        """
+        Put the words and paths with the highest scores first.
+
+        Each path is scored in turn until the limit is reached.  A word is
+        ranked by the best of its paths.  Paths not scored follow the ones
+        scored, and ties keep the order the paths were found in.  The words
+        are offered again from the beginning.
+
+        :param score_func: function giving the score of a path (bytes)
+        :param path_limit: most paths to score
+        :return: number of paths scored
+        """
+        scores = dict()
+        for word in self.words:
+            for path in self.paths[word]:
+                if len(scores) >= path_limit:
+                    break
+                scores[path] = score_func(path)
+
+        for word in self.words:
+            self.paths[word].sort(key=lambda path: -scores.get(path, -1))
+        self.words.sort(key=lambda word: -scores.get(self.paths[word][0], -1))
+        self.restart()
+        return len(scores)
+
+    def drain(self):
+        """
+        Offer every path stored and then every path from the lazy source.
+
+        The paths from the source are stored as they are offered, and any
+        path already stored is not offered again.
+
+        :return: generator of COMPACT_WORD
+        """
+        for word in list(self.words):
+            for path in list(self.paths[word]):
+                yield self.make_found_word(word, path)
+        while self.word_source is not None:
+            word_info = next(self.word_source, None)
+            if word_info is None:
+                self.word_source = None
+                break
+            path_count = self.path_count
+            self.add(word_info)
+            if self.path_count > path_count:
+                yield word_info
+        return
+
+    def set_source(self, word_source):
+        """
+        Provide (or replace) the lazy source of words still to be stored.
+
+        :param word_source: iterator of COMPACT_WORD
+        :return:
+        """
+        self.close_source()
+        self.word_source = word_source
+        return
+
+    def close_source(self):
+        """
+        Stop any lazy source of words.
+
+        :return:
+        """
+        if self.word_source is not None:
+            if hasattr(self.word_source, 'close'):
+                self.word_source.close()
+            self.word_source = None
+        return
+
+    def pull_from_source(self) -> bool:
+        """
+        Store the next word from the lazy source.
+
+        :return: false if there is no source or it has run out
+        """
+        if self.word_source is None:
+            return False
+        word_info = next(self.word_source, None)
+        if word_info is None:
+            self.word_source = None
+            return False
+        self.add(word_info)
+        return True
+
+    def restart(self):
+        """
+        Offer the words again from the beginning.
+
+        :return:
+        """
+        self.next_word_ndx = 0
+        self.next_variant_ndx = dict()
+        return
+
+    def next_unique(self) -> COMPACT_WORD:
+        """
+        Offer the first path of the next word not yet offered.
+
+        :return: the word or END_QUEUE_WORD if there are no more
+        """
+        while self.next_word_ndx >= len(self.words):
+            if not self.pull_from_source():
+                return END_QUEUE_WORD
+        word = self.words[self.next_word_ndx]
+        self.next_word_ndx += 1
+        self.next_variant_ndx[word] = 1
+        found_word = self.make_found_word(word, self.paths[word][0])
+        return found_word
+
+    def next_variant(self, word: str) -> COMPACT_WORD:
+        """
+        Offer the next path of a word already offered.
+
+        :param word:
+        :return: the word or END_QUEUE_WORD if there are no more paths
+        """
+        if word not in self.paths:
+            return END_QUEUE_WORD
+        variant_ndx = self.next_variant_ndx.get(word, 0)
+        while variant_ndx >= len(self.paths[word]):
+            if not self.pull_from_source():
+                return END_QUEUE_WORD
+        self.next_variant_ndx[word] = variant_ndx + 1
+        found_word = self.make_found_word(word, self.paths[word][variant_ndx])
+        return found_word
+
+    def make_found_word(self, word: str, path: bytes) -> COMPACT_WORD:
+        """
+        Turn a stored path back into a found word.
+
+        :param word:
+        :param path: flat cell index of each letter
+        :return:
+        """
+        found_word = COMPACT_WORD(found_word=word, cells=path, side=self.side)
+        return found_word
+
+# EOF
@@ -1,12 +1,16 @@
 """
 GetAWord.py - Look for words in the database or create a new list.
 """
-from itertools import permutations
+from collections import Counter
+from functools import partial
 from logging import getLogger, debug, error
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from wordtrek.support.PuzzleboxParallel import PuzzleBoxParallelClass
+from wordtrek.support.PuzzleSolver import PuzzleSolverClass
+from wordtrek.support.WordTracer import WordTracerClass
 # from . import Puzzlebox
 from wordtrek.models import Puzzle, Answer, AnswerLetter, \
     SOLVE_STATUS_SOLVED, \
@@ -14,7 +18,13 @@ from wordtrek.models import Puzzle, Answer, AnswerLetter, \
 from wordtrek.support.constants import FOUND_WORD, CELL_POSITION, \
     RESET_SOLVED_STATUS, TURN_DICTIONARY_ON, VOWEL_CHECK, DICTIONARY_CHECK,\
     WORD_SELECTION, RESET_PUZZLE, FLIP_VOWEL_CHECK, FLIP_DICTIONARY_CHECK, \
-    MAX_CORE_LIMIT
+    MAX_CORE_LIMIT, PREFIX_CHECK, FLIP_PREFIX_CHECK, ENGINE_CHOICE, \
+    SEARCH_ENGINE, LAZY_SEARCH, FLIP_LAZY_SEARCH, ALL_LENGTHS, \
+    FLIP_ALL_LENGTHS, ANSWER_TARGET, LONG_WORD_LENGTH, \
+    DEFAULT_LONG_WORD_LENGTH, LOOKAHEAD, FLIP_LOOKAHEAD, CELL_VACANT, \
+    KNOWN_ANSWERS, FLIP_KNOWN_ANSWERS, SPECULATE, FLIP_SPECULATE, \
+    END_QUEUE_MARKER, NEXT_SEARCH_ENGINE, RAISE_LONG_WORD_LENGTH, \
+    LOWER_LONG_WORD_LENGTH, MAX_WORD_SIZE
 
 __author__ = 'Travis Risner'
 __project__ = "WordTrekSolver"
@@ -57,6 +67,14 @@ class GetAWordClass:
         self.reset_options[RESET_PUZZLE] = False
         self.reset_options[VOWEL_CHECK] = True
         self.reset_options[DICTIONARY_CHECK] = True
+        self.reset_options[PREFIX_CHECK] = True
+        self.reset_options[LAZY_SEARCH] = True
+        self.reset_options[ALL_LENGTHS] = True
+        self.reset_options[LOOKAHEAD] = False
+        self.reset_options[KNOWN_ANSWERS] = True
+        self.reset_options[SPECULATE] = True
+        self.reset_options[ENGINE_CHOICE] = SEARCH_ENGINE.iterative
+        self.reset_options[LONG_WORD_LENGTH] = DEFAULT_LONG_WORD_LENGTH
 
         # internal source of words and valid values for indicator
         self.word_source = None
@@ -67,6 +85,15 @@ class GetAWordClass:
         # handling of kind of work selection desired (set to default)
         self.word_selection_kind = WORD_SELECTION.unique_word
 
+        # status and text of each answer before its word was accepted, in
+        # case the answer is taken back, keyed by answer id
+        self.prior_answers = dict()
+
+        # open answers to search ahead for while the current answer is
+        # worked on, the most likely to be wanted next first (looked up
+        # once for each answer worked on)
+        self.speculation_targets = None
+
         # other internal variables
         self.retrieve_word = None
         self.core_limit = MAX_CORE_LIMIT
@@ -93,14 +120,69 @@ class GetAWordClass:
         elif animal_id == self.curr_animal_id and \
                 puzzle_id == self.curr_puzzle_id:
             self.curr_answer_id = answer_id
+            self.speculation_targets = None
             next_word = self.start_new_word_search()
         else:
             self.curr_animal_id = animal_id
             self.curr_puzzle_id = puzzle_id
             self.curr_answer_id = answer_id
+            self.speculation_targets = None
             next_word = self.start_new_puzzle_search()
+        self.speculate_on(next_word)
         return next_word
 
+    def speculate_on(self, next_word: FOUND_WORD):
+        """
+        Search ahead for the next open answer, as if the word shown is taken.
+
+        The search runs in the background while the word is shown, on the
+        box left if it is accepted.  If all the open answers are searched
+        at once, they are all searched ahead, unless their words are
+        already kept in answer buckets (which follow the box as words are
+        removed).  Showing another word stops the search.  Done only if
+        the speculate option is on.
+
+        (Internal call from get_next_word)
+
+        :param next_word: the word about to be shown
+        :return:
+        """
+        if not self.reset_options[SPECULATE] or not self.pb or \
+                next_word.found_word == END_QUEUE_MARKER:
+            return
+
+        if self.speculation_targets is None:
+            self.speculation_targets = self.list_speculation_targets()
+        targets = self.speculation_targets
+        if not targets:
+            return
+
+        if not self.reset_options[ALL_LENGTHS] or len(targets) == 1:
+            targets = targets[:1]
+        elif all(target in self.pb.answer_buckets for target in targets):
+            return
+        self.pb.speculate(next_word, targets)
+        return
+
+    def list_speculation_targets(self) -> list:
+        """
+        List the other answers still open, starting after the current one.
+
+        (Internal call from speculate_on)
+
+        :return: list of ANSWER_TARGET
+        """
+        open_answers = list(Answer.objects.filter(
+            puzzle_id__exact=self.curr_puzzle_id).exclude(
+            answer_status=Answer.SOLVED).order_by('answer_sequence'))
+        answer_ids = [answer.id for answer in open_answers]
+        if self.curr_answer_id in answer_ids:
+            answer_ndx = answer_ids.index(self.curr_answer_id)
+            open_answers = open_answers[answer_ndx + 1:] + \
+                open_answers[:answer_ndx]
+        targets = [self.get_answer_target(answer) for answer in open_answers]
+        return targets
+
     def get_next_word_from_box(self, kind: WORD_SELECTION) -> FOUND_WORD:
         """
         Get next word from a (already initialized) source.
@@ -120,11 +202,49 @@ class GetAWordClass:
         :return: the first word found
         """
 
-        # for now, treat it like a new puzzle
-        first_word = self.start_new_puzzle_search()
+        # without a box for this puzzle, or with a box that no longer
+        # matches the working board saved (the answers have been edited
+        # since), treat it like a new puzzle
+        if not self.pb or not self.box_is_current():
+            first_word = self.start_new_puzzle_search()
+            return first_word
 
+        # the box already has the letters of the solved answers removed
+        open_targets = list()
+        current_target = None
+        answer_set = Answer.objects.filter(
+            puzzle_id__exact=self.curr_puzzle_id)
+        for answer in answer_set:
+            if answer.id == self.curr_answer_id:
+                current_target = self.get_answer_target(answer)
+                open_targets.append(current_target)
+            elif answer.answer_status != Answer.SOLVED:
+                open_targets.append(self.get_answer_target(answer))
+        if current_target is None:
+            first_word = self.start_new_puzzle_search()
+            return first_word
+
+        first_word = self.search_box(open_targets, current_target)
         return first_word
 
+    def box_is_current(self) -> bool:
+        """
+        Check that the box in hand matches the working board saved.
+
+        (Internal call from start_new_word_search)
+
+        :return: false if the board was cleared or changed elsewhere
+        """
+        working_letters = Puzzle.objects.filter(
+            pk=self.curr_puzzle_id).values_list(
+            'working_characters', flat=True).first()
+        letters = ''.join(letter for row in self.pb.get_working_box_letters()
+                          for letter in row)
+        if working_letters != letters:
+            debug(f'Box for puzzle {self.curr_puzzle_id} is out of date')
+            return False
+        return True
+
     def start_new_puzzle_search(self) -> FOUND_WORD:
         """
         Initialize internals for a new puzzle search and return the first word.
@@ -136,35 +256,314 @@ class GetAWordClass:
 
         # retrieve puzzle and answer info from database
         puzzle = get_object_or_404(Puzzle, pk=self.curr_puzzle_id)
+        answer_set = Answer.objects.filter(
+            puzzle_id__exact=self.curr_puzzle_id)
 
-        # set up a new puzzle box
+        # set up a new puzzle box, starting from the working board saved
+        # with the puzzle if it is still good
+        working_letters = self.get_saved_board(puzzle, answer_set)
         self.word_source = self.word_source_puzzle_box
+        if self.pb:
+            self.pb.cancel_speculation()
         self.pb = PuzzleBoxParallelClass(
             box_size=puzzle.puzzle_size,
-            box_letters=puzzle.puzzle_characters.strip().upper(),
+            box_letters=working_letters or
+            puzzle.puzzle_characters.strip().upper(),
             reset_options=self.reset_options,
         )
 
-        # remove any previous answers
-        answer_set = Answer.objects.filter(
-            puzzle_id__exact=self.curr_puzzle_id)
+        # remove any previous answers (unless already removed from the
+        # board saved), noting the answers still open
+        open_targets = list()
+        current_target = None
         for answer in answer_set:
             if answer.id == self.curr_answer_id:
-                self.word_length = answer.answer_length
-                if answer.answer_status == Answer.HINT:
-                    self.word_hint = answer.answer_text.upper()
-                else:
-                    self.word_hint = ''
+                current_target = self.get_answer_target(answer)
+                open_targets.append(current_target)
             elif answer.answer_status == Answer.SOLVED:
-                self.remove_answer_letters(answer.id)
+                if working_letters is None:
+                    try:
+                        self.remove_answer_letters(answer.id)
+                    except ValueError as ex:
+                        error(f'Letters of answer {answer.id} not removed: '
+                              f'{ex}')
+            else:
+                open_targets.append(self.get_answer_target(answer))
+        if working_letters is None:
+            self.save_working_board(puzzle.id)
 
-        self.pb.build_word_list_from_box(self.word_length, self.word_hint)
+        next_word = self.search_box(open_targets, current_target)
+        return next_word
+
+    def search_box(self, open_targets: list, current_target: ANSWER_TARGET) \
+            -> FOUND_WORD:
+        """
+        Search the box as it stands for the current answer.
+
+        (Internal call from start_new_word_search and start_new_puzzle_search)
+
+        :param open_targets: ANSWER_TARGET of every answer still open
+        :param current_target: the answer the words are wanted for
+        :return: the first word found
+        """
+        self.word_length = current_target.word_length
+        self.word_hint = current_target.word_hint
+        self.pb.settle_speculation()
+        self.pb.clear_word_list()
+
+        # use the words found with those of the other answers, or offer
+        # first the words solved in other puzzles that fit the box, or
+        # search the box for the answer
+        if self.reset_options[ALL_LENGTHS] and \
+                self.pb.use_answer_bucket(current_target):
+            pass
+        else:
+            known_words = self.find_known_answers(current_target)
+            if known_words:
+                self.pb.offer_known_words(
+                    known_words,
+                    partial(self.prepare_word_list, open_targets,
+                            current_target))
+            else:
+                self.prepare_word_list(open_targets, current_target)
+        self.rank_by_lookahead()
 
         # get the first found word and return it
         next_word = self.pb.get_a_word(WORD_SELECTION.flush_cache)
         return next_word
 
-    def remove_answer_letters(self, answer_id: int):
+    def prepare_word_list(self, open_targets: list,
+                          current_target: ANSWER_TARGET):
+        """
+        Search the box for the words of the current answer.
+
+        (Internal call from search_box, possibly put off until the words
+        solved before have all been turned down)
+
+        :param open_targets: ANSWER_TARGET of every answer still open
+        :param current_target: the answer the words are wanted for
+        :return:
+        """
+        # search for all the open answers at once, or search only as far
+        # as the words are asked for, or search the whole box up front
+        if self.reset_options[ALL_LENGTHS] and len(open_targets) > 1:
+            self.pb.build_answer_buckets(open_targets)
+            self.pb.use_answer_bucket(current_target)
+        elif self.reset_options[LAZY_SEARCH]:
+            self.pb.stream_word_list_from_box(current_target.word_length,
+                                              current_target.word_hint)
+        else:
+            self.pb.build_word_list_from_box(current_target.word_length,
+                                             current_target.word_hint)
+        return
+
+    def find_known_answers(self, current_target: ANSWER_TARGET) -> list:
+        """
+        Find the words solved in other puzzles that fit the current answer.
+
+        The words solved most often are tried first.  Done only if the
+        known answers option is on.
+
+        (Internal call from search_box)
+
+        :param current_target: the answer the words are wanted for
+        :return: list of COMPACT_WORD that can be traced on the box
+        """
+        if not self.reset_options[KNOWN_ANSWERS]:
+            return list()
+
+        solved_words = Answer.objects.filter(
+            answer_status=Answer.SOLVED,
+            answer_length=current_target.word_length).exclude(
+            puzzle_id=self.curr_puzzle_id).values_list('answer_text',
+                                                       flat=True)
+        word_counts = Counter(word.strip().upper() for word in solved_words
+                              if word)
+        words = [word for word, count in word_counts.most_common()]
+        known_words = self.pb.trace_known_words(
+            words, current_target.word_length, current_target.word_hint)
+        return known_words
+
+    def rank_by_lookahead(self):
+        """
+        Show first the words that leave a word for each of the other answers.
+
+        Each word found for the current answer is removed from a copy of
+        the box and the letters above it allowed to fall.  The words after
+        which the most other open answers can still be formed come first.
+        Every word must be found to rank them, so any search put off behind
+        the words solved before is run too.  Done only if the lookahead
+        option is on.
+
+        (Internal call from start_new_word_search and start_new_puzzle_search)
+
+        :return:
+        """
+        if not self.reset_options[LOOKAHEAD]:
+            return
+
+        other_targets = [
+            self.get_answer_target(answer)
+            for answer in Answer.objects.filter(
+                puzzle_id__exact=self.curr_puzzle_id)
+            if answer.id != self.curr_answer_id and
+            answer.answer_status != Answer.SOLVED]
+        if not other_targets:
+            return
+
+        letters = ''.join(letter for row in self.pb.get_working_box_letters()
+                          for letter in row)
+        solver = PuzzleSolverClass(
+            side=self.pb.side, letters=letters, targets=other_targets,
+            reset_options=self.reset_options)
+        self.pb.rank_candidates(solver.lookahead_score)
+        return
+
+    def get_saved_board(self, puzzle: Puzzle, answer_set) -> str:
+        """
+        Return the working board saved with a puzzle, if it can be used.
+
+        The board is used only if it holds just the letters of the puzzle
+        and as many of them as the solved answers leave.
+
+        :param puzzle:
+        :param answer_set: the answers of the puzzle
+        :return: the letters (CELL_VACANT for an empty cell) or None
+        """
+        working_letters = puzzle.working_characters
+        if not working_letters:
+            return None
+        puzzle_letters = puzzle.puzzle_characters.strip().upper()
+        letters_left = working_letters.replace(CELL_VACANT, '')
+        letters_solved = sum(len(answer.answer_text or '')
+                             for answer in answer_set
+                             if answer.answer_status == Answer.SOLVED)
+        if len(working_letters) != len(puzzle_letters) or \
+                len(letters_left) != len(puzzle_letters) - letters_solved or \
+                Counter(letters_left) - Counter(puzzle_letters):
+            debug(f'Working board saved for puzzle {puzzle.id} is out of '
+                  f'date')
+            return None
+        return working_letters
+
+    def save_working_board(self, puzzle_id: int,
+                           answer_word: FOUND_WORD = None):
+        """
+        Save the working board with the puzzle for the next search to use.
+
+        If the box in hand is for another puzzle, the board saved for this
+        one is cleared instead, so that it will be rebuilt.  If a word is
+        given, the board saved is the one left once the word is removed,
+        without changing the box (or the board is cleared if the word is
+        not in the box).
+
+        (Called from WordSolveView.post and internally)
+
+        :param puzzle_id: internal id of a puzzle for an animal or DQ
+        :param answer_word: a word about to be removed from the box
+        :return:
+        """
+        if self.pb and puzzle_id == self.curr_puzzle_id:
+            if answer_word is None:
+                working_letters = ''.join(
+                    letter for row in self.pb.get_working_box_letters()
+                    for letter in row)
+            else:
+                working_letters = self.pb.letters_after_word(answer_word)
+        else:
+            working_letters = None
+        Puzzle.objects.filter(pk=puzzle_id).update(
+            working_characters=working_letters)
+        return
+
+    def get_puzzle_board(self, puzzle: Puzzle) -> list:
+        """
+        Return the working board of a puzzle as a list of lists of letters.
+
+        (Called from PuzzleDetailView.get_context_data)
+
+        :param puzzle:
+        :return: the board saved with the puzzle, or else the box in hand
+        """
+        working_letters = puzzle.working_characters
+        if not working_letters or \
+                len(working_letters) != puzzle.puzzle_size ** 2:
+            working_box = self.get_working_box_letters()
+            return working_box
+        side = puzzle.puzzle_size
+        working_box = [list(working_letters[row * side:(row + 1) * side])
+                       for row in range(side)]
+        return working_box
+
+    def check_answer_letters(self, answer: Answer, letter_list: list) -> str:
+        """
+        Check that letters entered by hand for an answer are in the puzzle.
+
+        The letters of an answer not yet solved must lie along touching
+        cells of the working board, in order.  The letters of a solved
+        answer have already left the board, so only their positions are
+        checked.
+
+        (Called from AnswerLetterEditView.post)
+
+        :param answer:
+        :param letter_list: tuples of (letter order, letter, row, col)
+        :return: a description of the problem, or '' if there is none
+        """
+        puzzle = get_object_or_404(Puzzle, pk=answer.puzzle_id)
+        side = puzzle.puzzle_size
+        word = ''
+        cells = list()
+        for order, letter, row, col in sorted(letter_list):
+            if not (0 <= row < side and 0 <= col < side):
+                return f'Row {row}, column {col} is outside the puzzle'
+            word += letter.upper()
+            cells.append(row * side + col)
+        if len(word) != answer.answer_length:
+            return f'{len(word)} letters given for an answer of ' \
+                   f'{answer.answer_length} letters'
+        if answer.answer_status == Answer.SOLVED:
+            return ''
+
+        # find the working board of the puzzle, if it can be known
+        answer_set = Answer.objects.filter(puzzle_id__exact=puzzle.id)
+        working_letters = self.get_saved_board(puzzle, answer_set)
+        if working_letters is None and self.pb and \
+                puzzle.id == self.curr_puzzle_id:
+            working_letters = ''.join(
+                letter for row in self.pb.get_working_box_letters()
+                for letter in row)
+        if working_letters is None and not any(
+                other.answer_status == Answer.SOLVED
+                for other in answer_set):
+            working_letters = puzzle.puzzle_characters.strip().upper()
+        if working_letters is None:
+            return ''
+
+        tracer = WordTracerClass(working_letters, side)
+        if not tracer.is_path(word, cells):
+            return f'{word} does not lie along touching cells of the ' \
+                   f'puzzle at the locations given'
+        return ''
+
+    def get_answer_target(self, answer: Answer) -> ANSWER_TARGET:
+        """
+        Describe an answer to be searched for.
+
+        :param answer:
+        :return: the answer id, length and hint (if any)
+        """
+        if answer.answer_status == Answer.HINT:
+            word_hint = answer.answer_text.upper()
+        else:
+            word_hint = ''
+        target = ANSWER_TARGET(answer_id=answer.id,
+                               word_length=answer.answer_length,
+                               word_hint=word_hint)
+        return target
+
+    def remove_answer_letters(self, answer_id: int,
+                              prior_answer: tuple = None):
         """
         Remove the last word received from the puzzle.
 
@@ -172,29 +571,20 @@ class GetAWordClass:
         start_new_puzzle_search)
 
         :param answer_id:
+        :param prior_answer: status and text of the answer before the word
+            was accepted (if just accepted)
         :return:
         """
+        if prior_answer is not None:
+            self.prior_answers[answer_id] = prior_answer
 
-        # get the answer positions for this answer
-        answer_letter_set = AnswerLetter.objects.filter(
-            answer_id=answer_id)
+        answer_info = self.get_answer_word(answer_id)
 
         # if there are locations to back up this word, remove them from puzzle
-        if answer_letter_set:
-
-            # build a "found' word from the db for this answer
-            word = ''
-            letter_loc = list()
-            for answer_letter in answer_letter_set:
-                word += answer_letter.letter_text
-                cell_pos = CELL_POSITION(row=answer_letter.letter_row,
-                                         col=answer_letter.letter_col)
-                letter_loc.append(cell_pos)
-
-            answer_info = FOUND_WORD(found_word=word, letters_loc=letter_loc)
+        if answer_info is not None:
 
             # pass in the answer chosen to the box as verification
-            self.pb.remove_an_answer(answer_info)
+            self.pb.remove_an_answer(answer_info, answer_id=answer_id)
 
         # else must be a hint, use it later
         else:
@@ -202,6 +592,175 @@ class GetAWordClass:
 
         return
 
+    def undo_answer(self, puzzle_id: int) -> Answer:
+        """
+        Take back the answer removed from the puzzle most recently.
+
+        The box is put back the way it was without replaying the other
+        answers, the letters recorded for the answer are deleted and the
+        answer is reopened.
+
+        (Called from undo_answer in views.py)
+
+        :param puzzle_id: internal id of a puzzle for an animal or DQ
+        :return: the answer reopened or None if there is nothing to undo
+        """
+        if not self.pb or puzzle_id != self.curr_puzzle_id:
+            return None
+        step = self.pb.undo_answer()
+        if step is None or step.answer_id is None:
+            return None
+
+        with transaction.atomic():
+            answer = get_object_or_404(Answer, pk=step.answer_id)
+            AnswerLetter.objects.filter(answer_id=answer.id).delete()
+            answer.answer_status, answer.answer_text = \
+                self.prior_answers.pop(answer.id, (Answer.UNSOLVED, ''))
+            answer.save()
+            self.update_solved_status(puzzle_id)
+            self.save_working_board(puzzle_id)
+
+        # the next word wanted starts a new search of the box as it is now
+        self.curr_answer_id = None
+        return answer
+
+    def redo_answer(self, puzzle_id: int) -> Answer:
+        """
+        Remove again the answer taken back most recently.
+
+        (Called from redo_answer in views.py)
+
+        :param puzzle_id: internal id of a puzzle for an animal or DQ
+        :return: the answer solved again or None if there is nothing to redo
+        """
+        if not self.pb or puzzle_id != self.curr_puzzle_id:
+            return None
+        step = self.pb.redo_answer()
+        if step is None or step.answer_id is None:
+            return None
+
+        with transaction.atomic():
+            answer = get_object_or_404(Answer, pk=step.answer_id)
+            self.prior_answers[answer.id] = (answer.answer_status,
+                                             answer.answer_text)
+            answer.answer_text = step.answer_word.found_word
+            answer.answer_status = Answer.SOLVED
+            answer.save()
+            for order, zip_list in enumerate(
+                    zip(step.answer_word.found_word,
+                        step.answer_word.letters_loc), start=1):
+                letter, loc = zip_list
+                AnswerLetter(answer=answer, letter_order=order,
+                             letter_text=letter, letter_row=loc.row,
+                             letter_col=loc.col).save()
+            self.update_solved_status(puzzle_id)
+            self.save_working_board(puzzle_id)
+
+        # the next word wanted starts a new search of the box as it is now
+        self.curr_answer_id = None
+        return answer
+
+    def update_solved_status(self, puzzle_id: int):
+        """
+        Mark a puzzle (and its animal) solved only if all its answers are.
+
+        (Called internally from undo_answer and redo_answer)
+
+        :param puzzle_id: internal id of a puzzle for an animal or DQ
+        :return:
+        """
+        puzzle = get_object_or_404(Puzzle, pk=puzzle_id)
+        answers_missing = Answer.objects.filter(
+            puzzle_id__exact=puzzle_id).exclude(
+            answer_status__exact=Answer.SOLVED)
+        if answers_missing:
+            puzzle.puzzle_solved = SOLVE_STATUS_OPEN
+        else:
+            puzzle.puzzle_solved = SOLVE_STATUS_SOLVED
+        puzzle.save()
+
+        animal = get_object_or_404(Animal, pk=puzzle.animal_id)
+        puzzles_open = Puzzle.objects.filter(
+            animal_id=animal.id).exclude(
+            puzzle_solved=SOLVE_STATUS_SOLVED)
+        if puzzles_open:
+            animal.animal_solved = SOLVE_STATUS_OPEN
+        else:
+            animal.animal_solved = SOLVE_STATUS_SOLVED
+        animal.save()
+        return
+
+    def get_answer_word(self, answer_id: int) -> FOUND_WORD:
+        """
+        Build a "found" word from the letters recorded for an answer.
+
+        :param answer_id:
+        :return: the word and its positions, or None if no letters are
+            recorded (e.g. a hint)
+        """
+        # get the answer positions for this answer
+        answer_letter_set = AnswerLetter.objects.filter(
+            answer_id=answer_id)
+        if not answer_letter_set:
+            return None
+
+        word = ''
+        letter_loc = list()
+        for answer_letter in answer_letter_set:
+            word += answer_letter.letter_text
+            cell_pos = CELL_POSITION(row=answer_letter.letter_row,
+                                     col=answer_letter.letter_col)
+            letter_loc.append(cell_pos)
+
+        answer_info = FOUND_WORD(found_word=word, letters_loc=letter_loc)
+        return answer_info
+
+    def solve_puzzle(self, puzzle_id: int) -> list:
+        """
+        Find words for all the open answers that clear the puzzle together.
+
+        The box starts from the working board saved with the puzzle, or
+        else the letters of the answers already solved are removed first.
+        The puzzle box used for single answers is left alone.
+
+        (Called from PuzzleSolveView.get_context_data)
+
+        :param puzzle_id: internal id of a puzzle for an animal or DQ
+        :return: list of tuples of (ANSWER_TARGET, COMPACT_WORD) in the
+            order to remove them, or None if no solution was found
+        """
+        puzzle = get_object_or_404(Puzzle, pk=puzzle_id)
+        answer_set = Answer.objects.filter(puzzle_id__exact=puzzle_id)
+        working_letters = self.get_saved_board(puzzle, answer_set)
+        solve_box = PuzzleBoxParallelClass(
+            box_size=puzzle.puzzle_size,
+            box_letters=working_letters or
+            puzzle.puzzle_characters.strip().upper(),
+            reset_options=self.reset_options,
+        )
+
+        open_targets = list()
+        for answer in answer_set:
+            if answer.answer_status == Answer.SOLVED:
+                if working_letters is None:
+                    answer_info = self.get_answer_word(answer.id)
+                    if answer_info is not None:
+                        try:
+                            solve_box.remove_an_answer(answer_info)
+                        except ValueError as ex:
+                            error(f'Letters of answer {answer.id} not '
+                                  f'removed: {ex}')
+            else:
+                open_targets.append(self.get_answer_target(answer))
+
+        letters = ''.join(letter for row in solve_box.get_working_box_letters()
+                          for letter in row)
+        solver = PuzzleSolverClass(
+            side=puzzle.puzzle_size, letters=letters, targets=open_targets,
+            reset_options=self.reset_options)
+        solution = solver.solve()
+        return solution
+
     def get_working_box_letters(self) -> list:
         """
         Return a list of lists containing the working box at the moment.
@@ -244,6 +803,53 @@ class GetAWordClass:
             previous_setting = self.reset_options[DICTIONARY_CHECK]
             self.reset_options[DICTIONARY_CHECK] = not previous_setting
 
+        # turn on or off pruning the search by dictionary prefixes?
+        elif reset_option == FLIP_PREFIX_CHECK:
+            previous_setting = self.reset_options[PREFIX_CHECK]
+            self.reset_options[PREFIX_CHECK] = not previous_setting
+
+        # turn on or off finding words only as they are asked for?
+        elif reset_option == FLIP_LAZY_SEARCH:
+            previous_setting = self.reset_options[LAZY_SEARCH]
+            self.reset_options[LAZY_SEARCH] = not previous_setting
+
+        # turn on or off searching for all the open answers at once?
+        elif reset_option == FLIP_ALL_LENGTHS:
+            previous_setting = self.reset_options[ALL_LENGTHS]
+            self.reset_options[ALL_LENGTHS] = not previous_setting
+
+        # turn on or off ranking the words by what they leave behind?
+        elif reset_option == FLIP_LOOKAHEAD:
+            previous_setting = self.reset_options[LOOKAHEAD]
+            self.reset_options[LOOKAHEAD] = not previous_setting
+
+        # turn on or off offering first the words solved before?
+        elif reset_option == FLIP_KNOWN_ANSWERS:
+            previous_setting = self.reset_options[KNOWN_ANSWERS]
+            self.reset_options[KNOWN_ANSWERS] = not previous_setting
+
+        # turn on or off searching ahead while a word is shown?
+        elif reset_option == FLIP_SPECULATE:
+            previous_setting = self.reset_options[SPECULATE]
+            self.reset_options[SPECULATE] = not previous_setting
+            if not self.reset_options[SPECULATE] and self.pb:
+                self.pb.cancel_speculation()
+
+        # switch to the next way of walking the box
+        elif reset_option == NEXT_SEARCH_ENGINE:
+            engine_list = list(SEARCH_ENGINE)
+            engine_ndx = engine_list.index(self.reset_options[ENGINE_CHOICE])
+            self.set_search_engine(
+                engine_list[(engine_ndx + 1) % len(engine_list)])
+
+        # find longer or shorter words by meeting in the middle
+        elif reset_option == RAISE_LONG_WORD_LENGTH:
+            self.set_long_word_length(
+                self.reset_options[LONG_WORD_LENGTH] + 1)
+        elif reset_option == LOWER_LONG_WORD_LENGTH:
+            self.set_long_word_length(
+                self.reset_options[LONG_WORD_LENGTH] - 1)
+
         # restore using the dictionary as a word filter
         elif reset_option == TURN_DICTIONARY_ON:
             self.reset_options[DICTIONARY_CHECK] = True
@@ -341,6 +947,34 @@ class GetAWordClass:
 
         return
 
+    def set_search_engine(self, engine: SEARCH_ENGINE):
+        """
+        Set the engine used to walk the box for the next search.
+
+        (Called internally from reset_an_option)
+
+        :param engine:
+        :return:
+        """
+        if engine in SEARCH_ENGINE:
+            self.reset_options[ENGINE_CHOICE] = engine
+
+        return
+
+    def set_long_word_length(self, word_length: int):
+        """
+        Set the shortest word length found by meeting in the middle.
+
+        (Called internally from reset_an_option)
+
+        :param word_length: from 2 up to the longest word expected
+        :return:
+        """
+        if 1 < word_length <= MAX_WORD_SIZE:
+            self.reset_options[LONG_WORD_LENGTH] = word_length
+
+        return
+
     def set_word_selection_choice(self, kind: WORD_SELECTION):
         """
         Set the word selection choice desired.
@@ -0,0 +1,246 @@
+"""
+Lexicon.py - Hold a word list as prefix trees to prune word searches.
+
+By default the words are those of the aspell master dictionary, the same
+words the dictionary check accepts, so pruning never drops a word the
+check would have kept.  A plain word list may be named instead.
+"""
+
+from itertools import count
+from logging import debug, error
+from subprocess import run, CalledProcessError
+
+from wordtrek.support.constants import LEXICON_SOURCE, TRIE_END, \
+    ASPELL_LEXICON, ASPELL_DUMP_COMMAND, ASPELL_EXPAND_COMMAND
+
+# lexicons already loaded by this process, keyed by source
+_lexicon_cache = dict()
+
+# source of the version numbers telling the word lists loaded apart
+_lexicon_versions = count(1)
+
+
+class LexiconClass:
+    """
+    Word list organized by word length, with a prefix tree for each length.
+
+    A prefix tree (trie) is a dictionary keyed by letter.  Each value is
+    the dictionary for the following letter.  The key TRIE_END marks that
+    the letters leading to that point form a complete word.
+    """
+
+    def __init__(self, lexicon_source: str = LEXICON_SOURCE):
+        """
+        Load the word list and prepare to build prefix trees on demand.
+
+        :param lexicon_source: ASPELL_LEXICON or a file containing one word
+            per line
+        """
+        self.lexicon_source = lexicon_source
+
+        # words grouped by length
+        self.words_by_length = dict()
+
+        # prefix trees already built, keyed by word length
+        self.trie_cache = dict()
+
+        # prefix trees of the words spelled backwards, keyed by word length
+        self.reverse_trie_cache = dict()
+
+        # prefix trees of the words from a position on, keyed by word
+        # length and position
+        self.tail_trie_cache = dict()
+
+        # number of distinct prefixes of each length, keyed by word length
+        self.prefix_count_cache = dict()
+
+        # different for every word list loaded by this process, so that
+        # anything built from the words can be keyed by it
+        self.version = None
+
+        self.load_words()
+
+        return
+
+    def load_words(self):
+        """
+        Read the word list, keeping only words made entirely of letters.
+
+        :return:
+        """
+        if self.lexicon_source == ASPELL_LEXICON:
+            words = read_aspell_words()
+        else:
+            words = read_word_file(self.lexicon_source)
+        word_set = set(word.upper() for word in words if word.isalpha())
+
+        for word in sorted(word_set):
+            self.words_by_length.setdefault(len(word), list()).append(word)
+        self.version = next(_lexicon_versions)
+
+        if word_set:
+            debug(f'Lexicon {self.lexicon_source} loaded with '
+                  f'{len(word_set)} words')
+        else:
+            error(f'Lexicon {self.lexicon_source} holds no words - '
+                  f'searches will not be pruned by prefix')
+        return
+
+    def is_loaded(self) -> bool:
+        """
+        Report whether any words were found in the word list.
+
+        :return: true if the lexicon holds at least one word
+        """
+        loaded = len(self.words_by_length) > 0
+        return loaded
+
+    def get_words(self, word_length: int) -> list:
+        """
+        Return all the words of the given length.
+
+        :param word_length:
+        :return: list of words in alphabetical order
+        """
+        words = self.words_by_length.get(word_length, list())
+        return words
+
+    def get_trie(self, word_length: int) -> dict:
+        """
+        Return the prefix tree of all the words of the given length.
+
+        :param word_length:
+        :return: root of the prefix tree or None if no words are loaded
+        """
+        if not self.is_loaded():
+            return None
+
+        if word_length not in self.trie_cache:
+            self.trie_cache[word_length] = build_trie(
+                self.get_words(word_length))
+        trie = self.trie_cache[word_length]
+        return trie
+
+    def get_reverse_trie(self, word_length: int) -> dict:
+        """
+        Return the prefix tree of the words of a length spelled backwards.
+
+        Following this tree from its root checks the end of a word first.
+
+        :param word_length:
+        :return: root of the prefix tree or None if no words are loaded
+        """
+        if not self.is_loaded():
+            return None
+
+        if word_length not in self.reverse_trie_cache:
+            self.reverse_trie_cache[word_length] = build_trie(
+                [word[::-1] for word in self.get_words(word_length)])
+        reverse_trie = self.reverse_trie_cache[word_length]
+        return reverse_trie
+
+    def get_tail_trie(self, word_length: int, position: int) -> dict:
+        """
+        Return the prefix tree of the words of a length from a position on.
+
+        Following this tree checks a word from a letter in its middle.
+
+        :param word_length:
+        :param position: position of the first letter kept (from zero)
+        :return: root of the prefix tree or None if no words are loaded
+        """
+        if not self.is_loaded():
+            return None
+
+        key = (word_length, position)
+        if key not in self.tail_trie_cache:
+            self.tail_trie_cache[key] = build_trie(
+                [word[position:] for word in self.get_words(word_length)])
+        tail_trie = self.tail_trie_cache[key]
+        return tail_trie
+
+    def get_prefix_counts(self, word_length: int) -> list:
+        """
+        Count the distinct prefixes of each length among words of a length.
+
+        :param word_length:
+        :return: list where entry n is the number of prefixes n + 1 long
+        """
+        if word_length not in self.prefix_count_cache:
+            words = self.get_words(word_length)
+            self.prefix_count_cache[word_length] = [
+                len(set(word[:depth + 1] for word in words))
+                for depth in range(word_length)]
+        prefix_counts = self.prefix_count_cache[word_length]
+        return prefix_counts
+
+
+def read_aspell_words() -> list:
+    """
+    List the words of the aspell master dictionary with all their endings.
+
+    :return: list of words (empty if aspell cannot be run)
+    """
+    try:
+        dump = run(ASPELL_DUMP_COMMAND, capture_output=True, check=True,
+                   encoding='utf-8', errors='ignore')
+        expanded = run(ASPELL_EXPAND_COMMAND, input=dump.stdout,
+                       capture_output=True, check=True, encoding='utf-8',
+                       errors='ignore')
+    except (OSError, CalledProcessError) as ex:
+        error(f'Unable to list the aspell dictionary: {ex}')
+        return list()
+    words = expanded.stdout.split()
+    return words
+
+
+def read_word_file(lexicon_file: str) -> list:
+    """
+    List the words of a file holding one word per line.
+
+    :param lexicon_file:
+    :return: list of words (empty if the file cannot be read)
+    """
+    words = list()
+    try:
+        with open(lexicon_file, mode='r', encoding='utf-8',
+                  errors='ignore') as word_file:
+            for line in word_file:
+                words.append(line.strip())
+    except OSError as ex:
+        error(f'Unable to read lexicon {lexicon_file}: {ex}')
+    return words
+
+
+def build_trie(words: list) -> dict:
+    """
+    Build a prefix tree from a list of words.
+
+    :param words:
+    :return: root of the prefix tree
+    """
+    root = dict()
+    for word in words:
+        node = root
+        for letter in word:
+            node = node.setdefault(letter, dict())
+        node[TRIE_END] = True
+    return root
+
+
+def get_lexicon(lexicon_source: str = LEXICON_SOURCE) -> LexiconClass:
+    """
+    Return the lexicon for this process, loading it the first time.
+
+    Each worker process in the pool loads its own copy once rather than
+    having a copy pickled along with every cell to be searched.
+
+    :param lexicon_source: ASPELL_LEXICON or a file of words
+    :return: the lexicon
+    """
+    if lexicon_source not in _lexicon_cache:
+        _lexicon_cache[lexicon_source] = LexiconClass(lexicon_source)
+    lexicon = _lexicon_cache[lexicon_source]
+    return lexicon
+
+# EOF
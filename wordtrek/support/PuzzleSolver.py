@@ -0,0 +1,404 @@
+"""
+PuzzleSolver.py - Find an order of words that clears the whole puzzle.
+
+Removing the letters of an answer lets the letters above them fall, so a
+word that fits the box now may be gone after another answer is removed,
+and a word that does not fit yet may appear later.  The solver tries the
+words for the open answers in turn, removing each one and letting the
+letters fall, until every answer has a word or no order works.
+
+Many different orders of removal leave the same letters in the box for
+the same answers still open.  Each such board state that led nowhere is
+kept in a transposition table so that it is never explored again.  The
+moves from the starting box can be spread across the process pool.
+
+The same pieces can look just one move ahead: the words for one answer are
+scored by how many of the other answers still have a word once the letters
+have fallen, so that the words most likely to be right are shown first.
+"""
+
+from concurrent import futures
+from logging import debug
+from multiprocessing import Manager
+
+from wordtrek.support.BoxSearch import build_box, apply_gravity, \
+    multi_length_word_search
+from wordtrek.support.constants import CELL_STATUS, ANSWER_TARGET, \
+    CELL_VACANT, VOWEL_CHECK, DICTIONARY_CHECK, PREFIX_CHECK, \
+    MAX_CORE_LIMIT, SOLVER_STATE_LIMIT
+from wordtrek.support.Lexicon import get_lexicon
+from wordtrek.support.PuzzleboxParallel import contains_vowel
+from wordtrek.support.SpellChecker import get_spell_checker
+
+
+class PuzzleSolverClass:
+    """
+    Search for words for all the open answers that clear the box together.
+
+    A board state is the letters left in the box (CELL_VACANT for an
+    empty cell) with the answers still open.  Answers with the same length
+    and hint can trade words, so they are treated as one when building the
+    key of a state.
+    """
+
+    def __init__(self, *, side: int, letters: str, targets: list,
+                 reset_options: dict, state_limit: int = SOLVER_STATE_LIMIT,
+                 stop_event=None):
+        """
+        Prepare to solve a puzzle.
+
+        :param side: the size of one side of the puzzle
+        :param letters: one letter per cell, left to right, top to bottom
+        :param targets: list of ANSWER_TARGET for the open answers
+        :param reset_options: the reset options (filters) in force
+        :param state_limit: most board states to explore before giving up
+        :param stop_event: event set when the search is no longer wanted
+            (another worker has found a solution)
+        """
+        self.side = side
+        self.letters = letters.upper()
+        self.targets = [target._replace(word_hint=target.word_hint.upper())
+                        for target in targets]
+        self.reset_options = reset_options
+        self.state_limit = state_limit
+        self.stop_event = stop_event
+
+        # board states known not to lead to a solution
+        self.dead_states = set()
+
+        # counts for reporting progress
+        self.states_explored = 0
+        self.table_hits = 0
+        self.gave_up = False
+        self.stopped = False
+
+        # spell checker (created when first needed)
+        self.spell_check = None
+
+        # scores of the boxes left by removing a word, keyed by letters
+        self.lookahead_scores = dict()
+
+        # prefix trees of the words wanted, keyed by length (if used)
+        self.tries = None
+        if self.use_prefix_check():
+            lexicon = get_lexicon()
+            if lexicon.is_loaded():
+                self.tries = dict(
+                    (target.word_length,
+                     lexicon.get_trie(target.word_length))
+                    for target in self.targets)
+
+        return
+
+    def use_prefix_check(self) -> bool:
+        """
+        Determine if the search should be pruned by the lexicon prefixes.
+
+        :return: true if prefix pruning was requested
+        """
+        use_prefix = self.reset_options.get(PREFIX_CHECK, False) and \
+            self.reset_options.get(DICTIONARY_CHECK, False)
+        return use_prefix
+
+    def passes_filters(self, word: str) -> bool:
+        """
+        Apply the vowel check and dictionary check requested.
+
+        :param word:
+        :return: true if the word may be an answer
+        """
+        if self.reset_options.get(VOWEL_CHECK, False) and \
+                not contains_vowel(word):
+            return False
+        if self.reset_options.get(DICTIONARY_CHECK, False):
+            if self.spell_check is None:
+                self.spell_check = get_spell_checker()
+            return self.spell_check.check_word(word)
+        return True
+
+    def state_key(self, letters: str, remaining: tuple) -> tuple:
+        """
+        Build the transposition table key of a board state.
+
+        :param letters: letters left in the box
+        :param remaining: indexes of the answers still open
+        :return:
+        """
+        key = (letters, tuple(sorted(
+            (self.targets[ndx].word_length, self.targets[ndx].word_hint)
+            for ndx in remaining)))
+        return key
+
+    def letters_suffice(self, letters: str, remaining: tuple) -> bool:
+        """
+        Check that enough letters are left for the answers still open.
+
+        :param letters: letters left in the box
+        :param remaining: indexes of the answers still open
+        :return:
+        """
+        letters_left = len(letters) - letters.count(CELL_VACANT)
+        letters_needed = sum(self.targets[ndx].word_length
+                             for ndx in remaining)
+        return letters_left >= letters_needed
+
+    def list_moves(self, letters: str, remaining: tuple) -> list:
+        """
+        List the words that fit the open answers in the box as it stands.
+
+        Words using the same cells for the same answer leave the same box,
+        so only one of them is kept.  The answers with the fewest words
+        are tried first.
+
+        :param letters: letters left in the box
+        :param remaining: indexes of the answers still open
+        :return: list of tuples of (answer index, COMPACT_WORD)
+        """
+        # one answer for each length and hint still open
+        target_ndx = dict()
+        for ndx in remaining:
+            target_ndx.setdefault(
+                (self.targets[ndx].word_length, self.targets[ndx].word_hint),
+                ndx)
+        ndx_by_target = dict(
+            (self.targets[ndx], ndx) for ndx in target_ndx.values())
+        targets = list(ndx_by_target)
+
+        box = build_box(letters, self.side)
+        words_by_target = dict((ndx, list()) for ndx in target_ndx.values())
+        cells_seen = set()
+        for row in box:
+            for cell in row:
+                if cell.my_availability != CELL_STATUS.AVAILABLE:
+                    continue
+                for target, word_info in multi_length_word_search(
+                        box=box, side=self.side, start_cell=cell,
+                        targets=targets, word_check=self.passes_filters,
+                        tries=self.tries):
+                    ndx = ndx_by_target[target]
+                    cells_key = (ndx, frozenset(word_info.cells))
+                    if cells_key in cells_seen:
+                        continue
+                    cells_seen.add(cells_key)
+                    words_by_target[ndx].append(word_info)
+
+        moves = [(ndx, word_info)
+                 for ndx, word_list in sorted(
+                     words_by_target.items(), key=lambda item: len(item[1]))
+                 for word_info in word_list]
+        return moves
+
+    def count_answers_possible(self, letters: str, remaining: tuple) -> int:
+        """
+        Count the open answers that still have at least one word in the box.
+
+        The box is walked only until a word has been seen for each of them.
+
+        :param letters: letters left in the box
+        :param remaining: indexes of the answers still open
+        :return: number of answers with a word (0 if the letters left are
+            too few for them all)
+        """
+        if not self.letters_suffice(letters, remaining):
+            return 0
+
+        # answers with the same length and hint need only one word
+        answer_count = dict()
+        for ndx in remaining:
+            key = (self.targets[ndx].word_length, self.targets[ndx].word_hint)
+            answer_count[key] = answer_count.get(key, 0) + 1
+
+        box = build_box(letters, self.side)
+        found = set()
+        for row in box:
+            for cell in row:
+                if len(found) == len(answer_count):
+                    break
+                if cell.my_availability != CELL_STATUS.AVAILABLE:
+                    continue
+                targets = [
+                    ANSWER_TARGET(answer_id=None, word_length=length,
+                                  word_hint=hint)
+                    for length, hint in answer_count
+                    if (length, hint) not in found]
+                for target, word_info in multi_length_word_search(
+                        box=box, side=self.side, start_cell=cell,
+                        targets=targets, word_check=self.passes_filters,
+                        tries=self.tries):
+                    found.add((target.word_length, target.word_hint))
+                    if len(found) == len(answer_count):
+                        break
+
+        possible = sum(answer_count[key] for key in found)
+        return possible
+
+    def lookahead_score(self, cells: bytes) -> int:
+        """
+        Score removing a word from the starting box by what it leaves.
+
+        :param cells: flat cell index of each letter of the word
+        :return: number of open answers still with a word afterwards
+        """
+        letters = apply_gravity(self.letters, self.side, cells)
+        score = self.lookahead_scores.get(letters)
+        if score is None:
+            score = self.count_answers_possible(
+                letters, tuple(range(len(self.targets))))
+            self.lookahead_scores[letters] = score
+        return score
+
+    def solve_state(self, letters: str, remaining: tuple) -> list:
+        """
+        Find words for the open answers from this board state on.
+
+        :param letters: letters left in the box
+        :param remaining: indexes of the answers still open
+        :return: list of tuples of (ANSWER_TARGET, COMPACT_WORD) in the
+            order to remove them, or None if there is no solution
+        """
+        if not remaining:
+            return list()
+
+        key = self.state_key(letters, remaining)
+        if key in self.dead_states:
+            self.table_hits += 1
+            return None
+        if self.states_explored >= self.state_limit:
+            self.gave_up = True
+            return None
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.stopped = True
+            return None
+        self.states_explored += 1
+
+        if self.letters_suffice(letters, remaining):
+            for ndx, word_info in self.list_moves(letters, remaining):
+                solution = self.solve_state(
+                    apply_gravity(letters, self.side, word_info.cells),
+                    tuple(other for other in remaining if other != ndx))
+                if solution is not None:
+                    return [(self.targets[ndx], word_info)] + solution
+                if self.gave_up or self.stopped:
+                    return None
+
+        self.dead_states.add(key)
+        return None
+
+    def solve(self) -> list:
+        """
+        Find words for all the open answers that clear the box together.
+
+        :return: list of tuples of (ANSWER_TARGET, COMPACT_WORD) in the
+            order to remove them, or None if no solution was found
+        """
+        remaining = tuple(range(len(self.targets)))
+        print(f'Starting to solve a {self.side} x {self.side} box for '
+              f'{len(self.targets)} answers')
+
+        if MAX_CORE_LIMIT > 1 and len(self.targets) > 1:
+            solution = self.solve_in_parallel(remaining)
+        else:
+            solution = self.solve_state(self.letters, remaining)
+
+        if solution is not None:
+            outcome = 'solved'
+        elif self.gave_up:
+            outcome = f'gave up after {self.state_limit} states'
+        else:
+            outcome = 'no solution'
+        print(f'Puzzle {outcome}: {self.states_explored} board states '
+              f'explored, {self.table_hits} repeats skipped')
+        return solution
+
+    def solve_in_parallel(self, remaining: tuple) -> list:
+        """
+        Explore each move from the starting box in the process pool.
+
+        Each worker keeps its own transposition table, and the limit on
+        board states is shared out among the moves.  The first solution
+        found is used: the moves not yet started are cancelled and the
+        workers still searching are told to stop.
+
+        :param remaining: indexes of the answers still open
+        :return: as for solve_state
+        """
+        if not self.letters_suffice(self.letters, remaining):
+            return None
+        moves = self.list_moves(self.letters, remaining)
+        if not moves:
+            return None
+        state_limit = max(1, self.state_limit // len(moves))
+
+        solution = None
+        with Manager() as manager, \
+                futures.ProcessPoolExecutor(max_workers=MAX_CORE_LIMIT) \
+                as pool:
+            stop_event = manager.Event()
+            process_pool_dict = dict(
+                (pool.submit(
+                    solve_after_move, side=self.side,
+                    letters=apply_gravity(self.letters, self.side,
+                                          word_info.cells),
+                    targets=self.targets,
+                    remaining=tuple(other for other in remaining
+                                    if other != ndx),
+                    reset_options=self.reset_options,
+                    state_limit=state_limit, stop_event=stop_event),
+                    (ndx, word_info))
+                for ndx, word_info in moves)
+
+            for future in futures.as_completed(process_pool_dict):
+                ndx, word_info = process_pool_dict[future]
+                try:
+                    states_explored, table_hits, gave_up, rest = \
+                        future.result()
+                except futures.process.BrokenProcessPool as ex:
+                    debug(f'{word_info.found_word} broken with exception '
+                          f'{ex}')
+                    continue
+                except futures.CancelledError as ex:
+                    debug(f'{word_info.found_word} cancelled with exception '
+                          f'{ex}')
+                    continue
+                self.states_explored += states_explored
+                self.table_hits += table_hits
+                self.gave_up = self.gave_up or gave_up
+                if rest is not None:
+                    solution = [(self.targets[ndx], word_info)] + rest
+                    stop_event.set()
+                    break
+
+            # cancel the moves not yet started (shutdown cannot do so
+            # before Python 3.9)
+            for future in process_pool_dict:
+                future.cancel()
+            pool.shutdown(wait=True)
+
+        return solution
+
+
+def solve_after_move(*, side: int, letters: str, targets: list,
+                     remaining: tuple, reset_options: dict,
+                     state_limit: int, stop_event=None) -> tuple:
+    """
+    Solve the rest of a puzzle in a worker process.
+
+    :param side: the size of one side of the puzzle
+    :param letters: letters left in the box after the first move
+    :param targets: list of ANSWER_TARGET for all the open answers
+    :param remaining: indexes of the answers still open
+    :param reset_options: the reset options (filters) in force
+    :param state_limit: most board states to explore before giving up
+    :param stop_event: event (shared by the workers) set once another
+        worker has found a solution
+    :return: tuple of (states explored, repeats skipped, whether the limit
+        was reached, the rest of the solution or None)
+    """
+    solver = PuzzleSolverClass(side=side, letters=letters, targets=targets,
+                               reset_options=reset_options,
+                               state_limit=state_limit,
+                               stop_event=stop_event)
+    rest = solver.solve_state(letters, remaining)
+    return solver.states_explored, solver.table_hits, solver.gave_up, rest
+
+# EOF
@@ -6,11 +6,17 @@ from collections import deque
 from logging import getLogger, debug, error
 from copy import deepcopy
 
-from .constants import AVAILABILITY, ADJ_LIST, FOUND_WORD, LETTER_LOC, \
+from .constants import FOUND_WORD, LETTER_LOC, \
     VOWEL_CHECK, DICTIONARY_CHECK, WORD_SELECTION
 from .constants import FLIP_VOWEL_CHECK, FLIP_DICTIONARY_CHECK
 from .constants import CELL_VACANT, END_QUEUE_WORD
 from .constants import CELL, CELL_STATUS, CELL_POSITION
+from .constants import PREFIX_CHECK, TRIE_END, ENGINE_CHOICE, SEARCH_ENGINE
+from .BoxSearch import bitmask_word_search, IterativeWordSearch, \
+    fill_availability_box, neighbor_table, neighbor_masks, \
+    count_reachable_cells, letter_map_mask, flatten_box, HintPattern, \
+    compact_word
+from .Lexicon import get_lexicon
 from .SpellChecker import SpellCheckerClass
 
 
@@ -63,6 +69,7 @@ class PuzzleBoxClass:
 
         # force hints to upper case
         my_word_hint = word_hint.upper()
+        hint = self.my_box.get_hint_pattern(word_length, my_word_hint)
 
         # walk through the box, picking each available position in turn as
         # the starting point for a word
@@ -78,8 +85,9 @@ class PuzzleBoxClass:
                   f'Letter: {letter}'
                   )
 
-            # if any hint provided, launch search only if first letter matches
-            if len(my_word_hint) > 0 and letter != my_word_hint[0]:
+            # launch a search only if the cell can start a word fitting
+            # the hint
+            if not hint.may_start(row_pos * self.side + col_pos, letter):
                 continue
             self.my_box.find_words_from_here(cell, word_length, my_word_hint)
             debug(f'BWFB - returned from finding words from here')
@@ -201,8 +209,14 @@ class Box:
 
         # set other variables
         self.box = None
+        self.neighbor_table = None
+        self.neighbor_masks = None
         self.word_length = None
         self.hint = None
+        self.hint_pattern = None
+
+        # prefix tree of the words of the requested length (if used)
+        self.trie = None
 
         # fill in the static information in the box
         self.fill_cells_in_box()
@@ -267,6 +281,10 @@ class Box:
         # shut down letter generator for future use.
         get_letter.close()
 
+        # flat indexes of the neighbors of each cell (row * side + col)
+        self.neighbor_table = neighbor_table(self.side)
+        self.neighbor_masks = neighbor_masks(self.side)
+
     def get_next_starting_point(self):
         """
         Walk through the box returning each valid starting point for a word.
@@ -307,6 +325,32 @@ class Box:
         loc_list = [letter_loc]
         self.letter_loc_stash[self.word_length] = loc_list
 
+        # if pruning by prefix, no word can start with a letter missing
+        # from the top of the prefix tree
+        self.trie = self.get_word_trie()
+        start_trie_node = None
+        if self.trie is not None:
+            start_trie_node = self.trie.get(start_letter)
+            if start_trie_node is None:
+                debug(f'FWFH no words of length {self.word_length} start '
+                      f'with {start_letter}')
+                return
+
+        # use one of the engines that do not copy letter maps if chosen
+        engine = self.reset_option.get(ENGINE_CHOICE)
+        if engine == SEARCH_ENGINE.bitmask:
+            self.word_queue.extend(bitmask_word_search(
+                box=self.box, side=self.side, start_cell=start_cell,
+                word_length=self.word_length, word_hint=self.hint,
+                word_check=self.passes_word_filters, trie=self.trie))
+            return
+        elif engine == SEARCH_ENGINE.iterative:
+            self.word_queue.extend(IterativeWordSearch(
+                box=self.box, side=self.side, start_cell=start_cell,
+                word_length=self.word_length, word_hint=self.hint,
+                word_check=self.passes_word_filters, trie=self.trie))
+            return
+
         # get the letter out of the starting cell, create a letter map with
         # that cell used, and adjust the letters needed accordingly
         start_word_letters = start_letter
@@ -314,7 +358,8 @@ class Box:
         start_letter_map = self.init_letter_map(start_cell)
 
         # the first letter of the hint already filtered in
-        # build_word_list_from_box
+        # build_word_list_from_box, but the rest may be anywhere in the word
+        self.hint_pattern = self.get_hint_pattern(self.word_length, self.hint)
 
         debug(f'FWFH starting point: '
               f'first letter: {start_word_letters} '
@@ -325,13 +370,69 @@ class Box:
                 letters_needed=letters_needed, prev_cell=start_cell,
                 prev_letter_map=start_letter_map,
                 prev_word_letters=start_word_letters,
-                prev_letters_loc=loc_list
+                prev_letters_loc=loc_list,
+                prev_trie_node=start_trie_node
         )
 
         debug(f'FWFH Get next letter returned')
 
         return
 
+    def get_hint_pattern(self, word_length: int, word_hint: str) \
+            -> HintPattern:
+        """
+        Place the letters revealed by the hint against the box as it is now.
+
+        :param word_length:
+        :param word_hint: e.g. "SH" or "?A??ER"
+        :return: the hint pattern
+        """
+        cells, letters, used_mask = flatten_box(self.box)
+        hint = HintPattern(word_hint=word_hint, word_length=word_length,
+                           letters=letters, used_mask=used_mask,
+                           side=self.side)
+        return hint
+
+    def use_prefix_check(self) -> bool:
+        """
+        Determine if the search should be pruned by the lexicon prefixes.
+
+        Pruning only makes sense when the words will be checked against the
+        dictionary anyway.
+
+        :return: true if prefix pruning was requested
+        """
+        use_prefix = self.reset_option.get(PREFIX_CHECK, False) and \
+            self.reset_option[DICTIONARY_CHECK]
+        return use_prefix
+
+    def get_word_trie(self) -> dict:
+        """
+        Get the prefix tree for the current word length if it is to be used.
+
+        :return: root of the prefix tree or None if not pruning
+        """
+        trie = None
+        if self.use_prefix_check():
+            trie = get_lexicon().get_trie(self.word_length)
+        return trie
+
+    def passes_word_filters(self, word: str) -> bool:
+        """
+        Apply the filters used when a complete word is found.
+
+        :param word:
+        :return: true if the word should be added to the queue
+        """
+        use_word = True
+        if self.reset_option[VOWEL_CHECK]:
+            if not contains_vowel(word):
+                use_word = False
+        if self.reset_option[DICTIONARY_CHECK]:
+            if not self.spell_check.check_word(word):
+                use_word = False
+        return use_word
+
     def init_letter_map(self, start_cell: CELL):
         """
         Initialize a used letter map and mark the starting cell as used.
@@ -355,7 +456,8 @@ class Box:
                         prev_cell: CELL,
                         prev_letter_map: list,
                         prev_word_letters: str,
-                        prev_letters_loc: list):
+                        prev_letters_loc: list,
+                        prev_trie_node: dict = None):
         """
         Recursive function to get the next available letter or report the word.
 
@@ -364,9 +466,14 @@ class Box:
         found before we have a word to try against the puzzle.
 
         If a hint has been provided, the letters in prev_word_letters match
-        the hint so far.  If the hint runs out at this point, we are free
-        to choose any available letter.  Otherwise, the letter chosen next
-        must match the next letter in the hint.
+        the hint so far.  If the hint does not reveal the next letter, we
+        are free to choose any available letter.  Otherwise, the letter
+        chosen next must match the letter revealed.  The path is abandoned
+        once a letter revealed later in the hint is too far away.
+
+        If a prefix tree node is provided, prev_word_letters lead to that
+        node and the next letter chosen must be one of its keys.  Any other
+        letter cannot start a word of the requested length.
 
         Note - with this many parameters and with recursion, all parameters
             must be provided using keywords.
@@ -376,6 +483,7 @@ class Box:
         :param prev_letter_map:
         :param prev_word_letters:
         :param prev_letters_loc:
+        :param prev_trie_node: prefix tree node for the letters so far
         :return: all the letters generated so far
         """
         # do we have a word yet?  If so report it, else get another letter
@@ -384,6 +492,11 @@ class Box:
             # default to adding word to queue
             use_word = True
 
+            # the letters must end a word in the prefix tree (if used)
+            if prev_trie_node is not None and \
+                    TRIE_END not in prev_trie_node:
+                use_word = False
+
             # apply filters as needed
             # vowel check
             if self.reset_option[VOWEL_CHECK]:
@@ -396,10 +509,27 @@ class Box:
 
             # if word passed the filters, add it to the queue
             if use_word:
-                this_word = FOUND_WORD(found_word=prev_word_letters,
-                                       letters_loc=prev_letters_loc)
+                this_word = compact_word(prev_word_letters, prev_letters_loc,
+                                         self.side)
                 self.word_queue.append(this_word)
 
+        elif not self.hint_pattern.can_finish(
+                prev_cell.pos.row * self.side + prev_cell.pos.col,
+                len(prev_word_letters) - 1):
+
+            # a letter revealed later in the hint is out of reach
+            debug(f'GNL {prev_cell.pos} too far from the rest of the hint')
+
+        elif letters_needed > 1 and count_reachable_cells(
+                prev_cell.pos.row * self.side + prev_cell.pos.col,
+                letter_map_mask(prev_letter_map), self.neighbor_masks,
+                letters_needed) < letters_needed:
+
+            # too few unused cells are still connected to this one to
+            # finish the word, so abandon this path
+            debug(f'GNL {prev_cell.pos} cut off with {letters_needed} '
+                  f'letters still needed')
+
         else:
 
             # capture this position as an anchor for this iteration
@@ -413,14 +543,12 @@ class Box:
             # capture the previous letter locations
             my_letter_locs = prev_letters_loc
 
-            # Determine if there are any hint letters left and select the
-            # next one.  Note that since Python indexes strings counting at
-            # zero, the length of the previously accumulated letters
-            # automatically points to the next letter needed in the hint.
-            if len(self.hint) > len(my_word_letters):
-                next_hint_letter = self.hint[len(my_word_letters)]
-            else:
-                next_hint_letter = None
+            # Determine if the hint reveals the next letter.  Note that
+            # since Python indexes strings counting at zero, the length of
+            # the previously accumulated letters automatically points to the
+            # position of the next letter in the hint.
+            next_hint_letter = self.hint_pattern.letter_at(
+                len(my_word_letters))
 
             # initialize my letter map and locations to the previous info
             my_letter_map = prev_letter_map
@@ -438,69 +566,75 @@ class Box:
             # loop through all the possible neighbors of this cell
             while True:
                 # try to get the next available neighbor and use it
-                try:
-                    # point to my search map in the try map stash
-                    my_search_map = self.try_map_stash[letters_needed]
-                    try_cell = self.find_next_available_cell(
-                        prev_cell, my_search_map, next_hint_letter)
-
-                    # mark that this cell has been tried (in the try map stash)
-                    _ = mark_cell_used(my_search_map, try_cell)
-                    # self.try_map_stash[letters_needed] = my_search_map
-
-                    # get a deep copy of the original starter map for this
-                    # level so that subsequent changes do not change the
-                    # original
-                    next_letter_map = deepcopy(
-                        self.starter_map_stash[letters_needed]
-                    )
-                    # get a deep copy of the original letter locations
-                    next_letters_loc = deepcopy(
-                        self.letter_loc_stash[letters_needed])
-
-                    # prepare variables for the next iteration
-                    next_cell = try_cell
-                    next_word_letters = my_word_letters + next_cell.letter
-                    next_letter_map = mark_cell_used(
-                        next_letter_map, next_cell)
-                    letter_loc = LETTER_LOC(found_letter=next_cell.letter,
-                                            letter_loc=next_cell.pos)
-                    next_letters_loc.append(letter_loc)
-                    next_letters_needed = letters_needed - 1
-                    debug(
-                        f'GNL recursing in, '
-                        f'still need: {next_letters_needed}, '
-                        f'next cell: {next_cell.pos}, '
-                        f'letters so far: {next_word_letters}, '
-                        f'next map:\n\t{next_letter_map}'
-                        )
-
-                    # call myself again if not enough letters found
-                    self.get_next_letter(
-                            letters_needed=next_letters_needed,
-                            prev_cell=next_cell,
-                            prev_letter_map=next_letter_map,
-                            prev_word_letters=next_word_letters,
-                            prev_letters_loc=next_letters_loc
-                    )
-                    debug('GNL returned for next try')
-                except LookupError:
+                # point to my search map in the try map stash
+                my_search_map = self.try_map_stash[letters_needed]
+                try_cell = self.find_next_available_cell(
+                    prev_cell, my_search_map, next_hint_letter,
+                    prev_trie_node)
+                if try_cell is None:
                     break
 
+                # mark that this cell has been tried (in the try map stash)
+                _ = mark_cell_used(my_search_map, try_cell)
+                # self.try_map_stash[letters_needed] = my_search_map
+
+                # get a deep copy of the original starter map for this
+                # level so that subsequent changes do not change the
+                # original
+                next_letter_map = deepcopy(
+                    self.starter_map_stash[letters_needed]
+                )
+                # get a deep copy of the original letter locations
+                next_letters_loc = deepcopy(
+                    self.letter_loc_stash[letters_needed])
+
+                # prepare variables for the next iteration
+                next_cell = try_cell
+                next_word_letters = my_word_letters + next_cell.letter
+                next_letter_map = mark_cell_used(
+                    next_letter_map, next_cell)
+                letter_loc = LETTER_LOC(found_letter=next_cell.letter,
+                                        letter_loc=next_cell.pos)
+                next_letters_loc.append(letter_loc)
+                next_letters_needed = letters_needed - 1
+                next_trie_node = None
+                if prev_trie_node is not None:
+                    next_trie_node = prev_trie_node[next_cell.letter]
+                debug(
+                    f'GNL recursing in, '
+                    f'still need: {next_letters_needed}, '
+                    f'next cell: {next_cell.pos}, '
+                    f'letters so far: {next_word_letters}, '
+                    f'next map:\n\t{next_letter_map}'
+                    )
+
+                # call myself again if not enough letters found
+                self.get_next_letter(
+                        letters_needed=next_letters_needed,
+                        prev_cell=next_cell,
+                        prev_letter_map=next_letter_map,
+                        prev_word_letters=next_word_letters,
+                        prev_letters_loc=next_letters_loc,
+                        prev_trie_node=next_trie_node
+                )
+                debug('GNL returned for next try')
+
             # exhausted all possible neighbors
             debug(f'GNL exhausted all neighbors of {my_cell.pos}')
         return
 
     def find_next_available_cell(self, current_cell: CELL,
                                  current_letter_map: list,
-                                 next_hint_letter: str) -> CELL:
+                                 next_hint_letter: str,
+                                 trie_node: dict = None) -> CELL:
         """
         Generate an available adjacent letter.
 
         :param current_cell:
         :param current_letter_map:
         :param next_hint_letter:
-        :return:
+        :param trie_node: prefix tree node limiting the letters allowed
+        :return: the neighboring cell or None if there are no more
         """
         # capture input
         my_letter_map = current_letter_map
@@ -508,54 +642,50 @@ class Box:
         debug(f'FNA start, start cell: {my_current_cell.pos}, '
               f'start map:\n\t{my_letter_map}')
 
-        # get the neighbors of the current cell
-        my_neighbors = my_current_cell.neighbors
+        # get the neighbors of the current cell from the neighbor table
+        my_neighbors = self.neighbor_table[
+            my_current_cell.pos.row * self.side + my_current_cell.pos.col]
 
         # set marker to default of failed to find an available cell
         found_cell = None
 
-        # walk through the available neighbors for one that has not been used
-        for pos, neighbor in enumerate(my_neighbors):
-            if neighbor == CELL_STATUS.AVAILABLE:
+        # walk through the neighbors for one that has not been used
+        for neighbor_ndx in my_neighbors:
+            row_pos, col_pos = divmod(neighbor_ndx, self.side)
 
-                # get the relative position of this neighbor
-                rel_pos = ADJ_LIST[pos]
+            # see if this position has been used
+            if my_letter_map[row_pos][col_pos] == CELL_STATUS.AVAILABLE:
+                possible_cell = self.box[row_pos][col_pos]
 
-                # compute the absolute location of this neighbor
-                abs_pos = CELL_POSITION(
-                    my_current_cell.pos.row + rel_pos.row,
-                    my_current_cell.pos.col + rel_pos.col
-                )
+                # skip letters that cannot continue any word
+                if trie_node is not None and \
+                        possible_cell.letter not in trie_node:
+                    continue
 
-                # see if this position has been used
-                if my_letter_map[abs_pos.row][abs_pos.col] == \
-                        CELL_STATUS.AVAILABLE:
-                    possible_cell = self.box[abs_pos.row][abs_pos.col]
-
-                    # see if we are restricted to a certain letter by the hint
-                    if next_hint_letter:
-                        if next_hint_letter == possible_cell.letter:
-                            found_cell = possible_cell
-                            debug(
-                                f'FNA returning, chosen cell: '
-                                f'{found_cell.pos}')
-                            break
-                    else:
+                # see if we are restricted to a certain letter by the hint
+                if next_hint_letter:
+                    if next_hint_letter == possible_cell.letter:
                         found_cell = possible_cell
-                        debug(f'FNA returning, chosen cell: {found_cell.pos}')
+                        debug(
+                            f'FNA returning, chosen cell: '
+                            f'{found_cell.pos}')
                         break
-
-        # check result of search
-        if not found_cell:
-            raise LookupError
+                else:
+                    found_cell = possible_cell
+                    debug(f'FNA returning, chosen cell: {found_cell.pos}')
+                    break
 
         return found_cell
 
-    def remove_word_letters(self, answer_word: FOUND_WORD):
+    def remove_word_letters(self, answer_word: FOUND_WORD) -> set:
         """
         Remove this word from the puzzle by marking these letters as used.
+
+        Each column holding a letter of the word is closed up once, no
+        matter how many of its letters are removed.
+
         :param answer_word:
-        :return:
+        :return: flat indexes (row * side + col) of the cells changed
         """
         # presumably the caller verified that this word came from the puzzle.
 
@@ -563,87 +693,82 @@ class Box:
         # puzzle at the locations specified.  (presume it for now.)
         # TODO verify that these letters are located correctly - 1/26/17
 
-        # sort the positions into top to bottom, left to right order
-        unsorted_pos = answer_word.letters_loc
-        sorted_pos = sorted(unsorted_pos,
-                            key=lambda s_pos: ((s_pos.col * 100) + s_pos.row))
+        # group the rows to remove by column, validating before moving
+        # anything
+        removed_rows = dict()
+        for pos in answer_word.letters_loc:
+            self.validate_position(pos)
+            removed_rows.setdefault(pos.col, set()).add(pos.row)
 
-        # for each position, remove the letter and let the ones above fall
-        for pos in sorted_pos:
-            self.remove_a_letter(pos)
+        # let the letters above the ones removed fall in each column
+        changed_cells = set()
+        for col, rows in removed_rows.items():
+            changed_cells |= self.compact_column(col, rows)
 
-        return
+        return changed_cells
 
-    def remove_a_letter(self, pos: CELL_POSITION):
+    def remove_a_letter(self, pos: CELL_POSITION) -> set:
         """
         Remove a letter from the puzzle and move the letters above it down.
 
         :param pos:
-        :return:
+        :return: flat indexes (row * side + col) of the cells changed
         """
+        self.validate_position(pos)
+        changed_cells = self.compact_column(pos.col, {pos.row})
+        return changed_cells
 
-        base_row = pos.row
-        col = pos.col
-        col_moves_done = False
+    def validate_position(self, pos: CELL_POSITION):
+        """
+        Make sure a letter to be removed is inside the box.
 
-        # validate before moving anything
-        if base_row < 0 or base_row >= self.side:
-            raise ValueError(f'row of {base_row} before removing a letter '
+        :param pos:
+        :return:
+        """
+        if pos.row < 0 or pos.row >= self.side:
+            raise ValueError(f'row of {pos.row} before removing a letter '
                              f'is invalid')
-        if col < 0 or col >= self.side:
-            raise ValueError(f'column of {col} before removing a letter is '
-                             f'invalid')
-
-        for curr_row in range(base_row, -1, -1):
-
-            # unpack information originally in the cell
-            orig_cell = self.box[curr_row][col]
-            orig_letter = orig_cell.letter
-            orig_neighbors = orig_cell.neighbors
-
-            # placeholder to build cell info to put back in the cell
-            new_cell = None
-
-            # evaluate the situation for this cell
-
-            # -- if cell is already used
-            # --- don't change anything
-            # --- bail out of loop
-            if orig_letter == CELL_VACANT:
-                new_cell = orig_cell
-                col_moves_done = True
-
-            # -- if the cell above is actually above the puzzle edge
-            # --- mark this cell as unavailable
-            # --- bail out of loop
-            elif orig_neighbors.UP == CELL_STATUS.EDGE:
-                new_cell = orig_cell._replace(my_availability=CELL_STATUS.USED,
-                                              letter=CELL_VACANT)
-                col_moves_done = True
-            else:
-                # extract above cell's letter for convenience
-                above_cell_letter = self.box[curr_row - 1][col].letter
-
-                # -- if the cell above has been marked unavailable
-                # --- mark this cell as unavailable
-                if above_cell_letter == CELL_VACANT:
-                    new_cell = orig_cell._replace(my_availability=CELL_STATUS.USED,
-                                                  letter=CELL_VACANT)
-                    col_moves_done = True
-                else:
+        if pos.col < 0 or pos.col >= self.side:
+            raise ValueError(f'column of {pos.col} before removing a letter '
+                             f'is invalid')
+        return
 
-                    # -- if the box above exists and has a letter
-                    # --- move the letter into this cell
-                    new_cell = orig_cell._replace(letter=above_cell_letter)
+    def compact_column(self, col: int, removed_rows: set) -> set:
+        """
+        Remove letters from a column and let the letters above them fall.
 
-            # update the cell in box
-            self.box[curr_row][col] = new_cell
+        The letters kept above the lowest one removed are packed down in
+        one pass and the cells left over at the top are marked as used.
+        Only the cells whose letters change are rebuilt.
 
-            # check for "doneness"
-            if col_moves_done:
-                break
+        :param col:
+        :param removed_rows: rows of the letters to remove
+        :return: flat indexes (row * side + col) of the cells changed
+        """
+        box = self.box
+        lowest_row = max(removed_rows)
+        kept_letters = [
+            box[row][col].letter for row in range(lowest_row + 1)
+            if row not in removed_rows and box[row][col].letter != CELL_VACANT]
+        new_letters = [CELL_VACANT] * (lowest_row + 1 - len(kept_letters)) + \
+            kept_letters
 
-        return
+        changed_cells = set()
+        for row, letter in enumerate(new_letters):
+            orig_cell = box[row][col]
+            if orig_cell.letter == letter:
+                continue
+            if letter == CELL_VACANT:
+                availability = CELL_STATUS.USED
+            else:
+                availability = orig_cell.my_availability
+            box[row][col] = CELL(pos=orig_cell.pos, letter=letter,
+                                 my_availability=availability,
+                                 neighbors=orig_cell.neighbors)
+            cell_ndx = row * self.side + col
+            changed_cells.add(cell_ndx)
+
+        return changed_cells
 
     def get_working_box_letters(self) -> list:
         """
@@ -687,29 +812,6 @@ def letter_gen(letters: str):
     return
 
 
-def fill_availability_box(my_pos: CELL_POSITION, side: int) -> AVAILABILITY:
-    """
-    Fill in an availability box for this position.
-
-    :param my_pos:
-    :param side:
-    :return:
-    """
-    my_adj_list = list()
-    for adjustment in ADJ_LIST:
-        neighbor_pos = (my_pos.row + adjustment[0], my_pos.col + adjustment[1])
-        if neighbor_pos[0] < 0 or neighbor_pos[0] >= side or \
-                neighbor_pos[1] < 0 or neighbor_pos[1] >= side:
-            my_adj_list.append(CELL_STATUS.EDGE)
-        else:
-            my_adj_list.append(CELL_STATUS.AVAILABLE)
-
-    # convert the list to a tuple
-    my_availability = AVAILABILITY._make(my_adj_list)
-
-    return my_availability
-
-
 def mark_cell_used(current_letter_map: list, current_cell: CELL) -> list:
     """
     Mark the given cell as used in the letter map.
@@ -4,19 +4,38 @@ technique.
 """
 
 # from datetime import datetime
-from collections import deque
+from collections import deque, OrderedDict
 from concurrent import futures
 from copy import deepcopy
 from functools import partial, partialmethod
 from logging import getLogger, debug, error
+from multiprocessing import Value
+from threading import Lock
 
 import maya
 
-from wordtrek.support.constants import AVAILABILITY, ADJ_LIST, FOUND_WORD, \
+from wordtrek.support.constants import FOUND_WORD, \
     LETTER_LOC, VOWEL_CHECK, DICTIONARY_CHECK, WORD_SELECTION, \
     FLIP_VOWEL_CHECK, FLIP_DICTIONARY_CHECK, CELL_VACANT, END_QUEUE_WORD, \
-    CELL, CELL_STATUS, CELL_POSITION, MAX_CORE_LIMIT, RAW_WORD_LIST
-from wordtrek.support.SpellChecker import SpellCheckerClass
+    CELL, CELL_STATUS, CELL_POSITION, MAX_CORE_LIMIT, RAW_WORD_LIST, \
+    PREFIX_CHECK, TRIE_END, ENGINE_CHOICE, SEARCH_ENGINE, SEARCH_STRATEGY, \
+    ANSWER_TARGET, LONG_WORD_LENGTH, DEFAULT_LONG_WORD_LENGTH, \
+    FIRST_PAGE_WORDS, RESULT_CACHE_SIZE, LOOKAHEAD_PATH_LIMIT, BOARD_STEP, \
+    COMPACT_WORD, KNOWN_ANSWER_LIMIT
+from wordtrek.support.BoxSearch import bitmask_word_search, \
+    IterativeWordSearch, fill_availability_box, neighbor_table, \
+    dictionary_word_search, neighbor_masks, count_reachable_cells, \
+    letter_map_mask, flatten_box, hint_pattern, HintPattern, \
+    multi_length_word_search, meet_in_middle_word_search, compact_word, \
+    board_hash, zobrist_value, matches_hint, apply_gravity, \
+    anchored_word_search
+from wordtrek.support.CandidateStore import CandidateStoreClass
+from wordtrek.support.Lexicon import get_lexicon
+from wordtrek.support.SearchCheckpoint import SearchCheckpointClass
+from wordtrek.support.SearchCursor import SearchCursorClass
+from wordtrek.support.SearchPlanner import choose_search_strategy
+from wordtrek.support.SpellChecker import get_spell_checker
+from wordtrek.support.WordTracer import get_box_tracer
 
 __author__ = 'Travis Risner'
 __project__ = "WordTS-Box"
@@ -25,6 +44,17 @@ __creation_date__ = "01/22/2017"
 
 log = None
 
+# good words of the most recent complete searches, keyed by result_key
+_result_cache = OrderedDict()
+_result_cache_lock = Lock()
+
+# background process searching ahead on the box left if a word is
+# accepted (started when first needed), and the turn of the search ahead
+# wanted - a search ahead stops once the turn has moved on past its own
+# (the worker is forked, so it shares this value)
+_speculation_pool = None
+_speculation_turn = Value('L', 0)
+
 
 class PuzzleBoxParallelClass:
     """
@@ -46,8 +76,16 @@ class PuzzleBoxParallelClass:
         # create a pipeline to receive words
         self.all_word_queue = deque()
 
-        # hold a list of all good words
-        self.good_word_list = deque()
+        # hold all the good words, grouped by word with their paths (and
+        # any lazy source of good words still to be found)
+        self.candidates = CandidateStoreClass(self.side)
+
+        # strategy chosen for the latest search
+        self.search_strategy = SEARCH_STRATEGY.board_first
+
+        # candidate store for each open answer (if searched all at once),
+        # keyed by ANSWER_TARGET - only valid until the box changes
+        self.answer_buckets = dict()
 
         # dictionary of pool of executors
         self.process_pool_dict = None
@@ -56,28 +94,46 @@ class PuzzleBoxParallelClass:
         # place to add found words
         self.my_box = ParallelBox(self.side, self.letters, self.reset_options)
 
-        # maintain a cache of previously retrieved words so only unique
-        # words are returned by default
-        self.word_cache = set()
-
         # last word returned - in case a variant of the same word is desired
         self.last_word_returned = None
 
-        # initialize the spell check api
-        self.spell_check = SpellCheckerClass()
+        # key to remember the good words under once a lazy search finishes
+        self.pending_result_key = None
+
+        # answers removed from the box, most recent last, and the answers
+        # taken back that may be removed again
+        self.history = list()
+        self.redo_steps = list()
+
+        # search ahead on the box left if the word shown is accepted and
+        # the hash of that box
+        self.speculation = None
+        self.speculation_hash = None
+
+        # the spell check api (set up once per process)
+        self.spell_check = get_spell_checker()
 
     def practical_core_limit(self, word_length: int, word_hint: str) -> int:
         """
         Compute the practical core limit due to memory limitations of this
         way of finding words.
 
+        Only the deep copy engine needs more memory as the words get
+        longer.  The other engines keep one stack entry per letter, so
+        every core can be used.
+
         :param word_length: length of word to be found
         :param word_hint: letters of hint
         :return: number of cores to use for this length of word
         """
         starting_core_limit = MAX_CORE_LIMIT
+        if self.reset_options.get(ENGINE_CHOICE, SEARCH_ENGINE.deep_copy) \
+                != SEARCH_ENGINE.deep_copy:
+            return starting_core_limit
         usable_limit = 1
-        letters_to_search = word_length - len(word_hint)
+        letters_to_search = word_length - len(
+            [letter for letter in hint_pattern(word_hint, word_length)
+             if letter is not None])
         if letters_to_search < 8:
             usable_limit = starting_core_limit
         elif letters_to_search == 8:
@@ -103,44 +159,150 @@ class PuzzleBoxParallelClass:
         # force hints to upper case
         my_word_hint = word_hint.upper()
 
-        # list of cells to process concurrently
-        cell_list = list()
+        # the same search of the same box may have been done already
+        result_key = self.result_key(my_word_length, my_word_hint)
+        if self.recall_results(result_key):
+            return
 
-        # walk through the box, picking each available position in turn as
-        # the starting point for a word
-        for cell_count, cell in enumerate(
-                self.my_box.get_next_starting_point()):
-            # box_count = cell_count
-            row_pos = cell.pos.row
-            col_pos = cell.pos.col
-            letter = cell.letter
-            debug(f'Starting position for next group of words - '
-                  f'Row: {row_pos}, '
-                  f'Column: {col_pos}, '
-                  f'Letter: {letter}'
-                  )
+        # the box may have been searched before, for an earlier answer
+        self.all_word_queue = deque()
 
-            # if any hint provided, launch search only if first letter matches
-            if len(my_word_hint) > 0 and letter != my_word_hint[0]:
-                continue
-            cell_list.append(cell)
+        # list of cells to process concurrently
+        cell_list = self.list_starting_cells(my_word_length, my_word_hint)
 
         # state the start of a search
         if len(my_word_hint) > 0:
             hint_wording = f'hint {my_word_hint}'
         else:
             hint_wording = 'no hint'
+        # choose between walking the box and tracing the lexicon words
+        strategy = self.plan_search(my_word_length, my_word_hint)
         print(f'Starting to search for a word of length {my_word_length} '
-              f'with {hint_wording}')
+              f'with {hint_wording} ({strategy.value})')
+
+        if strategy == SEARCH_STRATEGY.dictionary_first:
+            self.all_word_queue.extend(self.my_box.search_by_dictionary(
+                my_word_length, my_word_hint))
+        else:
+            self.search_box_in_parallel(
+                cell_list, my_word_length, my_word_hint,
+                checkpoint=self.open_checkpoint(my_word_length,
+                                                my_word_hint))
+
+        # copy raw word list to disk
+        rwl = open(RAW_WORD_LIST, mode='w')
+        for word in self.all_word_queue:
+            # word_found = word.found_word
+            print(word.found_word, file=rwl)
+        rwl.close()
+
+        # do any dictionary check or vowel check requested
+        self.extract_good_words()
+        self.remember_results(result_key, self.candidates)
+
+        # report statistics
+        print(f'{len(self.candidates)} useful words '
+              f'({self.candidates.word_count()} different) found out of '
+              f'{len(self.all_word_queue)} potential words')
+
+        return
+
+    def open_checkpoint(self, word_length: int, word_hint: str,
+                        targets: list = None) -> SearchCheckpointClass:
+        """
+        Prepare to save (or resume) the progress of a search of the box.
+
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :param targets: ANSWER_TARGET of the answers searched for at once
+            (if any), since the words found are kept by answer
+        :return: the checkpoint, holding any progress already saved
+        """
+        cells, letters, used_mask = flatten_box(self.my_box.box)
+        filters = (self.reset_options[VOWEL_CHECK],
+                   self.my_box.use_prefix_check())
+        if targets is not None:
+            filters += (tuple(targets),)
+        checkpoint = SearchCheckpointClass(
+            letters=letters, used_mask=used_mask, word_length=word_length,
+            word_hint=word_hint, filters=filters)
+        return checkpoint
+
+    def search_box_in_parallel(self, cell_list: list, word_length: int,
+                               word_hint: str, search_func=None,
+                               checkpoint: SearchCheckpointClass = None):
+        """
+        Walk the box from each starting cell, spread across the process pool.
+
+        If a checkpoint is given, the cells it shows as finished are not
+        searched again and the words found from each cell are recorded in
+        it as the cell finishes.
+
+        :param cell_list: cells to start from
+        :param word_length: longest word wanted
+        :param word_hint: hint (already in upper case)
+        :param search_func: function of a cell returning what is found from
+            it (defaults to find_words_from_here for this length and hint)
+        :param checkpoint: progress of this search saved on disk (optional)
+        :return:
+        """
+        my_word_length = word_length
+        my_word_hint = word_hint
+
+        # pick up the words from the cells finished by an earlier attempt
+        if checkpoint is not None:
+            self.all_word_queue.extend(checkpoint.found_words())
+            all_cells = cell_list
+            cell_list = [cell for cell in all_cells
+                         if not checkpoint.is_done(cell.pos)]
+
+        # load the lexicon before the pool starts so that the worker
+        # processes inherit it rather than each reading the word list
+        if self.my_box.use_prefix_check():
+            _ = get_lexicon()
+
         # original (linear) call looks lie this
         # self.my_box.find_words_from_here(cell, word_length, my_word_hint)
         # using partial to fix the invariant parameters
-        find_words_in_parallel = partial(self.my_box.find_words_from_here,
-                                         word_length=my_word_length,
-                                         word_hint=my_word_hint)
+        find_words_in_parallel = search_func
+        if find_words_in_parallel is None:
+            find_words_in_parallel = partial(
+                self.my_box.find_words_from_here, word_length=my_word_length,
+                word_hint=my_word_hint)
 
         # now run word search in parallel on an appropriate number of cores
-        usable_cores = self.practical_core_limit(my_word_length, hint_wording)
+        usable_cores = self.practical_core_limit(my_word_length, my_word_hint)
+        try:
+            self.run_search_pool(usable_cores, find_words_in_parallel,
+                                 cell_list, checkpoint)
+        finally:
+            # drop the checkpoint of a finished search, but keep the
+            # progress of an unfinished one for next time
+            if checkpoint is not None:
+                if all(checkpoint.is_done(cell.pos) for cell in all_cells):
+                    checkpoint.finish()
+                else:
+                    checkpoint.save()
+
+        debug(f'BWFB - returned from finding words from here')
+
+        # eliminate process pool references
+        self.process_pool_dict = None
+
+        return
+
+    def run_search_pool(self, usable_cores: int, find_words_in_parallel,
+                        cell_list: list, checkpoint: SearchCheckpointClass):
+        """
+        Search from each cell in the process pool, collecting the words.
+
+        :param usable_cores: number of worker processes
+        :param find_words_in_parallel: function of a cell returning what is
+            found from it
+        :param cell_list: cells to start from
+        :param checkpoint: progress of this search saved on disk (or None)
+        :return:
+        """
         with futures.ProcessPoolExecutor(max_workers=usable_cores) as pool:
 
             # search for words in the puzzle
@@ -160,6 +322,8 @@ class PuzzleBoxParallelClass:
                     word_count = len(word_list)
                     for found_word in word_list:
                         self.all_word_queue.append(found_word)
+                    if checkpoint is not None:
+                        checkpoint.record_cell(cell.pos, word_list)
                     # while word_list:
                     #     next_word = word_list.popleft()
                     #     self.all_word_queue.append(next_word)
@@ -182,59 +346,535 @@ class PuzzleBoxParallelClass:
                       f'at {maya.now().datetime(to_timezone="US/Eastern")}')
             pool.shutdown(wait=True)
 
-        debug(f'BWFB - returned from finding words from here')
+        return
 
-        # eliminate process pool references
-        self.process_pool_dict = None
+    def build_answer_buckets(self, targets: list):
+        """
+        Search the box once for the words of all the open answers.
 
-        # copy raw word list to disk
-        rwl = open(RAW_WORD_LIST, mode='w')
-        for word in self.all_word_queue:
-            # word_found = word.found_word
-            print(word.found_word, file=rwl)
-        rwl.close()
+        Every word found is put in the bucket of each answer it fits, so
+        switching to another answer needs no new search until the box
+        changes.
+
+        :param targets: list of ANSWER_TARGET
+        :return:
+        """
+        my_targets = [
+            target._replace(word_hint=target.word_hint.upper())
+            for target in targets]
+        self.answer_buckets = dict(
+            (target, CandidateStoreClass(self.side)) for target in my_targets)
+        if not my_targets:
+            return
+
+        # all the answers may have been searched for on the same box before
+        with _result_cache_lock:
+            stores = [_result_cache.get(self.result_key(target.word_length,
+                                                        target.word_hint))
+                      for target in my_targets]
+        if all(store is not None for store in stores):
+            print(f'Words for all {len(my_targets)} answers remembered from '
+                  f'an earlier search of the same box')
+            self.answer_buckets = dict(
+                (target, store.snapshot())
+                for target, store in zip(my_targets, stores))
+            return
+
+        # a cell is a starting point if any of the answers can start there
+        hints = [self.my_box.get_hint_pattern(target.word_length,
+                                              target.word_hint)
+                 for target in my_targets]
+        cell_list = [
+            cell for cell in self.my_box.get_next_starting_point()
+            if any(hint.may_start(cell.pos.row * self.side + cell.pos.col,
+                                  cell.letter) for hint in hints)]
+
+        lengths = sorted(set(target.word_length for target in my_targets))
+        print(f'Starting to search for words of lengths {lengths} for '
+              f'{len(my_targets)} answers')
+        self.fill_answer_buckets(my_targets, cell_list)
+
+        return
+
+    def fill_answer_buckets(self, targets: list, cell_list: list,
+                            changed_cells: set = None):
+        """
+        Search from the cells given and add the words to the answer buckets.
+
+        :param targets: list of ANSWER_TARGET (hints in upper case)
+        :param cell_list: cells to start from
+        :param changed_cells: if given, only the words through at least one
+            of these flat cell indexes are added
+        :return:
+        """
+        self.all_word_queue = deque()
+        find_all_lengths = partial(self.my_box.find_all_lengths_from_here,
+                                   targets=targets)
+        longest = max(target.word_length for target in targets)
+        self.search_box_in_parallel(
+            cell_list, longest, '', search_func=find_all_lengths,
+            checkpoint=self.open_checkpoint(longest, '', targets=targets))
 
         # do any dictionary check or vowel check requested
-        self.extract_good_words()
+        check_func = self.get_check_func()
+        for target, word_info in self.all_word_queue:
+            if changed_cells is not None and \
+                    changed_cells.isdisjoint(word_info.cells):
+                continue
+            if check_func is None or check_func(word_info.found_word):
+                self.answer_buckets[target].add(word_info)
 
         # report statistics
-        print(f'{len(self.good_word_list)} useful words found out of '
-              f'{len(self.all_word_queue)} potential words')
+        for target in targets:
+            self.remember_results(
+                self.result_key(target.word_length, target.word_hint),
+                self.answer_buckets[target])
+            print(f'{len(self.answer_buckets[target])} useful words found '
+                  f'for answer {target.answer_id}')
+        print(f'{len(self.all_word_queue)} potential words found in all')
+        self.all_word_queue = deque()
 
         return
 
-    def extract_good_words(self):
+    def update_answer_buckets(self, changed_cells: set):
         """
-        Extract the good words from the strings collected.
+        Bring the answer buckets up to date after letters have moved.
 
-        Note - after this method runs, the queue will be empty again.
+        The paths through the cells changed are dropped.  Only a path
+        through a changed cell can be new, and it can only start within
+        reach of one, so only those starting cells are searched again.
+
+        :param changed_cells: flat indexes of the cells whose letters
+            changed (or were removed)
         :return:
         """
+        targets = list(self.answer_buckets)
+        if not targets or not changed_cells:
+            return
+
+        dropped = sum(bucket.discard_paths(changed_cells)
+                      for bucket in self.answer_buckets.values())
+
+        # a cell is a starting point if an answer can start there and its
+        # word is long enough to reach a changed cell
+        hints = [(target.word_length,
+                  self.my_box.get_hint_pattern(target.word_length,
+                                               target.word_hint))
+                 for target in targets]
+        changed_pos = [divmod(cell_ndx, self.side)
+                       for cell_ndx in changed_cells]
+        cell_list = list()
+        for cell in self.my_box.get_next_starting_point():
+            cell_ndx = cell.pos.row * self.side + cell.pos.col
+            distance = min(max(abs(cell.pos.row - row),
+                               abs(cell.pos.col - col))
+                           for row, col in changed_pos)
+            if any(distance < word_length and
+                   hint.may_start(cell_ndx, cell.letter)
+                   for word_length, hint in hints):
+                cell_list.append(cell)
+
+        print(f'{len(changed_cells)} cells changed, {dropped} paths dropped, '
+              f'searching again from {len(cell_list)} cells for '
+              f'{len(targets)} answers')
+        self.fill_answer_buckets(targets, cell_list,
+                                 changed_cells=changed_cells)
+        return
 
-        # determine check to be made
+    def use_answer_bucket(self, target: ANSWER_TARGET) -> bool:
+        """
+        Offer the words already found for an answer, if there are any.
+
+        :param target: the answer, its length and its hint
+        :return: true if the answer was part of the last search of them all
+        """
+        my_target = target._replace(word_hint=target.word_hint.upper())
+        bucket = self.answer_buckets.get(my_target)
+        if bucket is None:
+            return False
+
+        self.kill_any_word_searches()
+        self.candidates = bucket
+        self.candidates.restart()
+        return True
+
+    def plan_search(self, word_length: int, word_hint: str) \
+            -> SEARCH_STRATEGY:
+        """
+        Choose whether to walk the box or to trace the lexicon words.
+
+        Tracing the lexicon words needs the lexicon, so it is considered
+        only when the search may be pruned by prefix.
+
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :return: the strategy to use
+        """
+        strategy = SEARCH_STRATEGY.board_first
+        if self.my_box.use_prefix_check():
+            lexicon = get_lexicon()
+            if lexicon.is_loaded():
+                strategy = choose_search_strategy(
+                    box=self.my_box.box, side=self.side,
+                    word_length=word_length, word_hint=word_hint,
+                    words=lexicon.get_words(word_length),
+                    prefix_counts=lexicon.get_prefix_counts(word_length),
+                    lexicon_version=lexicon.version)
+        self.search_strategy = strategy
+        return strategy
+
+    def list_starting_cells(self, word_length: int, word_hint: str) -> list:
+        """
+        List the cells that can start a word, in the order to be searched.
+
+        A cell is skipped if it does not hold the first letter revealed by
+        the hint or if it is too far away from any other letter revealed.
+        When the search is anchored on a later letter of the hint, the cells
+        holding that letter are listed instead.
+
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :return: list of cells
+        """
+        cell_list = list()
+        hint = self.my_box.get_hint_pattern(word_length, word_hint)
+        anchor = self.my_box.get_search_anchor(word_length, word_hint)
+        if anchor is not None:
+            debug(f'Anchoring the search on {anchor[1]} at position '
+                  f'{anchor[0]} of the hint {word_hint}')
+
+        # walk through the box, picking each available position in turn as
+        # the starting point for a word
+        for cell_count, cell in enumerate(
+                self.my_box.get_next_starting_point()):
+            # box_count = cell_count
+            row_pos = cell.pos.row
+            col_pos = cell.pos.col
+            letter = cell.letter
+            debug(f'Starting position for next group of words - '
+                  f'Row: {row_pos}, '
+                  f'Column: {col_pos}, '
+                  f'Letter: {letter}'
+                  )
+
+            # launch an anchored search only from the anchor letter
+            if anchor is not None:
+                anchor_position, anchor_letter = anchor
+                cell_ndx = row_pos * self.side + col_pos
+                if letter == anchor_letter and \
+                        hint.can_begin(cell_ndx, anchor_position) and \
+                        hint.can_finish(cell_ndx, anchor_position):
+                    cell_list.append(cell)
+                continue
+
+            # launch a search only if the cell can start a word fitting
+            # the hint
+            if not hint.may_start(
+                    row_pos * self.side + col_pos, letter):
+                continue
+            cell_list.append(cell)
+
+        return cell_list
+
+    def stream_word_list_from_box(self, word_length: int, word_hint: str):
+        """
+        Prepare to find words lazily, only as they are asked for.
+
+        Only the first page of words is found here.  Each call to
+        get_a_word past that page resumes the search just long enough to
+        find the next word that passes the filters, so the rest of the box
+        is searched only as far as the words are used.
+
+        :param word_length:
+        :param word_hint:
+        :return:
+        """
+        result_key = self.result_key(word_length, word_hint.upper())
+        if self.recall_results(result_key):
+            return
+
+        first_words, cursor = self.find_first_words(
+            word_length, word_hint, FIRST_PAGE_WORDS)
+        self.candidates.extend(first_words)
+        self.candidates.set_source(cursor)
+
+        # the words can be remembered once the search runs to the end
+        self.pending_result_key = result_key
+        return
+
+    def trace_known_words(self, words: list, word_length: int,
+                          word_hint: str) -> list:
+        """
+        Find which of the words given can be traced on the box as it is.
+
+        Only the first KNOWN_ANSWER_LIMIT words of the right length that
+        fit the hint are tried.
+
+        :param words: words (most likely first) to try
+        :param word_length:
+        :param word_hint:
+        :return: list of COMPACT_WORD, every path of each word that fits
+        """
+        my_word_hint = word_hint.upper()
+        tracer = get_box_tracer(self.my_box.box, self.side)
+        known_words = list()
+        words_tried = 0
+        for word in words:
+            my_word = word.upper()
+            if len(my_word) != word_length or not my_word.isalpha() or \
+                    not matches_hint(my_word, my_word_hint):
+                continue
+            words_tried += 1
+            if words_tried > KNOWN_ANSWER_LIMIT:
+                break
+            known_words.extend(
+                COMPACT_WORD(found_word=my_word, cells=path, side=self.side)
+                for path in tracer.trace(my_word))
+        return known_words
+
+    def offer_known_words(self, known_words: list, search_func):
+        """
+        Offer some words first, searching the box only if they run out.
+
+        :param known_words: COMPACT_WORD already traced on the box as it is
+        :param search_func: function preparing the usual search of the box
+            for the same answer
+        :return:
+        """
+        self.candidates.extend(known_words)
+        self.candidates.set_source(self.search_after_known_words(search_func))
+        print(f'{len(self.candidates)} words solved before '
+              f'({self.candidates.word_count()} different) fit the box')
+        return
+
+    def search_after_known_words(self, search_func):
+        """
+        Search the box for the words not offered yet, once they are asked for.
+
+        The search is prepared in a store of its own, so the words offered
+        so far stay where they are.  A lazy search is remembered once it
+        has run to the end, as usual.
+
+        :param search_func: function preparing the usual search of the box
+        :return: generator of COMPACT_WORD
+        """
+        print('No word solved before was accepted - searching the box')
+        known_store = self.candidates
+        self.candidates = CandidateStoreClass(self.side)
+        try:
+            search_func()
+            found_store = self.candidates
+            result_key = self.pending_result_key
+        finally:
+            self.candidates = known_store
+            self.pending_result_key = None
+        yield from found_store.drain()
+        if result_key is not None:
+            self.remember_results(result_key, found_store)
+        return
+
+    def result_key(self, word_length: int, word_hint: str,
+                   box_hash: int = None) -> tuple:
+        """
+        Build the key the good words of a search are remembered under.
+
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :param box_hash: hash of another box to search (defaults to the
+            box as it is now)
+        :return: the box hash, size, word length, hint and filters
+        """
+        if box_hash is None:
+            box_hash = self.my_box.board_hash
+        key = (box_hash, self.side, word_length, word_hint,
+               self.reset_options[VOWEL_CHECK],
+               self.reset_options[DICTIONARY_CHECK],
+               self.my_box.use_prefix_check())
+        return key
+
+    def remember_results(self, key: tuple, store: CandidateStoreClass):
+        """
+        Keep a copy of the good words of a complete search.
+
+        Only the most recent RESULT_CACHE_SIZE searches are kept.
+
+        :param key: as built by result_key
+        :param store: the good words found
+        :return:
+        """
+        with _result_cache_lock:
+            _result_cache[key] = store.snapshot()
+            _result_cache.move_to_end(key)
+            while len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+        return
+
+    def recall_results(self, key: tuple) -> bool:
+        """
+        Offer the good words remembered from the same search, if any.
+
+        :param key: as built by result_key
+        :return: true if the words were remembered
+        """
+        with _result_cache_lock:
+            store = _result_cache.get(key)
+            if store is None:
+                return False
+            _result_cache.move_to_end(key)
+        self.candidates.close_source()
+        self.candidates = store.snapshot()
+        print(f'{len(self.candidates)} useful words '
+              f'({self.candidates.word_count()} different) remembered from '
+              f'an earlier search of the same box')
+        return True
+
+    def find_first_words(self, word_length: int, word_hint: str,
+                         word_count: int) -> tuple:
+        """
+        Find the first few good words, keeping the rest of the search.
+
+        :param word_length:
+        :param word_hint:
+        :param word_count: number of good words wanted now
+        :return: tuple of (list of COMPACT_WORD, SearchCursorClass holding
+            the search suspended after the last of them)
+        """
+        my_word_hint = word_hint.upper()
+        strategy = self.plan_search(word_length, my_word_hint)
+        print(f'Starting a lazy search for a word of length {word_length} '
+              f'with hint "{my_word_hint}" ({strategy.value})')
+        cursor = self.open_search_cursor(word_length, my_word_hint)
+        first_words = cursor.take(word_count)
+        print(f'{len(first_words)} useful words found in the first '
+              f'{cursor.searches_started} searches')
+        return first_words, cursor
+
+    def open_search_cursor(self, word_length: int, word_hint: str,
+                           keep_progress: bool = True) \
+            -> SearchCursorClass:
+        """
+        Prepare a search of the box that finds good words only when asked.
+
+        Each starting cell is searched only once the cells before it have
+        run out of words.  Unless told otherwise, the progress of a walk
+        of the box is kept in a checkpoint, as each starting cell runs out,
+        just as it is for a full search.
+
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :param keep_progress: false if no checkpoint is wanted
+        :return: the cursor, with nothing searched yet
+        """
+        checkpoint = None
+        if self.search_strategy == SEARCH_STRATEGY.dictionary_first:
+            word_searches = iter([self.my_box.search_by_dictionary(
+                word_length, word_hint)])
+        else:
+            cell_list = self.list_starting_cells(word_length, word_hint)
+            if keep_progress:
+                checkpoint = self.open_checkpoint(word_length, word_hint)
+                word_searches = self.list_word_searches(
+                    cell_list, word_length, word_hint, checkpoint)
+            else:
+                word_searches = (
+                    self.my_box.search_from_here(cell, word_length,
+                                                 word_hint)
+                    for cell in cell_list)
+        cursor = SearchCursorClass(word_searches,
+                                   check_func=self.get_check_func(),
+                                   checkpoint=checkpoint)
+        return cursor
+
+    def list_word_searches(self, cell_list: list, word_length: int,
+                           word_hint: str,
+                           checkpoint: SearchCheckpointClass):
+        """
+        Generate the word search from each starting cell, keeping progress.
+
+        The words from the cells finished by an earlier attempt come first,
+        as a single search, and those cells are not searched again.  The
+        checkpoint is dropped once every cell has run out (the cursor
+        writes it if closed before then).
+
+        (Internal call from open_search_cursor)
+
+        :param cell_list: cells to start from
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :param checkpoint: progress of this search saved on disk
+        :return: generator of word searches (iterators of found words)
+        """
+        if checkpoint.cells_done:
+            yield iter(checkpoint.found_words())
+        for cell in cell_list:
+            if not checkpoint.is_done(cell.pos):
+                yield self.record_word_search(cell, word_length, word_hint,
+                                              checkpoint)
+        checkpoint.finish()
+        return
+
+    def record_word_search(self, cell: CELL, word_length: int,
+                           word_hint: str,
+                           checkpoint: SearchCheckpointClass):
+        """
+        Search from a starting cell, noting its words once it runs out.
+
+        (Internal call from list_word_searches)
+
+        :param cell:
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :param checkpoint: progress of this search saved on disk
+        :return: generator of the words found from the cell
+        """
+        word_list = list()
+        for word_info in self.my_box.search_from_here(cell, word_length,
+                                                      word_hint):
+            word_list.append(word_info)
+            yield word_info
+        checkpoint.record_cell(cell.pos, word_list)
+        return
+
+    def get_check_func(self):
+        """
+        Determine the check a word must pass to be worth showing.
+
+        :return: function to check a word or None if no check is needed
+        """
         check_func = None
         if self.reset_options[DICTIONARY_CHECK]:
             check_func = self.spell_check.check_word
         elif self.reset_options[VOWEL_CHECK]:
             check_func = contains_vowel
+        return check_func
+
+    def extract_good_words(self):
+        """
+        Extract the good words from the strings collected.
+
+        Note - after this method runs, the queue will be empty again.
+        :return:
+        """
+
+        # determine check to be made
+        check_func = self.get_check_func()
 
         # run all the words by the appropriate function and save the good ones
         if check_func:
             for word_info in self.all_word_queue:
                 word = word_info.found_word
                 if check_func(word):
-                    self.good_word_list.append(word_info)
+                    self.candidates.add(word_info)
                     # while True:
                     #     word_info = self.all_word_queue.get()
                     #     word = word_info.found_word
                     #     if word == END_QUEUE_MARKER:
                     #         break
                     #     if check_func(word):
-                    #         self.good_word_list.append(word_info)
+                    #         self.candidates.add(word_info)
 
         else:
-            for word_info in self.all_word_queue.get():
-                self.good_word_list.append(word_info)
+            self.candidates.extend(self.all_word_queue)
 
         return
 
@@ -242,76 +882,267 @@ class PuzzleBoxParallelClass:
         """
         Return one word from the queue.
 
-        The word returned depends on the kind flag.  A cache of previously
-        returned words is kept so that only unique words are returned by
+        The word returned depends on the kind flag.  The candidate store
+        keeps each word once so that only unique words are returned by
         default.  However, if the kind desired is a variant of the same
-        word (using different boxes in the puzzle), then return only those
-        variants.  If requested to flush the queue, clear the queue and
-        treat it as request for the next (first) unique word.
+        word (using different boxes in the puzzle), then return the next
+        of its variants.  If requested to flush the cache, start again
+        from the first unique word.
 
         :param kind: kind of word desired
         :return: a found word tuple
         """
 
         request_type = kind
-        next_word = None
 
         # request is for the cache to be flushed before retrieving a word
         if request_type == WORD_SELECTION.flush_cache:
-            self.word_cache = set()
+            self.candidates.restart()
             request_type = WORD_SELECTION.unique_word
 
         # request is for the next unique word
         if request_type == WORD_SELECTION.unique_word:
-            while True:
-                self.last_word_returned = self._next_word()
-                if self.last_word_returned.found_word in self.word_cache:
-                    continue
-                else:
-                    self.word_cache.add(self.last_word_returned.found_word)
-                    break
+            self.last_word_returned = self.candidates.next_unique()
         # request for a variant of the same word
         elif request_type == WORD_SELECTION.same_word:
-            while True:
-                next_word = self._next_word()
-                if next_word.found_word == self.last_word_returned.found_word:
-                    self.last_word_returned = next_word
-                    break
-                elif next_word == END_QUEUE_WORD:
-                    self.last_word_returned = next_word
-                    break
-                else:
-                    continue
+            if self.last_word_returned is None:
+                self.last_word_returned = END_QUEUE_WORD
+            else:
+                self.last_word_returned = self.candidates.next_variant(
+                    self.last_word_returned.found_word)
         else:
             raise ValueError(f'Unable to handle request of "{kind}" in '
                              f'get_a_word')
 
-        # clear cache if end of queue encountered (probably redundant)
-        if self.last_word_returned == END_QUEUE_WORD:
-            self.word_cache = set()
+        # a lazy search that has run to the end has found all its words
+        if self.pending_result_key is not None and \
+                self.candidates.word_source is None:
+            self.remember_results(self.pending_result_key, self.candidates)
+            self.pending_result_key = None
 
         return self.last_word_returned
 
-    def _next_word(self) -> FOUND_WORD:
+    def rank_candidates(self, score_func):
         """
-        Return each good word_info found in turn via a generator
+        Offer first the words that leave the best box for the other answers.
+
+        All the words must be known to rank them, so any lazy search is run
+        to the end first.
+
+        :param score_func: function giving the score of a path (bytes) -
+            higher is better
         :return:
         """
-        try:
-            word_info = self.good_word_list.popleft()
-        except IndexError:
-            word_info = END_QUEUE_WORD
-        return word_info
+        while self.candidates.pull_from_source():
+            pass
+        if self.pending_result_key is not None:
+            self.remember_results(self.pending_result_key, self.candidates)
+            self.pending_result_key = None
+
+        paths_scored = self.candidates.rank(score_func, LOOKAHEAD_PATH_LIMIT)
+        print(f'{paths_scored} of {len(self.candidates)} useful words ranked '
+              f'by what they leave for the other answers')
+        return
 
-    def remove_an_answer(self, answer_word: FOUND_WORD):
+    def remove_an_answer(self, answer_word: FOUND_WORD, answer_id=None):
         """
         Remove the last word from the puzzle box.
         :param answer_word:
+        :param answer_id: the answer the word was accepted for (if known)
+        :return:
+        """
+        # a lazy search under way now mixes words from before and after
+        self.pending_result_key = None
+        cells_before = dict()
+        changed_cells = self.my_box.remove_word_letters(
+            answer_word, replaced_cells=cells_before)
+
+        # the words found for the other answers are still there unless
+        # they pass through a cell whose letter has changed (the buckets
+        # before are kept as they were in case the answer is taken back)
+        buckets_before = self.answer_buckets
+        self.answer_buckets = dict(
+            (target, bucket.snapshot())
+            for target, bucket in buckets_before.items()
+            if target.answer_id != answer_id)
+        self.update_answer_buckets(changed_cells)
+
+        # note the step so that it can be taken back
+        cells_after = dict((cell_ndx, self.my_box.get_cell(cell_ndx))
+                           for cell_ndx in cells_before)
+        self.history.append(BOARD_STEP(
+            answer_id=answer_id, answer_word=answer_word,
+            cells_before=cells_before, cells_after=cells_after,
+            buckets_before=buckets_before, buckets_after=self.answer_buckets))
+        self.redo_steps = list()
+
+        return
+
+    def undo_answer(self) -> BOARD_STEP:
+        """
+        Take back the answer removed most recently.
+
+        Only the cells the answer changed are put back, and the answer
+        buckets (and any good words remembered for the box) are the ones
+        found before it was removed.
+
+        :return: the step taken back or None if there is nothing to undo
+        """
+        if not self.history:
+            return None
+        step = self.history.pop()
+        self.restore_step(step.cells_before, step.buckets_before)
+        self.redo_steps.append(step)
+        return step
+
+    def redo_answer(self) -> BOARD_STEP:
+        """
+        Remove again the answer taken back most recently.
+
+        :return: the step removed again or None if there is nothing to redo
+        """
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.restore_step(step.cells_after, step.buckets_after)
+        self.history.append(step)
+        return step
+
+    def restore_step(self, cells: dict, answer_buckets: dict):
+        """
+        Put the box and the answer buckets back the way they were.
+
+        :param cells: CELL to put back, keyed by flat cell index
+        :param answer_buckets: the answer buckets to use
+        :return:
+        """
+        self.my_box.swap_cells(cells)
+        self.answer_buckets = answer_buckets
+        self.clear_word_list()
+        return
+
+    def speculate(self, word_info: FOUND_WORD, targets: list):
+        """
+        Search ahead, in the background, on the box left if a word is taken.
+
+        The search runs in a background process.  The good words found for
+        each answer are remembered just as a search of that box would
+        remember them, so if the word is accepted the search for the next
+        answer finds them ready.  Any search ahead for an earlier word is
+        stopped, and answers already remembered for that box are skipped.
+
+        :param word_info: the word shown (COMPACT_WORD or FOUND_WORD)
+        :param targets: ANSWER_TARGET of the answers to search for, the
+            most likely to be wanted next first
+        :return:
+        """
+        self.cancel_speculation()
+        if isinstance(word_info, COMPACT_WORD) and \
+                word_info.side == self.side:
+            path = word_info.cells
+        else:
+            path = bytes(loc.letter_loc.row * self.side + loc.letter_loc.col
+                         for loc in word_info.letters_loc)
+        letters_left = self.letters_after_path(path)
+        self.speculation_hash = board_hash(letters_left, self.side)
+        my_targets = list()
+        for target in targets:
+            my_target = target._replace(word_hint=target.word_hint.upper())
+            if not has_cached_results(self.result_key(
+                    my_target.word_length, my_target.word_hint,
+                    box_hash=self.speculation_hash)):
+                my_targets.append(my_target)
+        if not my_targets:
+            return
+
+        # load the lexicon before the worker starts so that it inherits it
+        if self.my_box.use_prefix_check():
+            _ = get_lexicon()
+
+        with _speculation_turn.get_lock():
+            _speculation_turn.value += 1
+            turn = _speculation_turn.value
+        self.speculation = get_speculation_pool().submit(
+            precompute_word_lists, self.side, letters_left, my_targets,
+            dict(self.reset_options), turn)
+        self.speculation.add_done_callback(remember_search_ahead)
+        return
+
+    def letters_after_path(self, path: bytes) -> str:
+        """
+        Work out the board left if some cells are removed.
+
+        The box itself is not changed.
+
+        :param path: flat index of each cell removed
+        :return: one letter per cell, CELL_VACANT for an empty cell
+        """
+        cells, letters, used_mask = flatten_box(self.my_box.box)
+        letters_left = apply_gravity(''.join(letters), self.side, path)
+        return letters_left
+
+    def letters_after_word(self, answer_word: FOUND_WORD) -> str:
+        """
+        Work out the board left if a word is removed from the box.
+
+        The box itself is not changed.
+
+        :param answer_word: the word with the CELL_POSITION of each letter
+        :return: one letter per cell (CELL_VACANT for an empty cell), or
+            None if the word is not in the box at the locations given
+        """
+        if not all(0 <= pos.row < self.side and 0 <= pos.col < self.side
+                   for pos in answer_word.letters_loc):
+            return None
+        path = bytes(pos.row * self.side + pos.col
+                     for pos in answer_word.letters_loc)
+        if not get_box_tracer(self.my_box.box, self.side).is_path(
+                answer_word.found_word, path):
+            return None
+        letters_left = self.letters_after_path(path)
+        return letters_left
+
+    def settle_speculation(self):
+        """
+        Wait for a search ahead on the box as it is now, or stop any other.
+
+        (Called before searching the box for an answer)
+
+        :return:
+        """
+        if self.speculation is None:
+            return
+        if self.speculation_hash != self.my_box.board_hash:
+            self.cancel_speculation()
+            return
+        if not self.speculation.done():
+            print('Waiting for the search ahead on this box to finish')
+        remember_search_ahead(self.speculation)
+        self.speculation = None
+        return
+
+    def cancel_speculation(self):
+        """
+        Stop any search ahead, whether it has started or not.
+
         :return:
         """
+        if self.speculation is not None:
+            with _speculation_turn.get_lock():
+                _speculation_turn.value += 1
+            self.speculation.cancel()
+            self.speculation = None
+        return
 
-        self.my_box.remove_word_letters(answer_word)
+    def clear_word_list(self):
+        """
+        Drop the words offered so far, before searching for another answer.
 
+        :return:
+        """
+        self.kill_any_word_searches()
+        self.candidates = CandidateStoreClass(self.side)
+        self.last_word_returned = None
         return
 
     def get_working_box_letters(self) -> list:
@@ -334,6 +1165,9 @@ class PuzzleBoxParallelClass:
                     print(f'{task} successfully cancelled')
                 else:
                     print(f'Unable to cancel {task}')
+        self.pending_result_key = None
+        self.candidates.close_source()
+        self.cancel_speculation()
         return
 
     def __str__(self) -> str:
@@ -370,10 +1204,20 @@ class ParallelBox:
 
         # set other variables
         self.box = None
+        self.neighbor_table = None
+        self.neighbor_masks = None
         self.word_length = None
         self.hint = None
+        self.hint_pattern = None
         self.word_queue = deque()
 
+        # prefix tree of the words of the requested length (if used)
+        self.trie = None
+
+        # hash of the letters in the box, kept up to date as letters are
+        # removed
+        self.board_hash = None
+
         # fill in the static information in the box
         self.fill_cells_in_box()
 
@@ -428,15 +1272,30 @@ class ParallelBox:
                 # determine neighbor status
                 my_pos = CELL_POSITION(row=row_pos, col=col_pos)
                 my_neighbors = fill_availability_box(my_pos, self.side)
+
+                # a box saved part way through a puzzle has empty cells
+                letter = get_letter.__next__()
+                if letter == CELL_VACANT:
+                    availability = CELL_STATUS.USED
+                else:
+                    availability = CELL_STATUS.AVAILABLE
                 row.append(CELL(pos=my_pos,
-                                letter=get_letter.__next__(),
-                                my_availability=CELL_STATUS.AVAILABLE,
+                                letter=letter,
+                                my_availability=availability,
                                 neighbors=my_neighbors))
             self.box.append(row)
 
         # shut down letter generator for future use.
         get_letter.close()
 
+        self.board_hash = board_hash(
+            ''.join(cell.letter for row in self.box for cell in row),
+            self.side)
+
+        # flat indexes of the neighbors of each cell (row * side + col)
+        self.neighbor_table = neighbor_table(self.side)
+        self.neighbor_masks = neighbor_masks(self.side)
+
     def get_next_starting_point(self):
         """
         Walk through the box returning each valid starting point for a word.
@@ -478,6 +1337,24 @@ class ParallelBox:
         loc_list = [letter_loc]
         self.letter_loc_stash[self.word_length] = loc_list
 
+        # if pruning by prefix, no word can start with a letter missing
+        # from the top of the prefix tree (an anchored search starts from
+        # a letter later in the word)
+        self.trie = self.get_word_trie()
+        start_trie_node = None
+        if self.trie is not None and not self.uses_anchor_engine():
+            start_trie_node = self.trie.get(start_letter)
+            if start_trie_node is None:
+                debug(f'FWFH no words of length {self.word_length} start '
+                      f'with {start_letter}')
+                return self.word_queue
+
+        # use one of the engines that do not copy letter maps if chosen
+        if self.uses_anchor_engine() or self.uses_stack_engine() or \
+                self.uses_long_word_engine():
+            self.word_queue.extend(self.get_word_search(start_cell))
+            return self.word_queue
+
         # get the letter out of the starting cell, create a letter map with
         # that cell used, and adjust the letters needed accordingly
         start_word_letters = start_letter
@@ -485,7 +1362,8 @@ class ParallelBox:
         start_letter_map = self.init_letter_map(start_cell)
 
         # the first letter of the hint already filtered in
-        # build_word_list_from_box
+        # build_word_list_from_box, but the rest may be anywhere in the word
+        self.hint_pattern = self.get_hint_pattern(self.word_length, self.hint)
 
         debug(f'FWFH starting point: '
               f'first letter: {start_word_letters} '
@@ -496,7 +1374,8 @@ class ParallelBox:
             letters_needed=letters_needed, prev_cell=start_cell,
             prev_letter_map=start_letter_map,
             prev_word_letters=start_word_letters,
-            prev_letters_loc=loc_list
+            prev_letters_loc=loc_list,
+            prev_trie_node=start_trie_node
         )
 
         debug(f'FWFH Get next letter returned')
@@ -514,6 +1393,221 @@ class ParallelBox:
 
     # get_words_in_parallel = partialmethod(find_words_from_here, ??)
 
+    def search_from_here(self, cell: CELL, word_length: int, word_hint: str):
+        """
+        Return an iterator over the words found from a starting point.
+
+        The engines that keep their own stack (and the anchored and long
+        word engines) find each word only when the next one is asked for.
+        The deep copy engine finds them all first.
+
+        :param cell:
+        :param word_length:
+        :param word_hint:
+        :return: iterator of COMPACT_WORD
+        """
+        self.word_length = word_length
+        self.hint = word_hint.upper()
+        if self.uses_anchor_engine() or self.uses_stack_engine() or \
+                self.uses_long_word_engine():
+            self.trie = self.get_word_trie()
+            word_search = self.get_word_search(cell)
+        else:
+            self.word_queue = deque()
+            word_search = iter(
+                self.find_words_from_here(cell, word_length, word_hint))
+        return word_search
+
+    def find_all_lengths_from_here(self, cell: CELL, targets: list) -> list:
+        """
+        Given a starting point, find the words for several answers at once.
+
+        :param cell:
+        :param targets: list of ANSWER_TARGET
+        :return: list of tuples of (ANSWER_TARGET, COMPACT_WORD)
+        """
+        tries = None
+        if self.use_prefix_check():
+            lexicon = get_lexicon()
+            tries = dict((target.word_length,
+                          lexicon.get_trie(target.word_length))
+                         for target in targets)
+        word_list = list(multi_length_word_search(
+            box=self.box, side=self.side, start_cell=cell, targets=targets,
+            word_check=self.passes_word_filters, tries=tries))
+        return word_list
+
+    def search_by_dictionary(self, word_length: int, word_hint: str):
+        """
+        Return an iterator over the lexicon words that can be traced.
+
+        :param word_length:
+        :param word_hint:
+        :return: iterator of COMPACT_WORD
+        """
+        self.word_length = word_length
+        self.hint = word_hint.upper()
+        word_search = dictionary_word_search(
+            box=self.box, side=self.side, word_length=self.word_length,
+            word_hint=self.hint, words=get_lexicon().get_words(word_length),
+            word_check=self.passes_word_filters)
+        return word_search
+
+    def uses_stack_engine(self) -> bool:
+        """
+        Determine if one of the engines that keep their own stack is chosen.
+
+        :return: true for the bitmask or iterative engine
+        """
+        engine = self.reset_option.get(ENGINE_CHOICE)
+        stack_engine = engine in (SEARCH_ENGINE.bitmask,
+                                  SEARCH_ENGINE.iterative)
+        return stack_engine
+
+    def uses_long_word_engine(self) -> bool:
+        """
+        Determine if the words wanted are long enough to meet in the middle.
+
+        Meeting in the middle needs the prefix trees of the lexicon, so it
+        is used only when the search is pruned by prefix.
+
+        :return: true if the current word length is at or above the limit
+        """
+        long_word_length = self.reset_option.get(
+            LONG_WORD_LENGTH, DEFAULT_LONG_WORD_LENGTH)
+        long_word = self.word_length >= long_word_length and \
+            self.use_prefix_check() and get_lexicon().is_loaded()
+        return long_word
+
+    def get_search_anchor(self, word_length: int, word_hint: str) -> tuple:
+        """
+        Find the revealed letter to start the search from, if not the first.
+
+        Searching out both ways from the rarest letter revealed tries only
+        the paths through it.  If pruning by prefix, the walk back follows
+        the prefix tree of the words spelled backwards.
+
+        :param word_length:
+        :param word_hint: hint (already in upper case)
+        :return: (position, letter) of the anchor or None
+        """
+        anchor = self.get_hint_pattern(word_length, word_hint).anchor
+        if anchor is None or anchor[0] == 0:
+            return None
+        return anchor
+
+    def uses_anchor_engine(self) -> bool:
+        """
+        Determine if the search is anchored on a later letter of the hint.
+
+        :return: true if the current hint has an anchor to start from
+        """
+        anchored = self.get_search_anchor(self.word_length,
+                                          self.hint) is not None
+        return anchored
+
+    def get_word_search(self, start_cell: CELL):
+        """
+        Create the chosen stack engine to search from a starting point.
+
+        Very long words are found by meeting in the middle instead, and a
+        hint with a rare letter after the first is searched from that
+        letter's cells.  The word length, hint and prefix tree must already
+        be set.
+
+        :param start_cell: first cell, or anchor cell if anchored
+        :return: iterator of COMPACT_WORD
+        """
+        if self.uses_anchor_engine():
+            tail_trie = None
+            reverse_trie = None
+            if self.trie is not None:
+                lexicon = get_lexicon()
+                anchor_position = self.get_search_anchor(
+                    self.word_length, self.hint)[0]
+                tail_trie = lexicon.get_tail_trie(self.word_length,
+                                                  anchor_position)
+                reverse_trie = lexicon.get_reverse_trie(self.word_length)
+            word_search = anchored_word_search(
+                box=self.box, side=self.side, anchor_cell=start_cell,
+                word_length=self.word_length, word_hint=self.hint,
+                word_check=self.passes_word_filters, tail_trie=tail_trie,
+                reverse_trie=reverse_trie)
+        elif self.uses_long_word_engine():
+            lexicon = get_lexicon()
+            word_search = meet_in_middle_word_search(
+                box=self.box, side=self.side, start_cell=start_cell,
+                word_length=self.word_length, word_hint=self.hint,
+                trie=self.trie,
+                reverse_trie=lexicon.get_reverse_trie(self.word_length),
+                word_check=self.passes_word_filters,
+                lexicon_version=lexicon.version)
+        elif self.reset_option.get(ENGINE_CHOICE) == SEARCH_ENGINE.bitmask:
+            word_search = bitmask_word_search(
+                box=self.box, side=self.side, start_cell=start_cell,
+                word_length=self.word_length, word_hint=self.hint,
+                word_check=self.passes_word_filters, trie=self.trie)
+        else:
+            word_search = IterativeWordSearch(
+                box=self.box, side=self.side, start_cell=start_cell,
+                word_length=self.word_length, word_hint=self.hint,
+                word_check=self.passes_word_filters, trie=self.trie)
+        return word_search
+
+    def get_hint_pattern(self, word_length: int, word_hint: str) \
+            -> HintPattern:
+        """
+        Place the letters revealed by the hint against the box as it is now.
+
+        :param word_length:
+        :param word_hint: e.g. "SH" or "?A??ER"
+        :return: the hint pattern
+        """
+        cells, letters, used_mask = flatten_box(self.box)
+        hint = HintPattern(word_hint=word_hint, word_length=word_length,
+                           letters=letters, used_mask=used_mask,
+                           side=self.side)
+        return hint
+
+    def use_prefix_check(self) -> bool:
+        """
+        Determine if the search should be pruned by the lexicon prefixes.
+
+        Pruning only makes sense when the words will be checked against the
+        dictionary anyway.
+
+        :return: true if prefix pruning was requested
+        """
+        use_prefix = self.reset_option.get(PREFIX_CHECK, False) and \
+            self.reset_option[DICTIONARY_CHECK]
+        return use_prefix
+
+    def get_word_trie(self) -> dict:
+        """
+        Get the prefix tree for the current word length if it is to be used.
+
+        :return: root of the prefix tree or None if not pruning
+        """
+        trie = None
+        if self.use_prefix_check():
+            trie = get_lexicon().get_trie(self.word_length)
+        return trie
+
+    def passes_word_filters(self, word: str) -> bool:
+        """
+        Apply the filters used when a complete word is found.
+
+        (The dictionary check is done later by extract_good_words.)
+
+        :param word:
+        :return: true if the word should be kept
+        """
+        use_word = True
+        if self.reset_option[VOWEL_CHECK]:
+            if not contains_vowel(word):
+                use_word = False
+        return use_word
+
     def init_letter_map(self, start_cell: CELL):
         """
         Initialize a used letter map and mark the starting cell as used.
@@ -537,7 +1631,8 @@ class ParallelBox:
                         prev_cell: CELL,
                         prev_letter_map: list,
                         prev_word_letters: str,
-                        prev_letters_loc: list):
+                        prev_letters_loc: list,
+                        prev_trie_node: dict = None):
         """
         Recursive function to get the next available letter or report the word.
 
@@ -546,9 +1641,14 @@ class ParallelBox:
         found before we have a word to try against the puzzle.
 
         If a hint has been provided, the letters in prev_word_letters match
-        the hint so far.  If the hint runs out at this point, we are free
-        to choose any available letter.  Otherwise, the letter chosen next
-        must match the next letter in the hint.
+        the hint so far.  If the hint does not reveal the next letter, we
+        are free to choose any available letter.  Otherwise, the letter
+        chosen next must match the letter revealed.  The path is abandoned
+        once a letter revealed later in the hint is too far away.
+
+        If a prefix tree node is provided, prev_word_letters lead to that
+        node and the next letter chosen must be one of its keys.  Any other
+        letter cannot start a word of the requested length.
 
         Note - with this many parameters and with recursion, all parameters
             must be provided using keywords.
@@ -558,6 +1658,7 @@ class ParallelBox:
         :param prev_letter_map:
         :param prev_word_letters:
         :param prev_letters_loc:
+        :param prev_trie_node: prefix tree node for the letters so far
         :return: all the letters generated so far
         """
         # do we have a word yet?  If so report it, else get another letter
@@ -566,6 +1667,11 @@ class ParallelBox:
             # default to adding word to queue
             use_word = True
 
+            # the letters must end a word in the prefix tree (if used)
+            if prev_trie_node is not None and \
+                    TRIE_END not in prev_trie_node:
+                use_word = False
+
             # apply filters as needed
             # vowel check
             if self.reset_option[VOWEL_CHECK]:
@@ -578,10 +1684,27 @@ class ParallelBox:
 
             # if word passed the filters, add it to the queue
             if use_word:
-                this_word = FOUND_WORD(found_word=prev_word_letters,
-                                       letters_loc=prev_letters_loc)
+                this_word = compact_word(prev_word_letters, prev_letters_loc,
+                                         self.side)
                 self.word_queue.append(this_word)
 
+        elif not self.hint_pattern.can_finish(
+                prev_cell.pos.row * self.side + prev_cell.pos.col,
+                len(prev_word_letters) - 1):
+
+            # a letter revealed later in the hint is out of reach
+            debug(f'GNL {prev_cell.pos} too far from the rest of the hint')
+
+        elif letters_needed > 1 and count_reachable_cells(
+                prev_cell.pos.row * self.side + prev_cell.pos.col,
+                letter_map_mask(prev_letter_map), self.neighbor_masks,
+                letters_needed) < letters_needed:
+
+            # too few unused cells are still connected to this one to
+            # finish the word, so abandon this path
+            debug(f'GNL {prev_cell.pos} cut off with {letters_needed} '
+                  f'letters still needed')
+
         else:
 
             # capture this position as an anchor for this iteration
@@ -595,14 +1718,12 @@ class ParallelBox:
             # capture the previous letter locations
             my_letter_locs = prev_letters_loc
 
-            # Determine if there are any hint letters left and select the
-            # next one.  Note that since Python indexes strings counting at
-            # zero, the length of the previously accumulated letters
-            # automatically points to the next letter needed in the hint.
-            if len(self.hint) > len(my_word_letters):
-                next_hint_letter = self.hint[len(my_word_letters)]
-            else:
-                next_hint_letter = None
+            # Determine if the hint reveals the next letter.  Note that
+            # since Python indexes strings counting at zero, the length of
+            # the previously accumulated letters automatically points to the
+            # position of the next letter in the hint.
+            next_hint_letter = self.hint_pattern.letter_at(
+                len(my_word_letters))
 
             # initialize my letter map and locations to the previous info
             my_letter_map = prev_letter_map
@@ -620,55 +1741,59 @@ class ParallelBox:
             # loop through all the possible neighbors of this cell
             while True:
                 # try to get the next available neighbor and use it
-                try:
-                    # point to my search map in the try map stash
-                    my_search_map = self.try_map_stash[letters_needed]
-                    try_cell = self.find_next_available_cell(
-                        prev_cell, my_search_map, next_hint_letter)
-
-                    # mark that this cell has been tried (in the try map stash)
-                    _ = mark_cell_used(my_search_map, try_cell)
-                    # self.try_map_stash[letters_needed] = my_search_map
-
-                    # get a deep copy of the original starter map for this
-                    # level so that subsequent changes do not change the
-                    # original
-                    next_letter_map = deepcopy(
-                        self.starter_map_stash[letters_needed]
-                    )
-                    # get a deep copy of the original letter locations
-                    next_letters_loc = deepcopy(
-                        self.letter_loc_stash[letters_needed])
-
-                    # prepare variables for the next iteration
-                    next_cell = try_cell
-                    next_word_letters = my_word_letters + next_cell.letter
-                    next_letter_map = mark_cell_used(
-                        next_letter_map, next_cell)
-                    letter_loc = LETTER_LOC(found_letter=next_cell.letter,
-                                            letter_loc=next_cell.pos)
-                    next_letters_loc.append(letter_loc)
-                    next_letters_needed = letters_needed - 1
-                    debug(
-                        f'GNL recursing in, '
-                        f'still need: {next_letters_needed}, '
-                        f'next cell: {next_cell.pos}, '
-                        f'letters so far: {next_word_letters}, '
-                        f'next map:\n\t{next_letter_map}'
-                    )
-
-                    # call myself again if not enough letters found
-                    self.get_next_letter(
-                        letters_needed=next_letters_needed,
-                        prev_cell=next_cell,
-                        prev_letter_map=next_letter_map,
-                        prev_word_letters=next_word_letters,
-                        prev_letters_loc=next_letters_loc
-                    )
-                    debug('GNL returned for next try')
-                except LookupError:
+                # point to my search map in the try map stash
+                my_search_map = self.try_map_stash[letters_needed]
+                try_cell = self.find_next_available_cell(
+                    prev_cell, my_search_map, next_hint_letter,
+                    prev_trie_node)
+                if try_cell is None:
                     break
 
+                # mark that this cell has been tried (in the try map stash)
+                _ = mark_cell_used(my_search_map, try_cell)
+                # self.try_map_stash[letters_needed] = my_search_map
+
+                # get a deep copy of the original starter map for this
+                # level so that subsequent changes do not change the
+                # original
+                next_letter_map = deepcopy(
+                    self.starter_map_stash[letters_needed]
+                )
+                # get a deep copy of the original letter locations
+                next_letters_loc = deepcopy(
+                    self.letter_loc_stash[letters_needed])
+
+                # prepare variables for the next iteration
+                next_cell = try_cell
+                next_word_letters = my_word_letters + next_cell.letter
+                next_letter_map = mark_cell_used(
+                    next_letter_map, next_cell)
+                letter_loc = LETTER_LOC(found_letter=next_cell.letter,
+                                        letter_loc=next_cell.pos)
+                next_letters_loc.append(letter_loc)
+                next_letters_needed = letters_needed - 1
+                next_trie_node = None
+                if prev_trie_node is not None:
+                    next_trie_node = prev_trie_node[next_cell.letter]
+                debug(
+                    f'GNL recursing in, '
+                    f'still need: {next_letters_needed}, '
+                    f'next cell: {next_cell.pos}, '
+                    f'letters so far: {next_word_letters}, '
+                    f'next map:\n\t{next_letter_map}'
+                )
+
+                # call myself again if not enough letters found
+                self.get_next_letter(
+                    letters_needed=next_letters_needed,
+                    prev_cell=next_cell,
+                    prev_letter_map=next_letter_map,
+                    prev_word_letters=next_word_letters,
+                    prev_letters_loc=next_letters_loc,
+                    prev_trie_node=next_trie_node
+                )
+                debug('GNL returned for next try')
+
             # exhausted all possible neighbors
             debug(f'GNL exhausted all neighbors of {my_cell.pos}')
 
@@ -678,14 +1803,16 @@ class ParallelBox:
 
     def find_next_available_cell(self, current_cell: CELL,
                                  current_letter_map: list,
-                                 next_hint_letter: str) -> CELL:
+                                 next_hint_letter: str,
+                                 trie_node: dict = None) -> CELL:
         """
         Generate an available adjacent letter.
 
         :param current_cell:
         :param current_letter_map:
         :param next_hint_letter:
-        :return:
+        :param trie_node: prefix tree node limiting the letters allowed
+        :return: the neighboring cell or None if there are no more
         """
         # capture input
         my_letter_map = current_letter_map
@@ -693,143 +1820,175 @@ class ParallelBox:
         debug(f'FNA start, start cell: {my_current_cell.pos}, '
               f'start map:\n\t{my_letter_map}')
 
-        # get the neighbors of the current cell
-        my_neighbors = my_current_cell.neighbors
+        # get the neighbors of the current cell from the neighbor table
+        my_neighbors = self.neighbor_table[
+            my_current_cell.pos.row * self.side + my_current_cell.pos.col]
 
         # set marker to default of failed to find an available cell
         found_cell = None
 
-        # walk through the available neighbors for one that has not been used
-        for pos, neighbor in enumerate(my_neighbors):
-            if neighbor == CELL_STATUS.AVAILABLE:
+        # walk through the neighbors for one that has not been used
+        for neighbor_ndx in my_neighbors:
+            row_pos, col_pos = divmod(neighbor_ndx, self.side)
 
-                # get the relative position of this neighbor
-                rel_pos = ADJ_LIST[pos]
+            # see if this position has been used
+            if my_letter_map[row_pos][col_pos] == CELL_STATUS.AVAILABLE:
+                possible_cell = self.box[row_pos][col_pos]
 
-                # compute the absolute location of this neighbor
-                abs_pos = CELL_POSITION(
-                    my_current_cell.pos.row + rel_pos.row,
-                    my_current_cell.pos.col + rel_pos.col
-                )
+                # skip letters that cannot continue any word
+                if trie_node is not None and \
+                        possible_cell.letter not in trie_node:
+                    continue
 
-                # see if this position has been used
-                if my_letter_map[abs_pos.row][abs_pos.col] == \
-                        CELL_STATUS.AVAILABLE:
-                    possible_cell = self.box[abs_pos.row][abs_pos.col]
-
-                    # see if we are restricted to a certain letter by the hint
-                    if next_hint_letter:
-                        if next_hint_letter == possible_cell.letter:
-                            found_cell = possible_cell
-                            debug(
-                                f'FNA returning, chosen cell: '
-                                f'{found_cell.pos}')
-                            break
-                    else:
+                # see if we are restricted to a certain letter by the hint
+                if next_hint_letter:
+                    if next_hint_letter == possible_cell.letter:
                         found_cell = possible_cell
-                        debug(f'FNA returning, chosen cell: {found_cell.pos}')
+                        debug(
+                            f'FNA returning, chosen cell: '
+                            f'{found_cell.pos}')
                         break
-
-        # check result of search
-        if not found_cell:
-            raise LookupError
+                else:
+                    found_cell = possible_cell
+                    debug(f'FNA returning, chosen cell: {found_cell.pos}')
+                    break
 
         return found_cell
 
-    def remove_word_letters(self, answer_word: FOUND_WORD):
+    def remove_word_letters(self, answer_word: FOUND_WORD,
+                            replaced_cells: dict = None) -> set:
         """
         Remove this word from the puzzle by marking these letters as used.
-        :param answer_word:
-        :return:
-        """
-        # presumably the caller verified that this word came from the puzzle.
-
-        # possibly verify that the letters in accepted_word are in the
-        # puzzle at the locations specified.  (presume it for now.)
-        # TODO verify that these letters are located correctly - 1/26/17
 
-        # sort the positions into top to bottom, left to right order
-        unsorted_pos = answer_word.letters_loc
-        sorted_pos = sorted(unsorted_pos,
-                            key=lambda s_pos: ((s_pos.col * 100) + s_pos.row))
+        Each column holding a letter of the word is closed up once, no
+        matter how many of its letters are removed.
 
-        # for each position, remove the letter and let the ones above fall
-        for pos in sorted_pos:
-            self.remove_a_letter(pos)
+        :param answer_word:
+        :param replaced_cells: if given, each CELL replaced is added to it,
+            keyed by flat cell index
+        :return: flat indexes (row * side + col) of the cells changed
+        """
+        # group the rows to remove by column, validating before moving
+        # anything
+        removed_rows = dict()
+        for pos in answer_word.letters_loc:
+            self.validate_position(pos)
+            removed_rows.setdefault(pos.col, set()).add(pos.row)
+
+        # verify that the letters of the word are in the puzzle at the
+        # locations specified
+        cells = [pos.row * self.side + pos.col
+                 for pos in answer_word.letters_loc]
+        if not get_box_tracer(self.box, self.side).is_path(
+                answer_word.found_word, cells):
+            raise ValueError(f'{answer_word.found_word} is not in the puzzle '
+                             f'at the locations given')
+
+        # let the letters above the ones removed fall in each column
+        changed_cells = set()
+        for col, rows in removed_rows.items():
+            changed_cells |= self.compact_column(col, rows, replaced_cells)
+
+        return changed_cells
+
+    def remove_a_letter(self, pos: CELL_POSITION) -> set:
+        """
+        Remove a letter from the puzzle and move the letters above it down.
 
-        return
+        :param pos:
+        :return: flat indexes (row * side + col) of the cells changed
+        """
+        self.validate_position(pos)
+        changed_cells = self.compact_column(pos.col, {pos.row})
+        return changed_cells
 
-    def remove_a_letter(self, pos: CELL_POSITION):
+    def validate_position(self, pos: CELL_POSITION):
         """
-        Remove a letter from the puzzle and move the letters above it down.
+        Make sure a letter to be removed is inside the box.
 
         :param pos:
         :return:
         """
+        if pos.row < 0 or pos.row >= self.side:
+            raise ValueError(f'row of {pos.row} before removing a letter '
+                             f'is invalid')
+        if pos.col < 0 or pos.col >= self.side:
+            raise ValueError(f'column of {pos.col} before removing a letter '
+                             f'is invalid')
+        return
 
-        base_row = pos.row
-        col = pos.col
-        col_moves_done = False
+    def compact_column(self, col: int, removed_rows: set,
+                       replaced_cells: dict = None) -> set:
+        """
+        Remove letters from a column and let the letters above them fall.
 
-        # validate before moving anything
-        if base_row < 0 or base_row >= self.side:
-            raise ValueError(f'row of {base_row} before removing a letter '
-                             f'is invalid')
-        if col < 0 or col >= self.side:
-            raise ValueError(f'column of {col} before removing a letter is '
-                             f'invalid')
-
-        for curr_row in range(base_row, -1, -1):
-
-            # unpack information originally in the cell
-            orig_cell = self.box[curr_row][col]
-            orig_letter = orig_cell.letter
-            orig_neighbors = orig_cell.neighbors
-
-            # placeholder to build cell info to put back in the cell
-            new_cell = None
-
-            # evaluate the situation for this cell
-
-            # -- if cell is already used
-            # --- don't change anything
-            # --- bail out of loop
-            if orig_letter == CELL_VACANT:
-                new_cell = orig_cell
-                col_moves_done = True
-
-            # -- if the cell above is actually above the puzzle edge
-            # --- mark this cell as unavailable
-            # --- bail out of loop
-            elif orig_neighbors.UP == CELL_STATUS.EDGE:
-                new_cell = orig_cell._replace(my_availability=CELL_STATUS.USED,
-                                              letter=CELL_VACANT)
-                col_moves_done = True
-            else:
-                # extract above cell's letter for convenience
-                above_cell_letter = self.box[curr_row - 1][col].letter
-
-                # -- if the cell above has been marked unavailable
-                # --- mark this cell as unavailable
-                if above_cell_letter == CELL_VACANT:
-                    new_cell = orig_cell._replace(
-                        my_availability=CELL_STATUS.USED,
-                        letter=CELL_VACANT)
-                    col_moves_done = True
-                else:
+        The letters kept above the lowest one removed are packed down in
+        one pass and the cells left over at the top are marked as used.
+        Only the cells whose letters change are rebuilt.
 
-                    # -- if the box above exists and has a letter
-                    # --- move the letter into this cell
-                    new_cell = orig_cell._replace(letter=above_cell_letter)
+        :param col:
+        :param removed_rows: rows of the letters to remove
+        :param replaced_cells: if given, each CELL replaced is added to it,
+            keyed by flat cell index
+        :return: flat indexes (row * side + col) of the cells changed
+        """
+        box = self.box
+        lowest_row = max(removed_rows)
+        kept_letters = [
+            box[row][col].letter for row in range(lowest_row + 1)
+            if row not in removed_rows and box[row][col].letter != CELL_VACANT]
+        new_letters = [CELL_VACANT] * (lowest_row + 1 - len(kept_letters)) + \
+            kept_letters
+
+        changed_cells = set()
+        for row, letter in enumerate(new_letters):
+            orig_cell = box[row][col]
+            if orig_cell.letter == letter:
+                continue
+            if letter == CELL_VACANT:
+                availability = CELL_STATUS.USED
+            else:
+                availability = orig_cell.my_availability
+            box[row][col] = CELL(pos=orig_cell.pos, letter=letter,
+                                 my_availability=availability,
+                                 neighbors=orig_cell.neighbors)
+            cell_ndx = row * self.side + col
+            self.board_hash ^= \
+                zobrist_value(self.side, cell_ndx, orig_cell.letter) ^ \
+                zobrist_value(self.side, cell_ndx, letter)
+            changed_cells.add(cell_ndx)
+            if replaced_cells is not None:
+                replaced_cells.setdefault(cell_ndx, orig_cell)
+
+        return changed_cells
+
+    def get_cell(self, cell_ndx: int) -> CELL:
+        """
+        Return the cell at a flat cell index.
 
-            # update the cell in box
-            self.box[curr_row][col] = new_cell
+        :param cell_ndx: row * side + col
+        :return:
+        """
+        row, col = divmod(cell_ndx, self.side)
+        return self.box[row][col]
 
-            # check for "doneness"
-            if col_moves_done:
-                break
+    def swap_cells(self, cells: dict) -> dict:
+        """
+        Put cells saved earlier back in the box, keeping the hash current.
 
-        return
+        :param cells: CELL to put in the box, keyed by flat cell index
+        :return: the CELL replaced, keyed the same way
+        """
+        replaced_cells = dict()
+        for cell_ndx, cell in cells.items():
+            row, col = divmod(cell_ndx, self.side)
+            orig_cell = self.box[row][col]
+            self.box[row][col] = cell
+            self.board_hash ^= \
+                zobrist_value(self.side, cell_ndx, orig_cell.letter) ^ \
+                zobrist_value(self.side, cell_ndx, cell.letter)
+            replaced_cells[cell_ndx] = orig_cell
+        return replaced_cells
 
     def get_working_box_letters(self) -> list:
         """
@@ -847,6 +2006,97 @@ class ParallelBox:
         return disp_box
 
 
+def has_cached_results(key: tuple) -> bool:
+    """
+    Check if the good words for a search are remembered.
+
+    :param key: from result_key
+    :return: true if the result cache holds the words
+    """
+    with _result_cache_lock:
+        cached = key in _result_cache
+    return cached
+
+
+def get_speculation_pool() -> futures.ProcessPoolExecutor:
+    """
+    Return the background process that searches ahead, starting it once.
+
+    :return: the process pool (of one worker)
+    """
+    global _speculation_pool
+    if _speculation_pool is None:
+        _speculation_pool = futures.ProcessPoolExecutor(max_workers=1)
+    return _speculation_pool
+
+
+def precompute_word_lists(side: int, letters: str, targets: list,
+                          reset_options: dict, turn: int) -> list:
+    """
+    Search a box for the good words of some answers.
+
+    The worker keeps the lexicon and the spell checker from one search
+    ahead to the next.
+
+    (Run in the background process by PuzzleBoxParallelClass.speculate)
+
+    :param side: the size of one side of the puzzle
+    :param letters: one letter per cell, CELL_VACANT for an empty cell
+    :param targets: ANSWER_TARGET of the answers to search for
+    :param reset_options: the options in effect when the search was asked
+    :param turn: the turn of this search ahead (it stops once
+        _speculation_turn moves past it)
+    :return: list of (result key, CandidateStoreClass) for each answer
+        whose words were all found
+    """
+    pb = PuzzleBoxParallelClass(side, letters, reset_options)
+    results = list()
+    for target in targets:
+        if _speculation_turn.value != turn:
+            break
+        key = pb.result_key(target.word_length, target.word_hint)
+        pb.plan_search(target.word_length, target.word_hint)
+        # the board searched ahead may never come about, so its progress
+        # is not worth keeping
+        cursor = pb.open_search_cursor(target.word_length, target.word_hint,
+                                       keep_progress=False)
+        store = CandidateStoreClass(side)
+        for word_info in cursor:
+            if _speculation_turn.value != turn:
+                cursor.close()
+                return results
+            store.add(word_info)
+        results.append((key, store))
+    return results
+
+
+def remember_search_ahead(speculation: futures.Future):
+    """
+    Remember the good words found by a search ahead once it is done.
+
+    (Called as the search ahead finishes, and again by settle_speculation)
+
+    :param speculation: future of precompute_word_lists
+    :return:
+    """
+    try:
+        results = speculation.result()
+    except futures.CancelledError:
+        return
+    except Exception as ex:
+        error(f'Search ahead failed: {ex}')
+        return
+    with _result_cache_lock:
+        for key, store in results:
+            if key not in _result_cache:
+                _result_cache[key] = store
+            _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    debug(f'{len(results)} answers searched ahead')
+    return
+
+
 def contains_vowel(word: str) -> bool:
     """
     Check a word to see if it contains a vowel.
@@ -873,29 +2123,6 @@ def letter_gen(letters: str):
     return
 
 
-def fill_availability_box(my_pos: CELL_POSITION, side: int) -> AVAILABILITY:
-    """
-    Fill in an availability box for this position.
-
-    :param my_pos:
-    :param side:
-    :return:
-    """
-    my_adj_list = list()
-    for adjustment in ADJ_LIST:
-        neighbor_pos = (my_pos.row + adjustment[0], my_pos.col + adjustment[1])
-        if neighbor_pos[0] < 0 or neighbor_pos[0] >= side or \
-                        neighbor_pos[1] < 0 or neighbor_pos[1] >= side:
-            my_adj_list.append(CELL_STATUS.EDGE)
-        else:
-            my_adj_list.append(CELL_STATUS.AVAILABLE)
-
-    # convert the list to a tuple
-    my_availability = AVAILABILITY._make(my_adj_list)
-
-    return my_availability
-
-
 def mark_cell_used(current_letter_map: list, current_cell: CELL) -> list:
     """
     Mark the given cell as used in the letter map.
@@ -0,0 +1,188 @@
+"""
+SearchCheckpoint.py - Save the progress of a long search to disk.
+
+A search of a big box for a long word can take minutes.  If the server is
+reloaded or the process dies part way through, that work would be lost.
+As each starting cell finishes, the words found from it are noted in a
+checkpoint file, written every few seconds.  A search started again for
+the same box, word length, hint and filters (or the same answers, when
+they are searched for all at once) picks up the words from the
+checkpoint and searches only the starting cells not yet finished.
+
+The file is named after a digest of everything that affects the words
+found, so a checkpoint is never used for a different search.  It is
+removed once the search it belongs to is complete.  The files are kept
+under the project directory (BASE_DIR in the Django settings), whatever
+the working directory of the server.
+"""
+
+from hashlib import sha1
+from logging import debug, error
+from os import makedirs, remove, replace
+from os.path import join, exists
+import pickle
+import time
+
+from django.conf import settings
+
+from wordtrek.support.constants import CELL_POSITION, \
+    SEARCH_CHECKPOINT_DIR, CHECKPOINT_INTERVAL
+
+
+class SearchCheckpointClass:
+    """
+    Progress of one search, by starting cell, kept on disk.
+    """
+
+    def __init__(self, *, letters: list, used_mask: int, word_length: int,
+                 word_hint: str, filters: tuple,
+                 directory: str = None,
+                 interval: float = CHECKPOINT_INTERVAL):
+        """
+        Describe the search and load any checkpoint left for it.
+
+        :param letters: flat list of letters in the box
+        :param used_mask: bitmask of unusable cells
+        :param word_length: number of letters wanted
+        :param word_hint: hint (already in upper case)
+        :param filters: settings that change which words are kept
+        :param directory: where the checkpoint files are kept (defaults
+            to checkpoint_directory())
+        :param interval: least number of seconds between writes
+        """
+        self.search_key = (''.join(letters), used_mask, word_length,
+                           word_hint, filters)
+        digest = sha1(repr(self.search_key).encode('utf-8')).hexdigest()
+        if directory is None:
+            directory = checkpoint_directory()
+        self.directory = directory
+        self.file_name = join(directory, f'search_{digest}.pickle')
+        self.interval = interval
+
+        # words found from each finished starting cell, keyed by position
+        self.cells_done = dict()
+
+        # time of the last write and whether anything is not yet written
+        self.last_saved = time.monotonic()
+        self.unsaved = False
+
+        self.load()
+
+        return
+
+    def load(self) -> bool:
+        """
+        Read the checkpoint left by an earlier attempt at this search.
+
+        :return: true if a checkpoint was found
+        """
+        if not exists(self.file_name):
+            return False
+        try:
+            with open(self.file_name, mode='rb') as checkpoint_file:
+                saved = pickle.load(checkpoint_file)
+        except (OSError, EOFError, pickle.UnpicklingError) as ex:
+            error(f'Unable to read search checkpoint {self.file_name}: '
+                  f'{ex}')
+            return False
+        if saved.get('search_key') != self.search_key:
+            return False
+        self.cells_done = saved['cells_done']
+        print(f'Resuming search from checkpoint {self.file_name} with '
+              f'{len(self.cells_done)} starting cells already finished')
+        return True
+
+    def is_done(self, pos: CELL_POSITION) -> bool:
+        """
+        Report whether the search from a starting cell has finished.
+
+        :param pos:
+        :return:
+        """
+        done = tuple(pos) in self.cells_done
+        return done
+
+    def found_words(self) -> list:
+        """
+        Return the words found from all the finished starting cells.
+
+        :return: list of the words, in the order the cells finished
+        """
+        words = [word_info for word_list in self.cells_done.values()
+                 for word_info in word_list]
+        return words
+
+    def record_cell(self, pos: CELL_POSITION, word_list: list):
+        """
+        Note the words found from a finished starting cell.
+
+        The checkpoint is written if enough time has passed since the last
+        write.
+
+        :param pos:
+        :param word_list: the words found from that cell
+        :return:
+        """
+        self.cells_done[tuple(pos)] = list(word_list)
+        self.unsaved = True
+        if time.monotonic() - self.last_saved >= self.interval:
+            self.save()
+        return
+
+    def save(self):
+        """
+        Write the checkpoint, replacing any earlier one in a single step.
+
+        :return:
+        """
+        if not self.unsaved:
+            return
+        temp_name = f'{self.file_name}.tmp'
+        try:
+            makedirs(self.directory, exist_ok=True)
+            with open(temp_name, mode='wb') as checkpoint_file:
+                pickle.dump(dict(search_key=self.search_key,
+                                 cells_done=self.cells_done),
+                            checkpoint_file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            replace(temp_name, self.file_name)
+        except OSError as ex:
+            error(f'Unable to write search checkpoint {self.file_name}: '
+                  f'{ex}')
+            return
+        self.last_saved = time.monotonic()
+        self.unsaved = False
+        debug(f'Search checkpoint {self.file_name} written with '
+              f'{len(self.cells_done)} starting cells finished')
+        return
+
+    def finish(self):
+        """
+        Discard the checkpoint now that the search is complete.
+
+        :return:
+        """
+        self.unsaved = False
+        if exists(self.file_name):
+            try:
+                remove(self.file_name)
+            except OSError as ex:
+                error(f'Unable to remove search checkpoint '
+                      f'{self.file_name}: {ex}')
+        return
+
+
+def checkpoint_directory() -> str:
+    """
+    Find the directory holding the checkpoint files.
+
+    :return: SEARCH_CHECKPOINT_DIR under the project directory, or under
+        the working directory if Django has not been set up
+    """
+    if settings.configured:
+        directory = join(settings.BASE_DIR, SEARCH_CHECKPOINT_DIR)
+    else:
+        directory = SEARCH_CHECKPOINT_DIR
+    return directory
+
+# EOF
@@ -0,0 +1,113 @@
+"""
+SearchCursor.py - Hold a word search suspended between pages of words.
+
+Only the first few possible answers are usually looked at before the real
+answer turns up, so searching the whole box up front wastes most of the
+work.  A cursor finds words only as they are asked for and keeps the
+search suspended in between - the starting cells not yet searched and the
+search under way from the current one (for the engines that keep their
+own stack, the stack of that search).
+"""
+
+from itertools import islice
+from logging import debug
+
+
+class SearchCursorClass:
+    """
+    Resumable search returning the words that pass a check, a page at a time.
+
+    The cursor is also an iterator of COMPACT_WORD, so it can be given to
+    a candidate store as its lazy source of words.
+    """
+
+    def __init__(self, word_searches, check_func=None, checkpoint=None):
+        """
+        Prepare to search, without finding any words yet.
+
+        :param word_searches: iterator giving the word search (an iterator
+            of COMPACT_WORD) for each starting cell in turn - it is only
+            advanced when the search before it has run out
+        :param check_func: function a word must pass to be returned
+            (optional)
+        :param checkpoint: SearchCheckpointClass keeping the progress of
+            the search, written if the search is abandoned (optional)
+        """
+        self.word_searches = word_searches
+        self.check_func = check_func
+        self.checkpoint = checkpoint
+
+        # search under way (None between starting cells)
+        self.word_search = None
+
+        # counts for reporting progress
+        self.searches_started = 0
+        self.words_checked = 0
+        self.words_returned = 0
+
+        # set once every search has run out
+        self.exhausted = False
+
+        return
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        Resume the search until the next word passing the check is found.
+
+        :return: the next COMPACT_WORD
+        """
+        while not self.exhausted:
+            if self.word_search is None:
+                self.word_search = next(self.word_searches, None)
+                if self.word_search is None:
+                    self.exhausted = True
+                    debug(f'Search cursor exhausted after '
+                          f'{self.searches_started} searches, '
+                          f'{self.words_returned} of {self.words_checked} '
+                          f'words returned')
+                    break
+                self.word_search = iter(self.word_search)
+                self.searches_started += 1
+
+            for word_info in self.word_search:
+                self.words_checked += 1
+                if self.check_func is None or \
+                        self.check_func(word_info.found_word):
+                    self.words_returned += 1
+                    return word_info
+            self.word_search = None
+
+        raise StopIteration
+
+    def take(self, count: int) -> list:
+        """
+        Find up to the given number of words, leaving the rest unsearched.
+
+        :param count: number of words wanted
+        :return: list of COMPACT_WORD (shorter if the search ran out)
+        """
+        words = list(islice(self, count))
+        return words
+
+    def close(self):
+        """
+        Abandon the rest of the search.
+
+        :return:
+        """
+        for source in (self.word_search, self.word_searches):
+            if hasattr(source, 'close'):
+                source.close()
+        self.word_search = None
+        self.word_searches = iter(())
+        self.exhausted = True
+
+        # keep the progress made for next time
+        if self.checkpoint is not None:
+            self.checkpoint.save()
+        return
+
+# EOF
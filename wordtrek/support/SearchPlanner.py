@@ -0,0 +1,237 @@
+"""
+SearchPlanner.py - Choose the cheaper way to search the box for words.
+
+A board first search walks every path through the box and checks the
+words it spells.  A dictionary first search takes each lexicon word that
+could be spelled from the letters in the box and traces it on the box.
+Small boards and short words favor the first, big boards and long words
+favor the second.
+"""
+
+from collections import Counter, OrderedDict
+from logging import debug
+
+from wordtrek.support.BoxSearch import flatten_box, neighbor_table, \
+    available_letter_counts, hint_matching_words, hint_pattern
+from wordtrek.support.constants import SEARCH_STRATEGY, PLAN_CACHE_SIZE
+
+# the words of the most recently planned lexicon slices indexed by the
+# letters they need, keyed by lexicon version, word length and hint pattern
+_word_masks_cache = OrderedDict()
+
+
+def estimate_board_first_cost(*, letters: list, used_mask: int, side: int,
+                              word_length: int, word_hint: str,
+                              prefix_counts: list = None) -> float:
+    """
+    Estimate the number of partial paths a board first search will visit.
+
+    :param letters: flat list of letters in the box
+    :param used_mask: bitmask of unusable cells
+    :param side: the size of one side of the puzzle
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param prefix_counts: distinct lexicon prefixes of each length (if the
+        search is pruned by prefix)
+    :return: estimated number of partial paths
+    """
+    pattern = hint_pattern(word_hint, word_length)
+    available = [ndx for ndx in range(side * side)
+                 if not used_mask & (1 << ndx)]
+    if not available or word_length < 1:
+        return 0.0
+
+    # average number of usable neighbors of a usable cell
+    table = neighbor_table(side)
+    branching = sum(
+        sum(1 for neighbor in table[ndx] if not used_mask & (1 << neighbor))
+        for ndx in available) / len(available)
+    distinct_letters = len(set(letters[ndx] for ndx in available))
+
+    if pattern[0] is not None:
+        starts = sum(1 for ndx in available if letters[ndx] == pattern[0])
+    else:
+        starts = len(available)
+
+    cost = 0.0
+    paths = float(starts)
+    for depth in range(word_length):
+        level = paths
+
+        # with prefix pruning, only the paths extending a surviving prefix
+        # into one of the prefixes of this length are kept
+        if prefix_counts is not None and depth < len(prefix_counts):
+            known = prefix_counts[depth - 1] if depth else 1
+            possible = max(known, 1) * distinct_letters
+            level *= min(prefix_counts[depth] / possible, 1.0)
+        cost += level
+
+        # the cell just left cannot be used again
+        step = branching if depth == 0 else max(branching - 1.0, 1.0)
+        # a revealed letter allows only the cells holding it
+        if depth + 1 < word_length and pattern[depth + 1] is not None:
+            step /= distinct_letters
+        paths = level * step
+
+    return cost
+
+
+def estimate_dictionary_first_cost(*, letters: list, used_mask: int,
+                                   word_hint: str, words: list,
+                                   lexicon_version: int = None) -> float:
+    """
+    Estimate the work needed to trace the fitting lexicon words on the box.
+
+    :param letters: flat list of letters in the box
+    :param used_mask: bitmask of unusable cells
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param words: lexicon words of the length wanted
+    :param lexicon_version: version of the lexicon the words come from
+        (see get_word_masks)
+    :return: estimated number of steps
+    """
+    letter_counts = available_letter_counts(letters, used_mask)
+
+    # every word in the slice is looked at once
+    cost = float(len(words))
+    if not words:
+        return cost
+
+    # a word fits unless it needs more of some letter than the box holds
+    all_words, need_masks, first_masks = get_word_masks(
+        words, word_hint, lexicon_version)
+    misfits = 0
+    for (letter, count), mask in need_masks.items():
+        if letter_counts[letter] < count:
+            misfits |= mask
+    fitting = all_words & ~misfits
+
+    # each fitting word is traced from every copy of its first letter
+    word_length = len(words[0])
+    for letter, mask in first_masks.items():
+        if letter_counts[letter]:
+            cost += letter_counts[letter] * word_length * \
+                bin(fitting & mask).count('1')
+
+    return cost
+
+
+def get_word_masks(words: list, word_hint: str,
+                   lexicon_version: int = None) -> tuple:
+    """
+    Return the words matching the hint indexed by the letters they need.
+
+    The index depends only on the lexicon slice and the hint, so it is
+    kept for the same version of the lexicon, word length and hint
+    pattern.  Without a version it is built every time.
+
+    :param words: lexicon words of the length wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param lexicon_version: version of the lexicon the words come from
+    :return: see word_masks
+    """
+    if lexicon_version is None:
+        masks = word_masks(words, word_hint)
+        return masks
+
+    word_length = len(words[0])
+    key = (lexicon_version, word_length,
+           hint_pattern(word_hint, word_length))
+    if key not in _word_masks_cache:
+        _word_masks_cache[key] = word_masks(words, word_hint)
+        while len(_word_masks_cache) > PLAN_CACHE_SIZE:
+            _word_masks_cache.popitem(last=False)
+    _word_masks_cache.move_to_end(key)
+    masks = _word_masks_cache[key]
+    return masks
+
+
+def word_masks(words: list, word_hint: str) -> tuple:
+    """
+    Index the words matching the hint by the letters they need.
+
+    Each word matching the hint is given a bit, in the order of the list.
+
+    (Internal call from get_word_masks)
+
+    :param words: words of the length wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :return: tuple of (bitmask of every word, dictionary keyed by (letter,
+        count) of the bitmask of the words needing at least that many of
+        the letter, dictionary keyed by letter of the bitmask of the words
+        starting with it)
+    """
+    # collect the bits of each mask before joining them, since each join
+    # of two long masks copies them
+    need_bits = dict()
+    first_bits = dict()
+    word_count = 0
+    for word_count, word in enumerate(
+            hint_matching_words(words, word_hint), start=1):
+        bit = word_count - 1
+        first_bits.setdefault(word[0], list()).append(bit)
+        for letter, count in Counter(word).items():
+            for least in range(1, count + 1):
+                need_bits.setdefault((letter, least), list()).append(bit)
+
+    all_words = (1 << word_count) - 1
+    need_masks = dict((key, bits_to_mask(bits))
+                      for key, bits in need_bits.items())
+    first_masks = dict((letter, bits_to_mask(bits))
+                       for letter, bits in first_bits.items())
+    return all_words, need_masks, first_masks
+
+
+def bits_to_mask(bits: list) -> int:
+    """
+    Join a list of bit positions into a bitmask.
+
+    :param bits: bit positions, in increasing order
+    :return:
+    """
+    if not bits:
+        return 0
+    flags = bytearray((bits[-1] >> 3) + 1)
+    for bit in bits:
+        flags[bit >> 3] |= 1 << (bit & 7)
+    mask = int.from_bytes(flags, 'little')
+    return mask
+
+
+def choose_search_strategy(*, box: list, side: int, word_length: int,
+                           word_hint: str, words: list,
+                           prefix_counts: list = None,
+                           lexicon_version: int = None) -> SEARCH_STRATEGY:
+    """
+    Pick the cheaper search for this box, word length and hint.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :param word_length: number of letters wanted
+    :param word_hint: letters the word must have (see hint_pattern)
+    :param words: lexicon words of the length wanted
+    :param prefix_counts: distinct lexicon prefixes of each length
+    :param lexicon_version: version of the lexicon the words come from
+    :return: the strategy chosen
+    """
+    cells, letters, used_mask = flatten_box(box)
+    board_cost = estimate_board_first_cost(
+        letters=letters, used_mask=used_mask, side=side,
+        word_length=word_length, word_hint=word_hint,
+        prefix_counts=prefix_counts)
+    dictionary_cost = estimate_dictionary_first_cost(
+        letters=letters, used_mask=used_mask, word_hint=word_hint,
+        words=words, lexicon_version=lexicon_version)
+
+    if dictionary_cost < board_cost:
+        strategy = SEARCH_STRATEGY.dictionary_first
+    else:
+        strategy = SEARCH_STRATEGY.board_first
+
+    debug(f'Searching {side} x {side} box for {word_length} letters '
+          f'(hint "{word_hint}") {strategy.value}: estimated cost '
+          f'{board_cost:.0f} board first, {dictionary_cost:.0f} '
+          f'dictionary first')
+    return strategy
+
+# EOF
@@ -13,6 +13,9 @@ __creation_date__ = "{DATE}"
 
 log = getLogger(__name__)
 
+# spell checker already set up by this process
+_spell_checker = None
+
 
 class SpellCheckerClass:
     """
@@ -43,4 +46,16 @@ class SpellCheckerClass:
         result = self.word_check.check(test_word.lower())
         return result
 
+
+def get_spell_checker() -> SpellCheckerClass:
+    """
+    Return the spell checker for this process, setting it up the first time.
+
+    :return: the spell checker
+    """
+    global _spell_checker
+    if _spell_checker is None:
+        _spell_checker = SpellCheckerClass()
+    return _spell_checker
+
 # EOF
@@ -0,0 +1,125 @@
+"""
+WordTracer.py - Find where a given word can be traced on the box.
+
+The search engines walk the box to see which words it holds.  The tracer
+answers the opposite question: given a word, can it be traced through
+touching cells of the box, and along which cells?  The cells holding each
+letter are indexed once as bitmasks, so many words can be traced (or many
+paths checked) against the same box cheaply.
+
+It is used to check the letters recorded for an answer before they are
+removed from the box or saved, and to trace the answers already known
+for a puzzle.
+"""
+
+from wordtrek.support.BoxSearch import flatten_box, letter_masks, \
+    neighbor_masks, trace_word_paths
+from wordtrek.support.constants import CELL_VACANT
+
+
+class WordTracerClass:
+    """
+    Trace words on one box, with the cells of each letter indexed.
+    """
+
+    def __init__(self, letters: list, side: int, used_mask: int = 0):
+        """
+        Index the letters of a box.
+
+        :param letters: flat list (or string) of letters, row * side + col
+            (CELL_VACANT for an empty cell)
+        :param side: the size of one side of the puzzle
+        :param used_mask: bitmask of unusable cells (besides empty ones)
+        """
+        self.letters = list(letters)
+        self.side = side
+        if len(self.letters) != side * side:
+            raise ValueError(f'Incorrect number of letters for a box that '
+                             f'is {side} letters on a side.')
+        for ndx, letter in enumerate(self.letters):
+            if letter == CELL_VACANT:
+                used_mask |= 1 << ndx
+        self.used_mask = used_mask
+
+        # bitmask of the cells holding each letter, and how many there are
+        self.cells_by_letter = letter_masks(self.letters, used_mask)
+        self.letter_counts = dict(
+            (letter, bin(mask).count('1'))
+            for letter, mask in self.cells_by_letter.items())
+
+        self.neighbor_masks = neighbor_masks(side)
+        return
+
+    def may_fit(self, word: str) -> bool:
+        """
+        Check that the box holds enough of each letter of the word.
+
+        :param word: (in upper case)
+        :return: false if the word certainly cannot be traced
+        """
+        for letter in set(word):
+            if self.letter_counts.get(letter, 0) < word.count(letter):
+                return False
+        return True
+
+    def trace(self, word: str) -> list:
+        """
+        Find the ways a word can be traced on the box.
+
+        :param word:
+        :return: list of paths, each a bytes of flat cell indexes
+        """
+        my_word = word.upper()
+        paths = list()
+        if not my_word or not self.may_fit(my_word):
+            return paths
+        for path in trace_word_paths(my_word, self.letters, self.side,
+                                     self.used_mask,
+                                     cells_by_letter=self.cells_by_letter):
+            paths.append(bytes(path))
+        return paths
+
+    def is_path(self, word: str, cells) -> bool:
+        """
+        Check that a word lies along the cells given.
+
+        Each cell must be available, hold the next letter of the word, be
+        used only once and touch the cell before it.
+
+        :param word:
+        :param cells: flat cell index of each letter (bytes or list)
+        :return:
+        """
+        my_word = word.upper()
+        if not my_word or len(my_word) != len(cells):
+            return False
+        visited = self.used_mask
+        previous = None
+        for letter, cell_ndx in zip(my_word, cells):
+            if not 0 <= cell_ndx < len(self.letters):
+                return False
+            cell_bit = 1 << cell_ndx
+            if visited & cell_bit or \
+                    not self.cells_by_letter.get(letter, 0) & cell_bit:
+                return False
+            if previous is not None and \
+                    not self.neighbor_masks[previous] & cell_bit:
+                return False
+            visited |= cell_bit
+            previous = cell_ndx
+        return True
+
+
+def get_box_tracer(box: list, side: int) -> WordTracerClass:
+    """
+    Prepare to trace words on a box of cells.
+
+    :param box: list of lists of CELL
+    :param side: the size of one side of the puzzle
+    :return:
+    """
+    cells, letters, used_mask = flatten_box(box)
+    tracer = WordTracerClass(letters, side, used_mask)
+    return tracer
+
+# EOF
@@ -24,6 +24,50 @@ MAX_CORE_LIMIT = cpu_count() - 1
 # manual recursion limit - default is 1000
 RECURSION_LIMIT = 1500
 
+# source of the words used to prune searches by prefix: ASPELL_LEXICON for
+# the master dictionary of aspell (the words the dictionary check accepts)
+# or the name of a file holding one word per line
+ASPELL_LEXICON = 'aspell'
+LEXICON_SOURCE = ASPELL_LEXICON
+
+# commands listing the words of the aspell master dictionary, the second
+# adding every ending of each word
+ASPELL_DUMP_COMMAND = ['aspell', 'dump', 'master']
+ASPELL_EXPAND_COMMAND = ['aspell', 'expand']
+
+# key in a prefix tree node marking the end of a complete word
+TRIE_END = '$'
+
+# words at least this long are found by meeting in the middle (if the
+# search is pruned by prefix)
+DEFAULT_LONG_WORD_LENGTH = 12
+
+# number of words a lazy search finds up front, before the first is asked
+# for - the rest of the search waits until more words are wanted
+FIRST_PAGE_WORDS = 5
+
+# number of searches whose good words are kept for a repeat of the same
+# box, word length, hint and filters
+RESULT_CACHE_SIZE = 32
+
+# number of lexicon slices (by word length and hint) whose letter needs
+# are kept for estimating the cost of a dictionary first search
+PLAN_CACHE_SIZE = 16
+
+# most board states the whole puzzle solver explores before giving up
+SOLVER_STATE_LIMIT = 200000
+
+# most paths whose removal is tried out when ranking the words for an
+# answer by what they leave for the other answers
+LOOKAHEAD_PATH_LIMIT = 400
+
+# most different words solved in other puzzles that are tried on the box
+# before it is searched
+KNOWN_ANSWER_LIMIT = 200
+
+# characters in a hint standing for a letter not yet revealed
+HINT_WILDCARDS = '?_. '
+
 
 class WordSetInfo(NamedTuple):
     """
@@ -115,6 +159,27 @@ class FOUND_WORD(NamedTuple):
     letters_loc: list
 
 
+class COMPACT_WORD(NamedTuple):
+    """
+    Report the found word and its path as one byte per letter.
+
+    Each byte is the flat index (row * side + col) of the cell holding that
+    letter.  The LETTER_LOC list is only built when letters_loc is asked
+    for, so this can be used wherever a FOUND_WORD is expected.
+    """
+    found_word: str
+    cells: bytes
+    side: int
+
+    @property
+    def letters_loc(self) -> list:
+        letters_loc = [
+            LETTER_LOC(found_letter=letter,
+                       letter_loc=CELL_POSITION(*divmod(cell_ndx, self.side)))
+            for letter, cell_ndx in zip(self.found_word, self.cells)]
+        return letters_loc
+
+
 class QUEUE_ENTRY(NamedTuple):
     found_word: str
     letter_seq: list
@@ -145,10 +210,25 @@ RESET_SOLVED_STATUS = 'reset_solved_status'
 FLIP_VOWEL_CHECK = 'flip_vowel_check'
 FLIP_DICTIONARY_CHECK = 'flip_dictionary_check'
 TURN_DICTIONARY_ON = 'force_dictionary_on'
+FLIP_PREFIX_CHECK = 'flip_prefix_check'
+FLIP_LAZY_SEARCH = 'flip_lazy_search'
+FLIP_ALL_LENGTHS = 'flip_all_lengths'
+FLIP_LOOKAHEAD = 'flip_lookahead'
+FLIP_KNOWN_ANSWERS = 'flip_known_answers'
+FLIP_SPECULATE = 'flip_speculate'
+NEXT_SEARCH_ENGINE = 'next_search_engine'
+RAISE_LONG_WORD_LENGTH = 'raise_long_word_length'
+LOWER_LONG_WORD_LENGTH = 'lower_long_word_length'
 
 # reset dictionary keys
 VOWEL_CHECK = 'vowels'
 DICTIONARY_CHECK = 'dict'
+PREFIX_CHECK = 'prefix'
+LAZY_SEARCH = 'lazy'
+ALL_LENGTHS = 'lengths'
+LOOKAHEAD = 'lookahead'
+KNOWN_ANSWERS = 'known'
+SPECULATE = 'speculate'
 
 # flags for next word selection from queue
 SAME_NEXT_WORD = 'SAME'
@@ -162,5 +242,58 @@ class WORD_SELECTION(Enum):
     flush_cache = FLUSH_WORD_CACHE
 
 
+# reset dictionary key for the search engine choice
+ENGINE_CHOICE = 'engine'
+
+# reset dictionary key for the shortest word found by meeting in the middle
+LONG_WORD_LENGTH = 'long'
+
+
+class SEARCH_ENGINE(Enum):
+    """
+    Ways of walking the box to find words.
+    """
+    deep_copy = 'deep_copy'  # recursion with deeply copied letter maps
+    bitmask = 'bitmask'  # recursion with a bitmask of cells used
+    iterative = 'iterative'  # explicit stack, memory bounded by word length
+
+
+class SEARCH_STRATEGY(Enum):
+    """
+    Which side drives the search - the letters in the box or the lexicon.
+    """
+    board_first = 'board first'  # walk the box, check words found
+    dictionary_first = 'dictionary first'  # trace lexicon words on the box
+
+
+class ANSWER_TARGET(NamedTuple):
+    """
+    An open answer to be searched for along with the others of a puzzle.
+    """
+    answer_id: int
+    word_length: int
+    word_hint: str
+
+
+class BOARD_STEP(NamedTuple):
+    """
+    An answer removed from the box and what removing it changed.
+
+    Enough is kept to take the answer back, or to remove it again, without
+    replaying the other answers or searching the box again.
+    """
+    answer_id: int
+    answer_word: FOUND_WORD
+    cells_before: dict  # CELL replaced, keyed by flat cell index
+    cells_after: dict  # CELL put in their place, keyed the same way
+    buckets_before: dict  # answer buckets before the answer was removed
+    buckets_after: dict  # answer buckets after the answer was removed
+
+
 RAW_WORD_LIST = 'raw_word_list.txt'
+
+# directory holding the progress of searches not yet finished, and the
+# least number of seconds between writes of a search's progress
+SEARCH_CHECKPOINT_DIR = 'search_checkpoints'
+CHECKPOINT_INTERVAL = 10.0
 # EOF
@@ -1,3 +1,784 @@
-from django.test import TestCase
+"""
+tests.py - Check the word search engines and what is built on them.
 
-# Create your tests here.
+Every engine is checked against a plain walk of every path through the
+box, on random boards with empty cells and with hints revealing some of
+the letters.  The lexicon used for pruning is made from some of the
+strings the board actually holds, so the pruned searches find words.
+The other tests use the same boards and walk.
+"""
+
+from contextlib import redirect_stdout
+from io import StringIO
+from os import listdir
+from os.path import join
+from random import Random
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from wordtrek.support.BoxSearch import build_box, bitmask_word_search, \
+    IterativeWordSearch, meet_in_middle_word_search, anchored_word_search, \
+    multi_length_word_search, dictionary_word_search, HintPattern, \
+    flatten_box, apply_gravity, board_hash
+from wordtrek.support.CandidateStore import CandidateStoreClass
+from wordtrek.support.Lexicon import LexiconClass
+from wordtrek.support.PuzzleboxParallel import ParallelBox, \
+    PuzzleBoxParallelClass
+from wordtrek.support.PuzzleSolver import PuzzleSolverClass
+from wordtrek.support.SearchCheckpoint import SearchCheckpointClass
+from wordtrek.support.WordTracer import WordTracerClass, get_box_tracer
+from wordtrek.support.constants import CELL_VACANT, CELL_POSITION, \
+    FOUND_WORD, COMPACT_WORD, ANSWER_TARGET, VOWEL_CHECK, \
+    DICTIONARY_CHECK, PREFIX_CHECK, ENGINE_CHOICE, SEARCH_ENGINE, \
+    SEARCH_CHECKPOINT_DIR
+
+# letters of the random boards - few enough that words repeat
+BOARD_LETTERS = 'AEILNORST'
+
+
+def random_board(rng: Random, side: int, holes: int) -> str:
+    """
+    Make a board of random letters with some empty cells.
+
+    :param rng: source of random numbers
+    :param side: the size of one side of the puzzle
+    :param holes: number of cells left empty
+    :return: one letter per cell, CELL_VACANT for an empty cell
+    """
+    letters = [rng.choice(BOARD_LETTERS) for _ in range(side * side)]
+    for cell_ndx in rng.sample(range(side * side), holes):
+        letters[cell_ndx] = CELL_VACANT
+    return ''.join(letters)
+
+
+def brute_force_paths(letters: str, side: int, word_length: int,
+                      word_hint: str = '') -> set:
+    """
+    Walk every path of touching cells and keep those fitting the hint.
+
+    :param letters: one letter per cell, CELL_VACANT for an empty cell
+    :param side: the size of one side of the puzzle
+    :param word_length: number of letters wanted
+    :param word_hint: letters revealed ("?" for a letter not revealed)
+    :return: set of (word, bytes of the flat index of each cell)
+    """
+    found = set()
+
+    def walk(path: list):
+        if len(path) == word_length:
+            word = ''.join(letters[cell_ndx] for cell_ndx in path)
+            if all(hint_letter == '?' or hint_letter == letter
+                   for hint_letter, letter in zip(word_hint, word)):
+                found.add((word, bytes(path)))
+            return
+        row, col = divmod(path[-1], side)
+        for next_row in range(max(row - 1, 0), min(row + 2, side)):
+            for next_col in range(max(col - 1, 0), min(col + 2, side)):
+                next_cell = next_row * side + next_col
+                if next_cell not in path and \
+                        letters[next_cell] != CELL_VACANT:
+                    walk(path + [next_cell])
+        return
+
+    for start in range(side * side):
+        if letters[start] != CELL_VACANT:
+            walk([start])
+    return found
+
+
+class EngineEquivalenceTests(SimpleTestCase):
+    """
+    Each engine finds exactly the paths a plain walk of the box finds.
+    """
+
+    side = 4
+    trials = 12
+
+    def setUp(self):
+        self.work_dir = TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        return
+
+    def boards(self, seed: int):
+        """
+        Generate random boards, each with a word length and a hint.
+
+        The hint reveals one or two letters of a string the board holds
+        (or none at all, now and then).
+
+        :param seed: seed of the random numbers
+        :return: generator of (letters, word length, hint, every path)
+        """
+        rng = Random(seed)
+        for _ in range(self.trials):
+            letters = random_board(rng, self.side, rng.randint(0, 4))
+            word_length = rng.randint(3, 5)
+            all_paths = brute_force_paths(letters, self.side, word_length)
+            hint = ''
+            if all_paths and rng.random() < 0.75:
+                word, _ = rng.choice(sorted(all_paths))
+                revealed = rng.sample(range(word_length), rng.randint(1, 2))
+                hint = ''.join(letter if ndx in revealed else '?'
+                               for ndx, letter in enumerate(word))
+            yield letters, word_length, hint, all_paths
+        return
+
+    def make_lexicon(self, rng: Random, all_paths: set) -> LexiconClass:
+        """
+        Make a lexicon of about half the strings on the board, plus others.
+
+        :param rng: source of random numbers
+        :param all_paths: (word, cells) of every path of the length wanted
+        :return: the lexicon
+        """
+        strings = sorted(set(word for word, _ in all_paths))
+        words = rng.sample(strings, len(strings) // 2)
+        words += [''.join(rng.choice(BOARD_LETTERS) for _ in range(length))
+                  for length in range(2, 7) for _ in range(20)]
+        file_name = join(self.work_dir.name, 'words.txt')
+        with open(file_name, mode='w') as word_file:
+            print('\n'.join(words), file=word_file)
+        lexicon = LexiconClass(file_name)
+        return lexicon
+
+    def expected(self, letters: str, word_length: int, hint: str,
+                 lexicon: LexiconClass = None) -> set:
+        """
+        Find the paths an engine should find by walking every path.
+
+        :param letters:
+        :param word_length:
+        :param hint:
+        :param lexicon: if given, only the paths spelling its words count
+        :return: set of (word, cells)
+        """
+        paths = brute_force_paths(letters, self.side, word_length, hint)
+        if lexicon is not None:
+            words = set(lexicon.get_words(word_length))
+            paths = set((word, cells) for word, cells in paths
+                        if word in words)
+        return paths
+
+    def search_every_cell(self, search_func, letters: str) -> list:
+        """
+        Run a search from every cell, checking no path is found twice.
+
+        :param search_func: function of a box and a cell giving the words
+        :param letters:
+        :return: list of (word, cells)
+        """
+        box = build_box(letters, self.side)
+        found = list()
+        for row in box:
+            for cell in row:
+                found.extend((word_info.found_word, word_info.cells)
+                             for word_info in search_func(box, cell))
+        self.assertEqual(len(found), len(set(found)))
+        return found
+
+    def test_bitmask_and_iterative(self):
+        rng = Random(2)
+        for letters, word_length, hint, all_paths in self.boards(1):
+            lexicon = self.make_lexicon(rng, all_paths)
+            for trie in (None, lexicon.get_trie(word_length)):
+                def bitmask(box, cell):
+                    return bitmask_word_search(
+                        box=box, side=self.side, start_cell=cell,
+                        word_length=word_length, word_hint=hint, trie=trie)
+
+                def iterative(box, cell):
+                    return IterativeWordSearch(
+                        box=box, side=self.side, start_cell=cell,
+                        word_length=word_length, word_hint=hint, trie=trie)
+
+                wanted = self.expected(letters, word_length, hint,
+                                       lexicon if trie else None)
+                bitmask_words = self.search_every_cell(bitmask, letters)
+                self.assertEqual(set(bitmask_words), wanted)
+                # the iterative engine finds them in the same order
+                self.assertEqual(
+                    self.search_every_cell(iterative, letters),
+                    bitmask_words)
+        return
+
+    def test_deep_copy(self):
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        for letters, word_length, hint, all_paths in self.boards(3):
+            box = ParallelBox(self.side, letters, options)
+            found = set()
+            # start from the cells the search would list - those of the
+            # first letter revealed, or of the anchor if the hint has one
+            anchor = box.get_search_anchor(word_length, hint)
+            if anchor is not None:
+                first_letter = anchor[1]
+            else:
+                first_letter = hint[:1].replace('?', '')
+            for cell in box.get_next_starting_point():
+                if first_letter and cell.letter != first_letter:
+                    continue
+                box.word_queue.clear()
+                with redirect_stdout(StringIO()):
+                    word_list = box.find_words_from_here(cell, word_length,
+                                                         hint)
+                for word_info in word_list:
+                    cells = bytes(loc.letter_loc.row * self.side +
+                                  loc.letter_loc.col
+                                  for loc in word_info.letters_loc)
+                    found.add((word_info.found_word, cells))
+            self.assertEqual(found,
+                             self.expected(letters, word_length, hint))
+        return
+
+    def test_meet_in_middle(self):
+        rng = Random(4)
+        for letters, word_length, hint, all_paths in self.boards(5):
+            lexicon = self.make_lexicon(rng, all_paths)
+
+            def meet_in_middle(box, cell):
+                return meet_in_middle_word_search(
+                    box=box, side=self.side, start_cell=cell,
+                    word_length=word_length, word_hint=hint,
+                    trie=lexicon.get_trie(word_length),
+                    reverse_trie=lexicon.get_reverse_trie(word_length),
+                    lexicon_version=lexicon.version)
+
+            self.assertEqual(
+                set(self.search_every_cell(meet_in_middle, letters)),
+                self.expected(letters, word_length, hint, lexicon))
+        return
+
+    def test_anchored(self):
+        rng = Random(6)
+        for letters, word_length, hint, all_paths in self.boards(7):
+            if not hint:
+                continue
+            lexicon = self.make_lexicon(rng, all_paths)
+            cells, box_letters, used_mask = flatten_box(
+                build_box(letters, self.side))
+            anchor_position, _ = HintPattern(
+                word_hint=hint, word_length=word_length,
+                letters=box_letters, used_mask=used_mask,
+                side=self.side).anchor
+            for prune in (False, True):
+                tail_trie = reverse_trie = None
+                if prune:
+                    tail_trie = lexicon.get_tail_trie(word_length,
+                                                      anchor_position)
+                    reverse_trie = lexicon.get_reverse_trie(word_length)
+
+                def anchored(box, cell):
+                    return anchored_word_search(
+                        box=box, side=self.side, anchor_cell=cell,
+                        word_length=word_length, word_hint=hint,
+                        tail_trie=tail_trie, reverse_trie=reverse_trie)
+
+                self.assertEqual(
+                    set(self.search_every_cell(anchored, letters)),
+                    self.expected(letters, word_length, hint,
+                                  lexicon if prune else None))
+        return
+
+    def test_multi_length(self):
+        rng = Random(8)
+        for letters, word_length, hint, all_paths in self.boards(9):
+            lexicon = self.make_lexicon(rng, all_paths)
+            targets = [ANSWER_TARGET(answer_id=1, word_length=word_length,
+                                     word_hint=hint),
+                       ANSWER_TARGET(answer_id=2, word_length=3,
+                                     word_hint='')]
+            for tries in (None, dict((target.word_length,
+                                      lexicon.get_trie(target.word_length))
+                                     for target in targets)):
+                box = build_box(letters, self.side)
+                found = dict((target, list()) for target in targets)
+                for row in box:
+                    for cell in row:
+                        for target, word_info in multi_length_word_search(
+                                box=box, side=self.side, start_cell=cell,
+                                targets=targets, tries=tries):
+                            found[target].append((word_info.found_word,
+                                                  word_info.cells))
+                for target in targets:
+                    self.assertEqual(len(found[target]),
+                                     len(set(found[target])))
+                    self.assertEqual(
+                        set(found[target]),
+                        self.expected(letters, target.word_length,
+                                      target.word_hint,
+                                      lexicon if tries else None))
+        return
+
+    def test_dictionary_first(self):
+        rng = Random(10)
+        for letters, word_length, hint, all_paths in self.boards(11):
+            lexicon = self.make_lexicon(rng, all_paths)
+            found = [(word_info.found_word, word_info.cells)
+                     for word_info in dictionary_word_search(
+                         box=build_box(letters, self.side), side=self.side,
+                         word_length=word_length, word_hint=hint,
+                         words=lexicon.get_words(word_length))]
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual(set(found),
+                             self.expected(letters, word_length, hint,
+                                           lexicon))
+        return
+
+
+class GravityTests(SimpleTestCase):
+    """
+    Removing letters lets the ones above fall and keeps the hash current.
+    """
+
+    side = 5
+
+    def box_letters(self, box: ParallelBox) -> str:
+        """
+        Read the letters of a box, CELL_VACANT for an empty cell.
+
+        :param box:
+        :return: one letter per cell
+        """
+        letters = ''.join(cell.letter for row in box.box for cell in row)
+        return letters
+
+    def test_remove_words(self):
+        rng = Random(12)
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        for _ in range(10):
+            box = ParallelBox(self.side,
+                              random_board(rng, self.side, 0), options)
+            while True:
+                letters = self.box_letters(box)
+                paths = sorted(brute_force_paths(letters, self.side,
+                                                 rng.randint(2, 4)))
+                if not paths:
+                    break
+                word, cells = rng.choice(paths)
+                changed = box.remove_word_letters(FOUND_WORD(
+                    found_word=word,
+                    letters_loc=[CELL_POSITION(*divmod(cell_ndx, self.side))
+                                 for cell_ndx in cells]))
+                new_letters = self.box_letters(box)
+                self.assertEqual(new_letters,
+                                 apply_gravity(letters, self.side, cells))
+                self.assertEqual(box.board_hash,
+                                 board_hash(new_letters, self.side))
+                self.assertEqual(
+                    changed,
+                    set(ndx for ndx in range(self.side * self.side)
+                        if letters[ndx] != new_letters[ndx]))
+        return
+
+    def test_remove_a_letter(self):
+        rng = Random(13)
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        box = ParallelBox(self.side, random_board(rng, self.side, 0),
+                          options)
+        letters = self.box_letters(box)
+        while CELL_VACANT * len(letters) != letters:
+            cell_ndx = rng.choice([ndx for ndx, letter in enumerate(letters)
+                                   if letter != CELL_VACANT])
+            box.remove_a_letter(CELL_POSITION(*divmod(cell_ndx, self.side)))
+            new_letters = self.box_letters(box)
+            self.assertEqual(new_letters,
+                             apply_gravity(letters, self.side,
+                                           bytes([cell_ndx])))
+            self.assertEqual(box.board_hash,
+                             board_hash(new_letters, self.side))
+            letters = new_letters
+        return
+
+    def test_rejects_word_not_in_box(self):
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        box = ParallelBox(2, 'ABCD', options)
+        before = box.board_hash
+        with self.assertRaises(ValueError):
+            box.remove_word_letters(FOUND_WORD(
+                found_word='AD', letters_loc=[CELL_POSITION(0, 0),
+                                              CELL_POSITION(0, 1)]))
+        self.assertEqual(self.box_letters(box), 'ABCD')
+        self.assertEqual(box.board_hash, before)
+        return
+
+class SearchCheckpointTests(SimpleTestCase):
+    """
+    The progress of a search is kept on disk and picked up again.
+    """
+
+    def setUp(self):
+        self.work_dir = TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        return
+
+    def checkpoint(self, filters: tuple = (True, False)) \
+            -> SearchCheckpointClass:
+        """
+        Open the checkpoint of a small search.
+
+        :param filters: settings that change which words are kept
+        :return:
+        """
+        with redirect_stdout(StringIO()):
+            checkpoint = SearchCheckpointClass(
+                letters=list('ABCD'), used_mask=0, word_length=2,
+                word_hint='', filters=filters,
+                directory=self.work_dir.name, interval=0.0)
+        return checkpoint
+
+    def test_save_and_load(self):
+        word = COMPACT_WORD(found_word='AB', cells=bytes([0, 1]), side=2)
+        checkpoint = self.checkpoint()
+        checkpoint.record_cell(CELL_POSITION(0, 0), [word])
+        self.assertEqual(len(listdir(self.work_dir.name)), 1)
+
+        # the same search picks up the words, another search does not
+        resumed = self.checkpoint()
+        self.assertTrue(resumed.is_done(CELL_POSITION(0, 0)))
+        self.assertFalse(resumed.is_done(CELL_POSITION(0, 1)))
+        self.assertEqual(resumed.found_words(), [word])
+        self.assertEqual(self.checkpoint((False, False)).found_words(), [])
+
+        resumed.finish()
+        self.assertEqual(listdir(self.work_dir.name), [])
+        return
+
+    def test_lazy_search_resumes(self):
+        side = 5
+        word_length = 4
+        letters = random_board(Random(14), side, 3)
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False,
+                   ENGINE_CHOICE: SEARCH_ENGINE.iterative}
+        checkpoint_dir = join(self.work_dir.name, SEARCH_CHECKPOINT_DIR)
+        with self.settings(BASE_DIR=self.work_dir.name), \
+                redirect_stdout(StringIO()) as output:
+
+            # stop part way, once a few starting cells have run out
+            first_try = PuzzleBoxParallelClass(side, letters, options)
+            first_try.stream_word_list_from_box(word_length, '')
+            cursor = first_try.candidates.word_source
+            while cursor.searches_started < 4:
+                first_try.candidates.pull_from_source()
+            first_try.candidates.close_source()
+            self.assertEqual(len(listdir(checkpoint_dir)), 1)
+
+            second_try = PuzzleBoxParallelClass(side, letters, options)
+            second_try.stream_word_list_from_box(word_length, '')
+            while second_try.candidates.pull_from_source():
+                pass
+
+        self.assertIn('Resuming search', output.getvalue())
+        candidates = second_try.candidates
+        found = set((word, bytes(path)) for word in candidates.words
+                    for path in candidates.paths[word])
+        self.assertEqual(found,
+                         brute_force_paths(letters, side, word_length))
+        self.assertEqual(listdir(checkpoint_dir), [])
+        return
+
+class PuzzleSolverTests(SimpleTestCase):
+    """
+    The solver finds words for every answer, removed in a working order.
+    """
+
+    side = 4
+
+    def make_puzzle(self, rng: Random) -> tuple:
+        """
+        Make a puzzle known to have a solution.
+
+        Random paths are removed from a random board, letting the letters
+        fall each time, and their lengths become the answers.  The first
+        answer's hint reveals the first letter of its word.
+
+        :param rng: source of random numbers
+        :return: tuple of (letters, list of ANSWER_TARGET)
+        """
+        letters = random_board(rng, self.side, 0)
+        board = letters
+        targets = list()
+        while len(targets) < 4:
+            paths = sorted(brute_force_paths(board, self.side,
+                                             rng.randint(2, 4)))
+            if not paths:
+                break
+            word, cells = rng.choice(paths)
+            word_hint = '' if targets else word[0]
+            targets.append(ANSWER_TARGET(answer_id=len(targets),
+                                         word_length=len(word),
+                                         word_hint=word_hint))
+            board = apply_gravity(board, self.side, cells)
+        return letters, targets
+
+    def check_solution(self, letters: str, targets: list, solution: list):
+        """
+        Replay a solution, checking each word lies on the box at its turn.
+
+        :param letters:
+        :param targets:
+        :param solution: list of (ANSWER_TARGET, COMPACT_WORD)
+        :return:
+        """
+        self.assertEqual(sorted(target for target, _ in solution),
+                         sorted(targets))
+        board = letters
+        for target, word_info in solution:
+            self.assertEqual(len(word_info.found_word), target.word_length)
+            self.assertTrue(word_info.found_word.startswith(
+                target.word_hint))
+            self.assertIn((word_info.found_word, word_info.cells),
+                          brute_force_paths(board, self.side,
+                                            target.word_length))
+            board = apply_gravity(board, self.side, word_info.cells)
+        return
+
+    def solve(self, letters: str, targets: list) -> tuple:
+        """
+        Solve a puzzle without checking the words against a dictionary.
+
+        :param letters:
+        :param targets:
+        :return: tuple of (the solver, its solution or None)
+        """
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        solver = PuzzleSolverClass(side=self.side, letters=letters,
+                                   targets=targets, reset_options=options)
+        with redirect_stdout(StringIO()):
+            solution = solver.solve()
+        return solver, solution
+
+    def test_solve(self):
+        rng = Random(15)
+        for _ in range(6):
+            letters, targets = self.make_puzzle(rng)
+            for core_limit in (1, 2):
+                with patch('wordtrek.support.PuzzleSolver.MAX_CORE_LIMIT',
+                           core_limit):
+                    _, solution = self.solve(letters, targets)
+                self.assertIsNotNone(solution)
+                self.check_solution(letters, targets, solution)
+        return
+
+    def test_too_few_letters(self):
+        letters = random_board(Random(16), self.side, 3)
+        targets = [ANSWER_TARGET(answer_id=ndx, word_length=4, word_hint='')
+                   for ndx in range(4)]
+        for core_limit in (1, 2):
+            with patch('wordtrek.support.PuzzleSolver.MAX_CORE_LIMIT',
+                       core_limit):
+                solver, solution = self.solve(letters, targets)
+            self.assertIsNone(solution)
+            self.assertFalse(solver.gave_up)
+        return
+
+    def test_repeated_states_skipped(self):
+        # a hint no word can match leaves every order of the other
+        # answers dead, and the same boxes are reached in many orders
+        letters = random_board(Random(17), self.side, 0)
+        targets = [ANSWER_TARGET(answer_id=ndx, word_length=2, word_hint='')
+                   for ndx in range(3)]
+        targets.append(ANSWER_TARGET(answer_id=3, word_length=2,
+                                     word_hint='QQ'))
+        with patch('wordtrek.support.PuzzleSolver.MAX_CORE_LIMIT', 1):
+            solver, solution = self.solve(letters, targets)
+        self.assertIsNone(solution)
+        self.assertGreater(solver.table_hits, 0)
+        return
+
+    def test_lookahead_ranking(self):
+        rng = Random(50)
+        letters, targets = self.make_puzzle(rng)
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        solver = PuzzleSolverClass(side=self.side, letters=letters,
+                                   targets=targets, reset_options=options)
+
+        # score each path of the first answer by walking the box it leaves
+        letters_needed = sum(target.word_length for target in targets)
+        store = CandidateStoreClass(self.side)
+        scores = dict()
+        for word, cells in sorted(brute_force_paths(
+                letters, self.side, targets[0].word_length,
+                targets[0].word_hint)):
+            store.add(COMPACT_WORD(found_word=word, cells=cells,
+                                   side=self.side))
+            board = apply_gravity(letters, self.side, cells)
+            if len(board) - board.count(CELL_VACANT) < letters_needed:
+                scores[cells] = 0
+            else:
+                scores[cells] = sum(
+                    1 for target in targets
+                    if brute_force_paths(board, self.side,
+                                         target.word_length,
+                                         target.word_hint))
+            self.assertEqual(solver.lookahead_score(cells), scores[cells])
+
+        # the words come back best first, each led by its best path
+        self.assertEqual(store.rank(solver.lookahead_score, len(store)),
+                         len(store))
+        word_scores = list()
+        word_info = store.next_unique()
+        while word_info.found_word in store.paths:
+            word_scores.append(scores[word_info.cells])
+            self.assertEqual(scores[word_info.cells],
+                             max(scores[cells] for cells
+                                 in store.paths[word_info.found_word]))
+            word_info = store.next_unique()
+        self.assertEqual(len(word_scores), store.word_count())
+        self.assertGreater(len(set(word_scores)), 1)
+        self.assertEqual(word_scores, sorted(word_scores, reverse=True))
+        return
+
+class UndoRedoTests(SimpleTestCase):
+    """
+    Answers taken back and removed again leave the box as it was.
+    """
+
+    side = 5
+
+    def test_undo_and_redo(self):
+        rng = Random(18)
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False,
+                   ENGINE_CHOICE: SEARCH_ENGINE.iterative}
+        targets = [ANSWER_TARGET(answer_id=ndx, word_length=length,
+                                 word_hint='')
+                   for ndx, length in enumerate((3, 4, 3, 4), start=1)]
+        with redirect_stdout(StringIO()), \
+                patch('wordtrek.support.PuzzleboxParallel.MAX_CORE_LIMIT', 2):
+            box = PuzzleBoxParallelClass(
+                self.side, random_board(rng, self.side, 0), options)
+            box.build_answer_buckets(targets)
+
+            # remove a word for each of the first three answers
+            states = [self.box_state(box)]
+            for target in targets[:3]:
+                letters = states[-1][0]
+                word, cells = rng.choice(sorted(brute_force_paths(
+                    letters, self.side, target.word_length)))
+                box.remove_an_answer(
+                    FOUND_WORD(found_word=word, letters_loc=[
+                        CELL_POSITION(*divmod(cell_ndx, self.side))
+                        for cell_ndx in cells]),
+                    answer_id=target.answer_id)
+                states.append(self.box_state(box))
+
+                # the words kept for the other answers are still right
+                self.assertEqual(
+                    states[-1][0], apply_gravity(letters, self.side, cells))
+                for other, paths in states[-1][2].items():
+                    self.assertEqual(paths, brute_force_paths(
+                        states[-1][0], self.side, other.word_length))
+
+            for state in reversed(states[:-1]):
+                self.assertIsNotNone(box.undo_answer())
+                self.assertEqual(self.box_state(box), state)
+            self.assertIsNone(box.undo_answer())
+
+            for state in states[1:]:
+                self.assertIsNotNone(box.redo_answer())
+                self.assertEqual(self.box_state(box), state)
+            self.assertIsNone(box.redo_answer())
+
+            # removing another answer after an undo leaves nothing to redo
+            box.undo_answer()
+            letters = self.box_state(box)[0]
+            word, cells = sorted(brute_force_paths(letters, self.side, 4))[0]
+            box.remove_an_answer(
+                FOUND_WORD(found_word=word, letters_loc=[
+                    CELL_POSITION(*divmod(cell_ndx, self.side))
+                    for cell_ndx in cells]),
+                answer_id=targets[3].answer_id)
+            self.assertIsNone(box.redo_answer())
+        return
+
+    def box_state(self, box: PuzzleBoxParallelClass) -> tuple:
+        """
+        Describe a box, its hash and the words kept for each answer.
+
+        :param box:
+        :return: tuple of (letters, hash, dictionary keyed by
+            ANSWER_TARGET of the set of (word, cells) in its bucket)
+        """
+        letters = ''.join(letter for row in box.get_working_box_letters()
+                          for letter in row)
+        buckets = dict(
+            (target, set((word, bytes(path)) for word in bucket.words
+                         for path in bucket.paths[word]))
+            for target, bucket in box.answer_buckets.items())
+        return letters, box.my_box.board_hash, buckets
+
+class WordTracerTests(SimpleTestCase):
+    """
+    The tracer finds every path of a given word, and only those.
+    """
+
+    side = 4
+
+    def test_trace(self):
+        rng = Random(19)
+        for _ in range(20):
+            letters = random_board(rng, self.side, rng.randint(0, 4))
+            word_length = rng.randint(2, 5)
+            tracer = WordTracerClass(letters, self.side)
+            all_paths = brute_force_paths(letters, self.side, word_length)
+            words = set(word for word, _ in all_paths)
+            words |= set(''.join(rng.choice(BOARD_LETTERS)
+                                 for _ in range(word_length))
+                         for _ in range(10))
+            for word in words:
+                paths = tracer.trace(word.lower())
+                self.assertEqual(len(paths), len(set(paths)))
+                self.assertEqual(
+                    set(paths),
+                    set(cells for found_word, cells in all_paths
+                        if found_word == word))
+                for cells in paths:
+                    self.assertTrue(tracer.is_path(word, cells))
+        return
+
+    def test_is_path(self):
+        # A B C
+        # D E F
+        # G - H
+        tracer = WordTracerClass('ABCDEF' + 'G' + CELL_VACANT + 'H', 3)
+        self.assertTrue(tracer.is_path('ABF', [0, 1, 5]))
+        self.assertTrue(tracer.is_path('heg', bytes([8, 4, 6])))
+        self.assertFalse(tracer.is_path('AC', [0, 2]))  # not touching
+        self.assertFalse(tracer.is_path('ABA', [0, 1, 0]))  # cell reused
+        self.assertFalse(tracer.is_path('AE', [0, 5]))  # wrong letter
+        self.assertFalse(tracer.is_path('AB', [0, 1, 2]))  # too many cells
+        self.assertFalse(tracer.is_path('GE', [7, 4]))  # empty cell
+        self.assertFalse(tracer.is_path('HE', [9, 4]))  # outside the box
+        self.assertFalse(tracer.may_fit('AA'))
+        self.assertEqual(tracer.trace('GH'), [])
+        return
+
+    def test_box_tracer(self):
+        options = {VOWEL_CHECK: False, DICTIONARY_CHECK: False,
+                   PREFIX_CHECK: False}
+        letters = random_board(Random(20), self.side, 0)
+        box = ParallelBox(self.side, letters, options)
+        word, cells = sorted(brute_force_paths(letters, self.side, 3))[0]
+        box.remove_word_letters(FOUND_WORD(
+            found_word=word,
+            letters_loc=[CELL_POSITION(*divmod(cell_ndx, self.side))
+                         for cell_ndx in cells]))
+        letters_left = apply_gravity(letters, self.side, cells)
+        tracer = get_box_tracer(box.box, self.side)
+        for word, cells in brute_force_paths(letters_left, self.side, 3):
+            self.assertIn(cells, tracer.trace(word))
+        self.assertEqual(
+            tracer.used_mask,
+            sum(1 << cell_ndx for cell_ndx, letter in enumerate(letters_left)
+                if letter == CELL_VACANT))
+        return
+
+# EOF
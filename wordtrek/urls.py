@@ -7,9 +7,10 @@ from django.conf.urls import url
 
 from wordtrek.views import AnimalDQListView, AnimalDQDetailView, \
     AnimalDQCreateView, AnimalDQUpdateView, AnimalDQDeleteView, \
-    PuzzleDetailView, AnimalPuzzleEditView, PuzzleAnswerEditView, \
-    WordSolveView, reset_puzzle, AnswerLetterEditView, word_solve_unique, \
-    word_solve_same, reset_puzzle_box, reset_dictionary
+    PuzzleDetailView, PuzzleSolveView, AnimalPuzzleEditView, \
+    PuzzleAnswerEditView, WordSolveView, reset_puzzle, AnswerLetterEditView, \
+    word_solve_unique, word_solve_same, reset_puzzle_box, reset_dictionary, \
+    undo_answer, redo_answer
 # from .views import WordSearchView
 
 # from .views import PuzzleCreateView
@@ -45,6 +46,10 @@ urlpatterns = [
     url(r'^puzzle/(?P<pk>[0-9]+)/$', PuzzleDetailView.as_view(),
         name='puzzle_detail', ),
 
+    # e.g. /wordtrek/puzzle/solve/4/ = solve all the answers of puzzle # 4
+    url(r'^puzzle/solve/(?P<pk>[0-9]+)/$', PuzzleSolveView.as_view(),
+        name='puzzle_solve', ),
+
     # e.g. /wordtrek/puzzle/edit/9/ = add/edit puzzles for animal/dq # 9
     url(r'^puzzle/edit/(?P<pk>[0-9]+)/$', AnimalPuzzleEditView.as_view(),
         name='puzzle_edit', ),
@@ -87,6 +92,14 @@ urlpatterns = [
     url(r'^puzzle/reset/dictionary/(?P<pk>[0-9]+)/$', reset_dictionary,
         name='dictionary_reset', ),
 
+    # e.g. /wordtrek/puzzle/undo/5/ = take back the last answer of puzzle # 5
+    url(r'^puzzle/undo/(?P<pk>[0-9]+)/$', undo_answer,
+        name='answer_undo', ),
+
+    # e.g. /wordtrek/puzzle/redo/5/ = accept again the answer taken back
+    url(r'^puzzle/redo/(?P<pk>[0-9]+)/$', redo_answer,
+        name='answer_redo', ),
+
 ]
 
 # EOF
@@ -2,7 +2,9 @@
 views.py - views needed by the wordtrek application.
 """
 
-from django.core.exceptions import ValidationError
+from logging import error
+
+from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
@@ -13,13 +15,15 @@ from wordtrek.forms import AnimalDQForm, AnimalPuzzleFormSet, \
     AnswerAnswerLetterFormSet, PuzzleAnswerFormSet, WordSolveForm
 # from .forms import WordSearchForm
 from wordtrek.models import Animal, Answer, AnswerLetter, Puzzle
-from wordtrek.models import WordSearch, SOLVE_STATUS_SOLVED
+from wordtrek.models import SOLVE_STATUS_SOLVED
 from wordtrek.support.GetAWord import GetAWordClass
 from wordtrek.support.constants import CELL_POSITION, CELL_UNIMPORTANT, \
     FLIP_VOWEL_CHECK, END_QUEUE_MARKER, FOUND_WORD, RESET_PUZZLE, \
     RESET_SOLVED_STATUS, ROW_MARKER, FLIP_DICTIONARY_CHECK, \
     TURN_DICTIONARY_ON, \
-    WORD_SELECTION
+    WORD_SELECTION, FLIP_PREFIX_CHECK, FLIP_LAZY_SEARCH, FLIP_ALL_LENGTHS, \
+    FLIP_LOOKAHEAD, FLIP_KNOWN_ANSWERS, FLIP_SPECULATE, NEXT_SEARCH_ENGINE, \
+    RAISE_LONG_WORD_LENGTH, LOWER_LONG_WORD_LENGTH
 
 __author__ = 'Travis Risner'
 __project__ = "WordTrekSolver"
@@ -209,8 +213,8 @@ class PuzzleDetailView(DetailView):
         answer_set = Answer.objects.filter(
             puzzle_id__exact=this_puzzle.id).order_by('answer_sequence', )
 
-        # get current working table
-        working_table = gaw.get_working_box_letters()
+        # get current working table (saved with the puzzle)
+        working_table = gaw.get_puzzle_board(this_puzzle)
         letter_location_table = flatten_table_for_display(working_table)
 
         # add stuff back to context
@@ -222,6 +226,50 @@ class PuzzleDetailView(DetailView):
         return context
 
 
+class PuzzleSolveView(DetailView):
+    """
+    Show an order of words that clears the whole puzzle.
+    """
+    model = Puzzle
+    template_name = 'wordtrek/puzzle_solve.html'
+    context_object_name = 'puzzle_solve_context'
+
+    def get_context_data(self, **kwargs):
+        """
+        Solve the puzzle and add the words found to the context.
+
+        :param kwargs:
+        :return: context
+        """
+        context = super(PuzzleSolveView, self).get_context_data()
+
+        # provide additional information
+        this_puzzle = context['object']
+
+        # get associated animal
+        this_animal = get_object_or_404(Animal, pk=this_puzzle.animal_id)
+
+        # find the words and show each on the box as it is when removed
+        solution = gaw.solve_puzzle(this_puzzle.id)
+        solution_steps = list()
+        for target, word_info in solution or list():
+            this_answer = get_object_or_404(Answer, pk=target.answer_id)
+            solution_steps.append(dict(
+                answer=this_answer,
+                word=word_info.found_word,
+                letter_location_table=build_possible_answer_table(
+                    puzzle_size=this_puzzle.puzzle_size,
+                    answer=word_info)))
+
+        # add stuff back to context
+        context['this_animal'] = this_animal
+        context['this_puzzle'] = this_puzzle
+        context['solved'] = solution is not None
+        context['solution_steps'] = solution_steps
+
+        return context
+
+
 class AnimalPuzzleEditView(UpdateView):
     """
     Edit the Puzzles under a given animal or daily quest.
@@ -333,8 +381,12 @@ class AnimalPuzzleEditView(UpdateView):
         puzzles = Puzzle.objects.filter(animal_id=animal_key)
         for puzzle in puzzles:
             puzzle.puzzle_characters = puzzle.puzzle_characters.upper()
+            puzzle.working_characters = None
             puzzle.save()
 
+        # the box in hand may no longer match the puzzles
+        gaw.reset_an_option(RESET_PUZZLE)
+
         results = reverse('wordtrek:animal_detail',
                           kwargs={'pk': self.get_object().id})
         return results
@@ -381,6 +433,11 @@ class PuzzleAnswerEditView(UpdateView):
         :return:
         """
 
+        # the working board saved may no longer match the answers
+        Puzzle.objects.filter(pk=self.get_object().id).update(
+            working_characters=None)
+        gaw.reset_an_option(RESET_PUZZLE)
+
         # return to puzzle detail
         results = reverse('wordtrek:puzzle_detail',
                           kwargs={'pk': self.get_object().id})
@@ -409,6 +466,7 @@ class AnswerLetterEditView(UpdateView):
         answer_id = answer_key['pk']
         this_answer = get_object_or_404(Answer, pk=answer_id)
         post_info = request.POST
+        letter_list = list()
         for ndx in range(int(post_info['answerletter_set-TOTAL_FORMS'])):
             prefix = 'answerletter_set-'
             order = int(post_info[prefix + str(ndx) + '-letter_order'])
@@ -416,14 +474,25 @@ class AnswerLetterEditView(UpdateView):
                 letter = post_info[prefix + str(ndx) + '-letter_text']
                 row = int(post_info[prefix + str(ndx) + '-letter_row'])
                 col = int(post_info[prefix + str(ndx) + '-letter_col'])
-                this_answer_loc = AnswerLetter(
-                    answer=this_answer,
-                    letter_order=order,
-                    letter_text=letter,
-                    letter_row=row,
-                    letter_col=col
-                )
-                this_answer_loc.save()
+                letter_list.append((order, letter, row, col))
+
+        # make sure the letters are where they are said to be in the puzzle
+        letter_error = gaw.check_answer_letters(this_answer, letter_list)
+        if letter_error:
+            self.object = self.get_object()
+            context = self.get_context_data()
+            context['letter_error'] = letter_error
+            return self.render_to_response(context)
+
+        for order, letter, row, col in letter_list:
+            this_answer_loc = AnswerLetter(
+                answer=this_answer,
+                letter_order=order,
+                letter_text=letter,
+                letter_row=row,
+                letter_col=col
+            )
+            this_answer_loc.save()
 
         # remove the letters of the answer from the puzzle
         # gaw.remove_answer_letters(this_answer.id)
@@ -431,6 +500,11 @@ class AnswerLetterEditView(UpdateView):
         # get this puzzle id for the following url
         puzzle_id = post_info['this_puzzle_id']
 
+        # the working board saved no longer matches the answer letters
+        Puzzle.objects.filter(pk=this_answer.puzzle_id).update(
+            working_characters=None)
+        gaw.reset_an_option(RESET_PUZZLE)
+
         # declare where to go from here
         target = HttpResponseRedirect(
             reverse('wordtrek:puzzle_detail',
@@ -502,24 +576,42 @@ class WordSolveView(DetailView):
         letter_locations_string = request.POST.get('letter_locations_string')
         word_loc = string_to_letter_locs(letter_locations_string)
 
-        this_answer.answer_text = desired_answer
-        this_answer.answer_status = Answer.SOLVED
-        this_answer.save()
-        if len(desired_answer) == len(word_loc):
-            for order, zip_list in enumerate(zip(desired_answer, word_loc),
-                                             start=1):
-                letter, loc = zip_list
-                this_answer_loc = AnswerLetter(
-                    answer=this_answer,
-                    letter_order=order,
-                    letter_text=letter,
-                    letter_row=loc.row,
-                    letter_col=loc.col
-                )
-                this_answer_loc.save()
-
-        # remove the letters of the answer from the puzzle
-        gaw.remove_answer_letters(this_answer.id)
+        prior_answer = (this_answer.answer_status, this_answer.answer_text)
+
+        # record the answer and the working board it leaves in one
+        # transaction, without changing the box in hand until it is done
+        with transaction.atomic():
+            this_answer.answer_text = desired_answer
+            this_answer.answer_status = Answer.SOLVED
+            this_answer.save()
+            if len(desired_answer) == len(word_loc):
+                for order, zip_list in enumerate(
+                        zip(desired_answer, word_loc), start=1):
+                    letter, loc = zip_list
+                    this_answer_loc = AnswerLetter(
+                        answer=this_answer,
+                        letter_order=order,
+                        letter_text=letter,
+                        letter_row=loc.row,
+                        letter_col=loc.col
+                    )
+                    this_answer_loc.save()
+
+            gaw.save_working_board(
+                this_answer.puzzle_id,
+                answer_word=gaw.get_answer_word(this_answer.id))
+
+        # remove the letters of the answer from the puzzle - if the box in
+        # hand does not hold them, rebuild it from the answers saved at the
+        # next search instead
+        try:
+            gaw.remove_answer_letters(this_answer.id,
+                                      prior_answer=prior_answer)
+        except ValueError as ex:
+            error(f'Letters of answer {this_answer.id} not removed: {ex}')
+            gaw.reset_an_option(RESET_PUZZLE)
+            Puzzle.objects.filter(pk=this_answer.puzzle_id).update(
+                working_characters=None)
 
         # now restore dictionary use in case it was turned off momentarily
         gaw.reset_an_option(TURN_DICTIONARY_ON)
@@ -597,21 +689,24 @@ class WordSolveView(DetailView):
             end_of_answers = False
             # extract word
             possible_answer = possible_found_word.found_word
+            # build the letter locations once for all the displays below
+            letters_loc = possible_found_word.letters_loc
+
             # prepare to display locations
-            for loc in possible_found_word.letters_loc:
+            for loc in letters_loc:
                 location_display_string += \
                     f'{loc.found_letter} ' \
                     f'({loc.letter_loc.row}, {loc.letter_loc.col}), '
             final_location_display_string = location_display_string[:-2]
 
             # prepare for letter locations turnaround
-            letter_locations_string = letter_locs_to_string(
-                possible_found_word.letters_loc)
+            letter_locations_string = letter_locs_to_string(letters_loc)
 
             # prepare to display the letters of this word in a table
             letter_location_table = build_possible_answer_table(
                 puzzle_size=this_puzzle.puzzle_size,
-                answer=possible_found_word
+                answer=FOUND_WORD(found_word=possible_answer,
+                                  letters_loc=letters_loc)
             )
 
         # add stuff back to context
@@ -772,6 +867,24 @@ def reset_puzzle(request, reset_option) -> HttpResponseRedirect:
         option_selected = FLIP_VOWEL_CHECK
     elif reset_option == 'dict':
         option_selected = FLIP_DICTIONARY_CHECK
+    elif reset_option == 'prefix':
+        option_selected = FLIP_PREFIX_CHECK
+    elif reset_option == 'lazy':
+        option_selected = FLIP_LAZY_SEARCH
+    elif reset_option == 'lengths':
+        option_selected = FLIP_ALL_LENGTHS
+    elif reset_option == 'lookahead':
+        option_selected = FLIP_LOOKAHEAD
+    elif reset_option == 'known':
+        option_selected = FLIP_KNOWN_ANSWERS
+    elif reset_option == 'speculate':
+        option_selected = FLIP_SPECULATE
+    elif reset_option == 'engine':
+        option_selected = NEXT_SEARCH_ENGINE
+    elif reset_option == 'longer':
+        option_selected = RAISE_LONG_WORD_LENGTH
+    elif reset_option == 'shorter':
+        option_selected = LOWER_LONG_WORD_LENGTH
     elif reset_option == 'solved':
         option_selected = RESET_SOLVED_STATUS
     else:
@@ -796,8 +909,9 @@ def reset_puzzle_box(request, pk) -> HttpResponseRedirect:
 
     puzzle_id = pk
 
-    # take appropriate action
+    # take appropriate action, building the working board again next time
     gaw.reset_an_option(RESET_PUZZLE)
+    Puzzle.objects.filter(pk=puzzle_id).update(working_characters=None)
 
     # go back to answer solving page
     response = HttpResponseRedirect(reverse('wordtrek:puzzle_detail',
@@ -805,6 +919,46 @@ def reset_puzzle_box(request, pk) -> HttpResponseRedirect:
     return response
 
 
+def undo_answer(request, pk) -> HttpResponseRedirect:
+    """
+    Take back the last answer accepted and return to the puzzle detail.
+
+    :param request: http request info
+    :param pk: applicable puzzle id
+    :return: a text response
+    """
+
+    puzzle_id = pk
+
+    # take appropriate action
+    gaw.undo_answer(int(puzzle_id))
+
+    # go back to the puzzle detail
+    response = HttpResponseRedirect(reverse('wordtrek:puzzle_detail',
+                                            kwargs={'pk': puzzle_id}))
+    return response
+
+
+def redo_answer(request, pk) -> HttpResponseRedirect:
+    """
+    Accept again the last answer taken back and return to the puzzle detail.
+
+    :param request: http request info
+    :param pk: applicable puzzle id
+    :return: a text response
+    """
+
+    puzzle_id = pk
+
+    # take appropriate action
+    gaw.redo_answer(int(puzzle_id))
+
+    # go back to the puzzle detail
+    response = HttpResponseRedirect(reverse('wordtrek:puzzle_detail',
+                                            kwargs={'pk': puzzle_id}))
+    return response
+
+
 def reset_dictionary(request, pk) -> HttpResponseRedirect:
     """
     Flip the dictionary check and return to the puzzle detail.